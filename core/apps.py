@@ -0,0 +1,24 @@
+from django.apps import AppConfig
+from django.contrib.staticfiles.apps import StaticFilesConfig as BaseStaticFilesConfig
+
+
+class StaticFilesConfig(BaseStaticFilesConfig):
+    default = False  # Installed by dotted path, not as the "core" app
+
+    # The full Font Awesome tree is only the source for subset_fontawesome;
+    # pages use static/fontawesome-subset.
+    ignore_patterns = BaseStaticFilesConfig.ignore_patterns + ["fontawesome"]
+
+
+class CoreConfig(AppConfig):
+    default = True
+    name = "core"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .db import configure_sqlite
+        from .profiling import install_query_recorder
+
+        connection_created.connect(configure_sqlite)
+        connection_created.connect(install_query_recorder)
@@ -0,0 +1,98 @@
+"""
+Primary/replica database routing.
+
+Writes always go to ``default``. Reads go to ``default`` too, except inside
+``replica_reads()``, which views that only read opt into with
+``ReplicaReadMixin``; there a random alias from ``DATABASE_REPLICAS`` is used.
+
+After a client sends a write (any non-GET/HEAD/OPTIONS request),
+``ReplicaStickinessMiddleware`` pins its reads to the primary for
+``DATABASE_PIN_SECONDS`` so it sees its own changes despite replication lag.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_use_replicas = ContextVar("use_replicas", default=False)
+_pinned = ContextVar("pinned_to_primary", default=False)
+
+
+@contextmanager
+def replica_reads():
+    """
+    Send ORM reads in this block to a replica, unless pinned to the primary.
+    """
+
+    token = _use_replicas.set(True)
+    try:
+        yield
+    finally:
+        _use_replicas.reset(token)
+
+
+@contextmanager
+def pinned_to_primary():
+    """
+    Keep every read in this block on the primary, even inside ``replica_reads``.
+    """
+
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and _use_replicas.get() and not _pinned.get():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication.
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaReadMixin:
+    """
+    Serve safe requests of a class-based view from a read replica.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+        if self.view_is_async:
+            return self._adispatch(request, *args, **kwargs)
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+    async def _adispatch(self, request, *args, **kwargs):
+        # The handler's coroutine must run inside the block, not just be
+        # created there.
+        with replica_reads():
+            return await super().dispatch(request, *args, **kwargs)
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    ``connection_created`` receiver applying ``SQLITE_PRAGMAS`` to new SQLite
+    connections (WAL journal, memory-mapped reads...).
+    """
+
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,111 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from profiles.models import Profile
+from users.common.admin import estimate_count
+from users.common.bench import format_summary, timed
+from users.common.common import normalize_name
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large user and profile table and time the admin changelists: "
+        "first and deep pages (by key, and by offset when sorted by email), "
+        "searches and filters. Reports latency and queries per page, and the "
+        "exact against the estimated count. Everything is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._seed(options["users"], options["batch_size"])
+            self._measure(options["repeat"])
+            transaction.set_rollback(True)
+
+    def _seed(self, count, batch_size):
+        rng = random.Random(42)
+        self.stamp = time.strftime("%Y%m%d%H%M%S")
+        for start in range(0, count, batch_size):
+            users = User.objects.bulk_create(
+                User(
+                    email=f"bench-admin-{self.stamp}-{i}@example.com",
+                    password="!",
+                    is_active=i % 50 != 0,
+                )
+                for i in range(start, min(start + batch_size, count))
+            )
+            Profile.objects.bulk_create(
+                Profile(
+                    user=user,
+                    first_name="Bench",
+                    last_name=str(i),
+                    # bulk_create skips Profile.save(), so fold the name here.
+                    search_name=normalize_name(f"Bench {i}"),
+                    sex=rng.choice(Profile.Sex.values),
+                    birthdate=datetime.date(2000, 1, 1),
+                )
+                for i, user in enumerate(users, start)
+            )
+        self.admin = User.objects.create_superuser(
+            email=f"bench-admin-{self.stamp}@example.com", password="!"
+        )
+        self.stdout.write(f"Seeded {count} users with profiles.")
+
+    def _measure(self, repeat):
+        client = Client(HTTP_HOST="localhost")
+        client.force_login(self.admin)
+        users_url = reverse("admin:users_customuser_changelist")
+        profiles_url = reverse("admin:profiles_profile_changelist")
+        middle_user = User.objects.order_by("-pk").values_list("pk", flat=True)[
+            User.objects.count() // 2
+        ]
+        middle_profile = Profile.objects.order_by("-pk").values_list("pk", flat=True)[
+            Profile.objects.count() // 2
+        ]
+        middle_page = User.objects.count() // 2 // 100
+        pages = {
+            "users: first page": (users_url, {}),
+            "users: middle page by key": (users_url, {"after": middle_user}),
+            "users: by email, first page": (users_url, {"o": "1"}),
+            "users: by email, middle page": (users_url, {"o": "1", "p": middle_page}),
+            "users: email prefix search": (
+                users_url,
+                {"q": f"bench-admin-{self.stamp}-4242"},
+            ),
+            "users: inactive": (users_url, {"is_active__exact": "0"}),
+            "profiles: first page": (profiles_url, {}),
+            "profiles: middle page by key": (profiles_url, {"after": middle_profile}),
+            "profiles: name search": (profiles_url, {"q": "bench 4242"}),
+            "profiles: by sex": (profiles_url, {"sex__exact": "Other"}),
+        }
+        for label, (url, params) in pages.items():
+            samples = []
+            for _ in range(repeat):
+                with CaptureQueriesContext(connection) as queries:
+                    elapsed, response = timed(client.get, url, params)
+                assert response.status_code == 200, (label, response.status_code)
+                samples.append(elapsed)
+            self.stdout.write(
+                f"{format_summary(label, samples)} queries={len(queries)}"
+            )
+
+        for label, func in (
+            ("exact count", User.objects.count),
+            ("estimated count", lambda: estimate_count(User.objects.all())),
+        ):
+            samples = [timed(func)[0] for _ in range(repeat)]
+            self.stdout.write(f"{format_summary(label, samples)} result={func()}")
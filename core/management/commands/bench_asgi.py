@@ -0,0 +1,292 @@
+import asyncio
+import datetime
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from profiles.models import Profile
+from users.common.bench import percentile
+from users.email_filter import bump_generation
+
+User = get_user_model()
+
+CSRF_TOKEN = "b" * 32  # Any 32-character secret passes when cookie and header match
+
+
+class _SlowInput(io.BytesIO):
+    """
+    ``wsgi.input`` of a client that needs ``delay`` seconds to send its body.
+    """
+
+    def __init__(self, body, delay):
+        super().__init__(body)
+        self.delay = delay
+
+    def read(self, size=-1):
+        if self.delay:
+            time.sleep(self.delay)
+            self.delay = 0
+        return super().read(size)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync WSGI and async ASGI request paths in-process. Logged-in "
+        "clients load profile pages at high concurrency, first alone and then "
+        "while slow clients trickle in login form bodies. WSGI gets a fixed pool "
+        "of worker threads, like a threaded server; ASGI runs every request as a "
+        "task on one event loop. Seeded users are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--clients", type=int, default=100)
+        parser.add_argument(
+            "--requests", type=int, default=5, help="Sequential requests per client."
+        )
+        parser.add_argument(
+            "--workers", type=int, default=8, help="WSGI worker threads."
+        )
+        parser.add_argument("--slow-clients", type=int, default=20)
+        parser.add_argument(
+            "--slow-ms",
+            type=int,
+            default=1000,
+            help="Time each slow client takes to send its request body.",
+        )
+
+    def handle(self, *args, **options):
+        self.prefix = f"bench-asgi-{time.time_ns()}"
+        with override_settings(RATELIMITS={}):
+            self.requests = self._seed(options["users"])
+            try:
+                for scenario, slow_clients in (
+                    ("concurrent", 0),
+                    ("slow_clients", options["slow_clients"]),
+                ):
+                    slow = [
+                        self._slow_request(i, options["slow_ms"] / 1000)
+                        for i in range(slow_clients)
+                    ]
+                    for mode, run in (
+                        ("wsgi", self._run_wsgi),
+                        ("asgi", self._run_asgi),
+                    ):
+                        result = run(slow, options)
+                        self.stdout.write(self._format(mode, scenario, result))
+            finally:
+                User.objects.filter(email__startswith=self.prefix).delete()
+
+    def _seed(self, total):
+        """
+        Create users with profiles; return one profile page request per user.
+        """
+
+        encoded = make_password("bench-asgi-Password1")
+        users = User.objects.bulk_create(
+            User(email=f"{self.prefix}-{i}@example.com", password=encoded)
+            for i in range(total)
+        )
+        profiles = Profile.objects.bulk_create(
+            Profile(
+                user=user,
+                first_name="Bench",
+                last_name=str(i),
+                search_name=f"bench {i}",
+                birthdate=datetime.date(2000, 1, 1),
+            )
+            for i, user in enumerate(users)
+        )
+        bump_generation()
+        requests = []
+        for user, profile in zip(users, profiles):
+            client = Client()
+            client.force_login(user)
+            requests.append(
+                {
+                    "method": "GET",
+                    "path": reverse(
+                        "profiles:index_with_pk", kwargs={"pk": profile.pk}
+                    ),
+                    "cookie": f"sessionid={client.cookies['sessionid'].value}",
+                    "body": b"",
+                    "delay": 0,
+                }
+            )
+        return requests
+
+    def _slow_request(self, i, delay):
+        return {
+            "method": "POST",
+            "path": reverse("users:login"),
+            "cookie": f"csrftoken={CSRF_TOKEN}",
+            "body": urlencode(
+                {"email": f"{self.prefix}-slow-{i}@example.com"}
+            ).encode(),
+            "delay": delay,
+        }
+
+    def _client_requests(self, client, options):
+        return [
+            self.requests[(client + i) % len(self.requests)]
+            for i in range(options["requests"])
+        ]
+
+    def _run_wsgi(self, slow, options):
+        handler = WSGIHandler()
+        self._wsgi_call(handler, self.requests[0])  # Warm up
+        with ThreadPoolExecutor(options["workers"]) as server:
+
+            def client(requests):
+                results = []
+                for request in requests:
+                    start = time.perf_counter()
+                    status = server.submit(self._wsgi_call, handler, request).result()
+                    results.append(((time.perf_counter() - start) * 1000, status))
+                return results
+
+            with ThreadPoolExecutor(len(slow) + options["clients"]) as clients:
+                slow_futures = [clients.submit(client, [request]) for request in slow]
+                start = time.perf_counter()
+                fast_futures = [
+                    clients.submit(client, self._client_requests(i, options))
+                    for i in range(options["clients"])
+                ]
+                fast = [result for f in fast_futures for result in f.result()]
+                wall = time.perf_counter() - start
+                slow_results = [result for f in slow_futures for result in f.result()]
+        return self._summarize(fast, slow_results, wall)
+
+    def _wsgi_call(self, handler, request):
+        statuses = []
+        environ = {
+            "REQUEST_METHOD": request["method"],
+            "PATH_INFO": request["path"],
+            "SCRIPT_NAME": "",
+            "QUERY_STRING": "",
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "REMOTE_ADDR": "127.0.0.1",
+            "HTTP_HOST": "localhost",
+            "HTTP_COOKIE": request["cookie"],
+            "HTTP_X_CSRFTOKEN": CSRF_TOKEN,
+            "CONTENT_TYPE": "application/x-www-form-urlencoded",
+            "CONTENT_LENGTH": str(len(request["body"])),
+            "wsgi.input": _SlowInput(request["body"], request["delay"]),
+            "wsgi.errors": sys.stderr,
+            "wsgi.url_scheme": "http",
+            "wsgi.version": (1, 0),
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        response = handler(
+            environ, lambda status, headers: statuses.append(int(status.split()[0]))
+        )
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()
+        return statuses[0]
+
+    def _run_asgi(self, slow, options):
+        handler = ASGIHandler()
+
+        async def client(requests):
+            results = []
+            for request in requests:
+                start = time.perf_counter()
+                status = await self._asgi_call(handler, request)
+                results.append(((time.perf_counter() - start) * 1000, status))
+            return results
+
+        async def run():
+            await self._asgi_call(handler, self.requests[0])  # Warm up
+            slow_tasks = [asyncio.create_task(client([request])) for request in slow]
+            start = time.perf_counter()
+            fast = await asyncio.gather(
+                *(
+                    client(self._client_requests(i, options))
+                    for i in range(options["clients"])
+                )
+            )
+            wall = time.perf_counter() - start
+            return fast, await asyncio.gather(*slow_tasks), wall
+
+        fast, slow_results, wall = asyncio.run(run())
+        return self._summarize(
+            [result for results in fast for result in results],
+            [result for results in slow_results for result in results],
+            wall,
+        )
+
+    async def _asgi_call(self, handler, request):
+        body = request["body"]
+        chunks = [body[i : i + 16] for i in range(0, len(body), 16)] or [b""]
+        delay = request["delay"] / len(chunks)
+        statuses = []
+
+        async def receive():
+            if not chunks:
+                # Django listens for a disconnect until the response is sent.
+                await asyncio.Event().wait()
+            if delay:
+                await asyncio.sleep(delay)
+            chunk = chunks.pop(0)
+            return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": request["method"],
+            "scheme": "http",
+            "path": request["path"],
+            "raw_path": request["path"].encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [
+                (b"host", b"localhost"),
+                (b"cookie", request["cookie"].encode()),
+                (b"x-csrftoken", CSRF_TOKEN.encode()),
+                (b"content-type", b"application/x-www-form-urlencoded"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("localhost", 80),
+        }
+        await handler(scope, receive, send)
+        return statuses[0]
+
+    def _summarize(self, fast, slow, wall):
+        samples = [elapsed for elapsed, _ in fast]
+        return {
+            "rps": len(fast) / wall,
+            "p50": percentile(samples, 50),
+            "p95": percentile(samples, 95),
+            "p99": percentile(samples, 99),
+            "errors": sum(1 for _, status in fast + slow if status != 200),
+        }
+
+    def _format(self, mode, scenario, result):
+        return (
+            f"{mode} {scenario}: {result['rps']:.1f} req/s "
+            f"p50={result['p50']:.1f}ms p95={result['p95']:.1f}ms "
+            f"p99={result['p99']:.1f}ms errors={result['errors']}"
+        )
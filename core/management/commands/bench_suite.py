@@ -0,0 +1,308 @@
+import datetime
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, teardown_databases
+from django.urls import reverse
+
+from profiles.models import Profile
+from users import presence
+from users.common.bench import percentile
+from users.email_filter import bump_generation
+
+User = get_user_model()
+
+PASSWORD = "bench-suite-Password1"
+QUERIES_RE = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+# Checked in; re-record it with --save-baseline on the machine that compares.
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, "core", "bench_baseline.json")
+# SQLite test databases are in memory by default, where concurrent writers
+# fail with "table is locked" instead of waiting; use a file.
+SQLITE_TEST_NAME = os.path.join(settings.BASE_DIR, "var", "bench_suite.sqlite3")
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic users and drive login, registration, password reset, "
+        "profile view and profile update (through HTMX where the UI uses it) at "
+        "rising concurrency. Reports throughput, latency percentiles and queries "
+        "per request for each endpoint, and fails if a result regressed past the "
+        "stored baseline. Runs against a test database, created and destroyed "
+        "like the test runner's, and private in-memory caches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+        parser.add_argument("--endpoint", nargs="+", help="Only run these endpoints.")
+        parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Store this run as the new baseline instead of comparing.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Allowed relative slowdown of p95 latency and throughput.",
+        )
+
+    def handle(self, *args, **options):
+        self.prefix = f"bench-suite-{time.time_ns()}"
+        self.sequence = count()
+        self.local = threading.local()
+        endpoints = self._endpoints()
+        names = options["endpoint"] or list(endpoints)
+        unknown = set(names) - set(endpoints)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+        if not options["save_baseline"] and not os.path.exists(options["baseline"]):
+            raise CommandError(
+                f"No baseline at {options['baseline']}; record one with "
+                "--save-baseline."
+            )
+
+        results = {}
+        with override_settings(
+            RATELIMITS={},
+            PROFILING_SERVER_TIMING=True,
+            EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+            # Cached profiles and sessions are keyed by primary key, which the
+            # test database reuses; keep them away from the real caches.
+            CACHES={
+                alias: {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                    "LOCATION": f"bench-suite-{alias}",
+                }
+                for alias in settings.CACHES
+            },
+        ):
+            old_config = self._setup_databases()
+            try:
+                self.users = self._seed(options["users"])
+                for name in names:
+                    results[name] = {}
+                    for concurrency in options["concurrency"]:
+                        result = self._run(
+                            endpoints[name], concurrency, options["requests"]
+                        )
+                        results[name][str(concurrency)] = result
+                        self.stdout.write(self._format(name, concurrency, result))
+            finally:
+                # Buffered last_seen writes belong to the test database.
+                presence.flush()
+                teardown_databases(old_config, verbosity=0)
+
+        if options["save_baseline"]:
+            os.makedirs(os.path.dirname(options["baseline"]), exist_ok=True)
+            with open(options["baseline"], "w") as file:
+                json.dump(results, file, indent=2)
+                file.write("\n")
+            self.stdout.write(f"Baseline saved to {options['baseline']}")
+        else:
+            self._compare(results, options["baseline"], options["tolerance"])
+
+    def _setup_databases(self):
+        for connection in connections.all():
+            test_settings = connection.settings_dict["TEST"]
+            if connection.vendor == "sqlite" and not test_settings.get("NAME"):
+                test_settings["NAME"] = SQLITE_TEST_NAME
+                os.makedirs(os.path.dirname(SQLITE_TEST_NAME), exist_ok=True)
+        return setup_databases(verbosity=0, interactive=False)
+
+    def _seed(self, total):
+        encoded = make_password(PASSWORD)
+        users = User.objects.bulk_create(
+            User(email=f"{self.prefix}-{i}@example.com", password=encoded)
+            for i in range(total)
+        )
+        profiles = Profile.objects.bulk_create(
+            Profile(
+                user=user,
+                first_name="Bench",
+                last_name=str(i),
+                search_name=f"bench {i}",
+                birthdate=datetime.date(2000, 1, 1),
+            )
+            for i, user in enumerate(users)
+        )
+        bump_generation()
+        self.profile_pks = [profile.pk for profile in profiles]
+        return users
+
+    def _client(self, htmx=False):
+        """
+        Return this worker thread's logged-in client.
+        """
+
+        key = f"client_{htmx}"
+        client = getattr(self.local, key, None)
+        if client is None:
+            user = self.users[next(self.sequence) % len(self.users)]
+            extra = {"HTTP_HX_REQUEST": "true"} if htmx else {}
+            client = Client(HTTP_HOST="localhost", **extra)
+            client.force_login(user)
+            setattr(self.local, key, client)
+        return client
+
+    def _endpoints(self):
+        """
+        Map endpoint names to ``(request, expected_status)``.
+        """
+
+        def anonymous():
+            return Client(HTTP_HOST="localhost", HTTP_HX_REQUEST="true")
+
+        def login(i):
+            return anonymous().post(
+                reverse("users:login"),
+                {"email": self.users[i % len(self.users)].email, "password": PASSWORD},
+            )
+
+        def login_invalid(i):
+            return anonymous().post(
+                reverse("users:login"),
+                {"email": self.users[i % len(self.users)].email, "password": "wrong"},
+            )
+
+        def register(i):
+            return anonymous().post(
+                reverse("users:register"),
+                {
+                    "user_form-email": f"{self.prefix}-new-{next(self.sequence)}@example.com",
+                    "user_form-password1": PASSWORD,
+                    "user_form-password2": PASSWORD,
+                    "profile_form-first_name": "Bench",
+                    "profile_form-last_name": "Register",
+                    "profile_form-sex": Profile.Sex.FEMALE,
+                    "profile_form-birthdate": "2000-01-01",
+                },
+            )
+
+        def password_reset(i):
+            return anonymous().post(
+                reverse("users:password_reset"),
+                {"email": self.users[i % len(self.users)].email},
+            )
+
+        def profile_view(i):
+            pk = self.profile_pks[i % len(self.profile_pks)]
+            return self._client().get(
+                reverse("profiles:index_with_pk", kwargs={"pk": pk})
+            )
+
+        def profile_update_form(i):
+            return self._client(htmx=True).get(reverse("profiles:update"))
+
+        def profile_update(i):
+            return self._client(htmx=True).post(
+                reverse("profiles:update"),
+                {
+                    "first_name": "Bench",
+                    "last_name": "Update",
+                    "sex": Profile.Sex.MALE,
+                    "birthdate": "2000-01-01",
+                    "bio": f"Updated {i}",
+                },
+            )
+
+        return {
+            "login": (login, 200),
+            "register": (register, 200),
+            "login_invalid": (login_invalid, 400),
+            "password_reset": (password_reset, 200),
+            "profile_view": (profile_view, 200),
+            "profile_update_form": (profile_update_form, 200),
+            "profile_update": (profile_update, 200),
+        }
+
+    def _run(self, endpoint, concurrency, total):
+        send, expected_status = endpoint
+
+        def call(i):
+            start = time.perf_counter()
+            response = send(i)
+            elapsed = (time.perf_counter() - start) * 1000
+            match = QUERIES_RE.search(response.get("Server-Timing", ""))
+            return (
+                elapsed,
+                int(match.group(1)) if match else 0,
+                response.status_code == expected_status,
+            )
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            calls = list(executor.map(call, range(total)))
+            # One task per worker thread, so each closes its own connections
+            # and the test database can be dropped at the end.
+            barrier = threading.Barrier(concurrency)
+            list(executor.map(lambda _: self._close(barrier), range(concurrency)))
+        wall = time.perf_counter() - start
+        samples = [elapsed for elapsed, _, _ in calls]
+        return {
+            "rps": total / wall,
+            "p50": percentile(samples, 50),
+            "p95": percentile(samples, 95),
+            "p99": percentile(samples, 99),
+            "queries": sum(queries for _, queries, _ in calls) / total,
+            "errors": sum(1 for _, _, ok in calls if not ok),
+        }
+
+    def _close(self, barrier):
+        barrier.wait()
+        connections.close_all()
+
+    def _format(self, name, concurrency, result):
+        return (
+            f"{name} c={concurrency}: {result['rps']:.1f} req/s "
+            f"p50={result['p50']:.1f}ms p95={result['p95']:.1f}ms "
+            f"p99={result['p99']:.1f}ms queries={result['queries']:.1f} "
+            f"errors={result['errors']}"
+        )
+
+    def _compare(self, results, path, tolerance):
+        with open(path) as file:
+            baseline = json.load(file)
+        regressions = []
+        for name, by_concurrency in results.items():
+            for concurrency, result in by_concurrency.items():
+                before = baseline.get(name, {}).get(concurrency)
+                if before is None:
+                    continue
+                label = f"{name} c={concurrency}"
+                if result["p95"] > before["p95"] * (1 + tolerance):
+                    regressions.append(
+                        f"{label}: p95 {before['p95']:.1f} -> {result['p95']:.1f}ms"
+                    )
+                if result["rps"] < before["rps"] * (1 - tolerance):
+                    regressions.append(
+                        f"{label}: {before['rps']:.1f} -> {result['rps']:.1f} req/s"
+                    )
+                if result["queries"] > before["queries"] + 0.5:
+                    regressions.append(
+                        f"{label}: queries {before['queries']:.1f} -> "
+                        f"{result['queries']:.1f}"
+                    )
+                if result["errors"] > before["errors"]:
+                    regressions.append(
+                        f"{label}: errors {before['errors']} -> {result['errors']}"
+                    )
+        if regressions:
+            raise CommandError(
+                "Regressions against baseline:\n" + "\n".join(regressions)
+            )
+        self.stdout.write(f"No regressions against {path}")
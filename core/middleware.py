@@ -0,0 +1,228 @@
+import cProfile
+import logging
+import os
+import random
+import re
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from users.presence import record_activity
+from . import profiling
+from .db import pinned_to_primary
+
+logger = logging.getLogger("core")
+
+PIN_COOKIE = "primary_until"
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Read-your-writes for clients that just wrote.
+
+    A write request sets a cookie holding the time until which that client's
+    reads stay on the primary; requests carrying an unexpired cookie (and all
+    writes) run inside ``pinned_to_primary``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        is_write = self._is_write(request)
+        if not self._needs_primary(request, is_write):
+            return self.get_response(request)
+        with pinned_to_primary():
+            response = self.get_response(request)
+        return self._pin(response) if is_write else response
+
+    async def __acall__(self, request):
+        is_write = self._is_write(request)
+        if not self._needs_primary(request, is_write):
+            return await self.get_response(request)
+        with pinned_to_primary():
+            response = await self.get_response(request)
+        return self._pin(response) if is_write else response
+
+    def _is_write(self, request):
+        return request.method not in ("GET", "HEAD", "OPTIONS", "TRACE")
+
+    def _needs_primary(self, request, is_write):
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        return bool(settings.DATABASE_REPLICAS) and (
+            is_write or pinned_until > time.time()
+        )
+
+    def _pin(self, response):
+        response.set_cookie(
+            PIN_COOKIE,
+            str(time.time() + settings.DATABASE_PIN_SECONDS),
+            max_age=settings.DATABASE_PIN_SECONDS,
+            httponly=True,
+            samesite="Lax",
+        )
+        return response
+
+
+class PresenceMiddleware:
+    """
+    Record that the logged-in user was active (see ``users.presence``).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if request.user.is_authenticated:
+            record_activity(request.user.pk)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        user = await request.auser()
+        if user.is_authenticated:
+            record_activity(user.pk)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Measure where each request's time goes.
+
+    Records query count and time (per statement, to spot N+1 loops), top-level
+    template render time, external HTTP time and profile cache hits, and
+    reports them in a ``Server-Timing`` header (``PROFILING_SERVER_TIMING``).
+    A ``PROFILING_SAMPLE_RATE`` fraction of requests also runs under cProfile,
+    dumped to ``PROFILING_DUMP_DIR`` for ``snakeviz``/``pstats``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile, token, sampler = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            self._stop(token, sampler)
+        return self._report(request, response, profile, sampler)
+
+    async def __acall__(self, request):
+        # Queries run in sync_to_async threads are still counted: the profile
+        # lives in a context variable, which those threads inherit. cProfile
+        # only sees the event loop's thread.
+        profile, token, sampler = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._stop(token, sampler)
+        return self._report(request, response, profile, sampler)
+
+    def _start(self):
+        profile, token = profiling.start()
+        sampler = None
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            sampler = cProfile.Profile()
+            sampler.enable()
+        return profile, token, sampler
+
+    def _stop(self, token, sampler):
+        if sampler is not None:
+            sampler.disable()
+        profiling.stop(token)
+
+    def _report(self, request, response, profile, sampler):
+        duplicates = profile.duplicate_queries(settings.PROFILING_DUPLICATE_QUERIES)
+        for sql, count in duplicates:
+            logger.warning(f"{request.path}: same query run {count} times: {sql}")
+        if settings.PROFILING_SERVER_TIMING:
+            response["Server-Timing"] = profile.server_timing(duplicates)
+        if sampler is not None:
+            self._dump(sampler, request, profile)
+        return response
+
+    def _dump(self, sampler, request, profile):
+        os.makedirs(settings.PROFILING_DUMP_DIR, exist_ok=True)
+        elapsed = (time.perf_counter() - profile.started) * 1000
+        slug = re.sub(r"[^\w-]+", "-", request.path).strip("-") or "root"
+        sampler.dump_stats(
+            os.path.join(
+                settings.PROFILING_DUMP_DIR,
+                f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{slug}-"
+                f"{elapsed:.0f}ms.prof",
+            )
+        )
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, usable in an async middleware chain.
+
+    ``WhiteNoiseMiddleware`` is sync-only, and a sync-only middleware near the
+    top of the chain makes Django run everything below it, views included, in
+    a thread under ASGI. Under ASGI this serves files through a worker thread
+    and streams them with an async iterator instead.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(
+                request.path_info
+            )
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+        response = await sync_to_async(self.serve, thread_sensitive=False)(
+            static_file, request
+        )
+        if response.streaming:
+            response.streaming_content = _aiter(response.streaming_content)
+        return response
+
+
+async def _aiter(iterator):
+    chunks = iter(iterator)
+    next_chunk = sync_to_async(next, thread_sensitive=False)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
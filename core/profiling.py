@@ -0,0 +1,153 @@
+"""
+Per-request profiling data, filled by ``core.middleware.ProfilingMiddleware``.
+
+Code outside the middleware reports into the current request's profile with
+``record``/``timer``; outside a profiled request both are no-ops.
+"""
+
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.template.backends.django import DjangoTemplates
+
+_current = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = defaultdict(float)  # Metric name -> milliseconds
+        self.counts = Counter()  # Metric name -> occurrences
+        self.queries = Counter()  # SQL -> executions
+
+    def record(self, name, duration_ms=0.0, count=1):
+        self.durations[name] += duration_ms
+        self.counts[name] += count
+
+    def duplicate_queries(self, threshold):
+        """
+        Return ``(sql, count)`` for statements run at least ``threshold`` times,
+        the usual sign of an N+1 loop.
+        """
+
+        return [
+            (sql, count) for sql, count in self.queries.items() if count >= threshold
+        ]
+
+    def server_timing(self, duplicates=()):
+        """
+        Format the profile as a ``Server-Timing`` header value.
+        """
+
+        metrics = [
+            f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}",
+            f'db;dur={self.durations["db"]:.1f};desc="{self.counts["db"]} queries"',
+        ]
+        for name, label in (("template", "tpl"), ("http", "http")):
+            if self.counts[name]:
+                metrics.append(
+                    f"{label};dur={self.durations[name]:.1f};"
+                    f'desc="{self.counts[name]} calls"'
+                )
+        cache = [
+            f"{name.split('.', 1)[1]}={count}"
+            for name, count in sorted(self.counts.items())
+            if name.startswith("cache.")
+        ]
+        if cache:
+            metrics.append(f'cache;desc="{" ".join(cache)}"')
+        if duplicates:
+            metrics.append(f'dup;desc="{len(duplicates)} repeated queries"')
+        return ", ".join(metrics)
+
+
+def start():
+    profile = RequestProfile()
+    return profile, _current.set(profile)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def record(name, duration_ms=0.0, count=1):
+    """
+    Add to a metric of the request being profiled, if any.
+    """
+
+    profile = _current.get()
+    if profile is not None:
+        profile.record(name, duration_ms, count)
+
+
+@contextmanager
+def timer(name):
+    """
+    Time the block into metric ``name`` of the request being profiled.
+    """
+
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record(name, (time.perf_counter() - started) * 1000)
+
+
+def query_recorder(execute, sql, params, many, context):
+    """
+    Execute wrapper timing every query of the request being profiled.
+    """
+
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record("db", (time.perf_counter() - started) * 1000)
+        profile.queries[sql] += 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    ``connection_created`` receiver adding ``query_recorder`` to every new
+    connection.
+
+    Installed per connection rather than per request, so the connections of
+    threads the async ORM runs queries in are covered too.
+    """
+
+    if query_recorder not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_recorder)
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+        self.origin = template.origin
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with timer("template"):
+            return self.template.render(context, request)
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """
+    Django template backend that reports top-level render time.
+    """
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
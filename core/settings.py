@@ -41,22 +41,27 @@ INSTALLED_APPS = [
     "django.contrib.contenttypes",
     "django.contrib.sessions",
     "django.contrib.messages",
-    "django.contrib.staticfiles",
+    "core.apps.StaticFilesConfig",
     "tailwind",
     "crispy_forms",
     "crispy_tailwind",
     "theme",
     "django_browser_reload",
+    "core",
     "home",
     "profiles",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.StaticFilesMiddleware",  # Async-capable WhiteNoise
+    "core.middleware.ProfilingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.ReplicaStickinessMiddleware",
+    "core.middleware.PresenceMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django_browser_reload.middleware.BrowserReloadMiddleware",
@@ -66,15 +71,26 @@ ROOT_URLCONF = "core.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.profiling.ProfilingDjangoTemplates",
         "DIRS": [os.path.join(BASE_DIR, "templates")],
-        "APP_DIRS": True,
         "OPTIONS": {
+            # Compiled templates are kept in memory; with DEBUG they are still
+            # reloaded when a template file changes.
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "profiles.context_processors.current_profile",
             ],
         },
     },
@@ -90,8 +106,114 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "CONN_MAX_AGE": 60,  # Reuse connections across requests for a minute
+        "CONN_HEALTH_CHECKS": True,  # ... after checking they still work
+    }
+}
+
+# Read replicas, e.g. DATABASE_REPLICA_NAMES=replica1.sqlite3,replica2.sqlite3
+# (local SQLite copies stand in for real replicas). Tests mirror them to the
+# primary.
+for index, name in enumerate(
+    filter(None, os.getenv("DATABASE_REPLICA_NAMES", "").split(",")), 1
+):
+    DATABASES[f"replica{index}"] = {
+        **DATABASES["default"],
+        "NAME": BASE_DIR / name,
+        "TEST": {"MIRROR": "default"},
     }
+
+DATABASE_ROUTERS = ["core.db.PrimaryReplicaRouter"]
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_PIN_SECONDS = 10  # Reads stay on the primary this long after a write
+
+# Applied to every new SQLite connection (core.db.configure_sqlite).
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  # Readers do not block the writer and vice versa
+    "synchronous": "NORMAL",  # Safe with WAL; fsync at checkpoints only
+    "mmap_size": 256 * 1024 * 1024,  # Read pages through a memory map
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,  # Milliseconds to wait for a lock before failing
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # {% cache %} fragments. Kept per process on purpose: fragments embed static
+    # file URLs, so they must not outlive a deploy. Per-user fragments are keyed
+    # by the profile version stamp, which lives in the shared default cache.
+    "template_fragments": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "template-fragments",
+        "OPTIONS": {"MAX_ENTRIES": 10_000},
+    },
+}
+
+PROFILE_CACHE_TIMEOUT = 60 * 5  # Seconds a profile stays in Django's cache
+PROFILE_CACHE_LOCAL_SIZE = 1024  # Profiles kept in each process' LRU
+PROFILE_CACHE_LOCAL_TTL = 5  # Seconds another process may serve a stale profile
+
+# Mixed into the ETags of profile pages (profiles.conditional), so a deploy
+# that changes their templates does not answer 304 with the old markup.
+PAGE_ETAG_SALT = os.getenv("RELEASE", "")
+
+PROFILE_SEARCH_BACKEND = None  # Dotted path; None picks one for the database vendor
+PROFILE_SEARCH_LIMIT = 10
+PROFILE_SEARCH_CACHE_TIMEOUT = 60  # Seconds search results stay cached
+
+FEED_PAGE_SIZE = 20
+FEED_FANOUT_LIMIT = 10_000  # Authors with more followers are merged in on read
+FEED_FANOUT_BATCH_SIZE = 1000  # Timeline rows per INSERT when fanning out
+
+
+# Authentication
+
+AUTHENTICATION_BACKENDS = ["users.backends.PooledModelBackend"]
+PASSWORD_HASH_WORKERS = None  # Processes verifying password hashes; None = CPU count
+USER_CACHE_SIZE = 1024  # Users (with profile) kept per process for request.user
+USER_CACHE_TTL = 5  # Seconds another process may serve a stale user
+
+# Last-seen tracking (users.presence).
+PRESENCE_RESOLUTION = 60  # Seconds between writes of one user's activity
+PRESENCE_FLUSH_INTERVAL = 5  # Seconds activity is buffered before a bulk write
+PRESENCE_BATCH_SIZE = 500  # Users per UPDATE statement
+PRESENCE_ONLINE_SECONDS = 5 * 60  # Users seen this recently are shown online
+# Seconds presence stays cached, if the default cache is shared between
+# processes; with a per-process cache, PRESENCE_RESOLUTION.
+PRESENCE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Sessions are read from the cache and written through to the database.
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+
+# Rate limits per view scope: {key type: (attempts, window in seconds)}.
+RATELIMITS = {
+    "login": {"ip": (20, 60), "email": (10, 60 * 15)},
+    "register": {"ip": (5, 60 * 60)},
+    "password_reset": {"ip": (5, 60 * 60), "email": (3, 60 * 60)},
 }
+RATELIMIT_BACKEND = "users.common.ratelimit.CacheBackend"
+# RATELIMIT_BACKEND = "users.common.ratelimit.MemoryBackend"
+RATELIMIT_CACHE = "default"
+RATELIMIT_IP_META_KEY = "REMOTE_ADDR"  # e.g. "HTTP_X_REAL_IP" behind a proxy
+
+# Admin changelists of large tables (users.common.admin).
+ADMIN_COUNT_LIMIT = 10_000  # Filtered results are counted up to this many rows
+ADMIN_SEARCH_LIMIT = 1000  # Profiles a name search in the admin returns
+
+
+# Answer "no such email" from a Bloom filter (users.email_filter). None: only if
+# the default cache is shared between processes, as the filters of other
+# processes learn about new users through it.
+EMAIL_FILTER_ENABLED = None
+EMAIL_FILTER_ERROR_RATE = 0.01  # Target false-positive rate
+EMAIL_FILTER_MIN_CAPACITY = 10_000  # The filter is sized for max(2 x users, this)
+EMAIL_FILTER_PATH = None  # File to persist the filter to, e.g. BASE_DIR / "email_filter.bin"
 
 
 # Password validation
@@ -105,12 +227,15 @@ AUTH_PASSWORD_VALIDATORS = [
         "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
     },
     {
-        "NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",
+        # Django's common passwords until build_breached_passwords has run.
+        "NAME": "users.breached_passwords.BreachedPasswordValidator",
     },
     {
         "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
     },
 ]
+# Memory-mapped index of breached passwords (users.breached_passwords).
+BREACHED_PASSWORDS_PATH = os.path.join(BASE_DIR, "var", "breached_passwords.idx")
 
 
 # Internationalization
@@ -130,10 +255,41 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
+STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")  # Filled by collectstatic
+
+# collectstatic fingerprints every file (name.<hash>.css) and writes .gz and .br
+# siblings; WhiteNoise serves those with a one-year immutable Cache-Control.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+    },
+    # Profile images: deduplicated by content hash (profiles.storage).
+    "profile_media": {
+        "BACKEND": "profiles.storage.ContentAddressedStorage",
+    },
+}
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media') # Directory where uploaded media is saved.
 MEDIA_URL = '/media/' # Public URL at the browser
 
+# Widths (px) of the resized copies built for profile images (profiles.images).
+PROFILE_IMAGE_VARIANT_WIDTHS = {
+    "avatar": [64, 128, 256],
+    "cover_image": [640, 1280],
+}
+PROFILE_IMAGE_QUALITY = 80
+PROFILE_IMAGE_WORKERS = 2  # Processes resizing uploads in the background
+MEDIA_GC_GRACE_SECONDS = 60 * 60  # Unreferenced blobs kept this long (gc_media)
+
+# Remote pictures (e.g. Google avatars) copied into local storage (profiles.avatars).
+PROFILE_AVATAR_INGEST_WORKERS = 4  # Threads downloading them
+PROFILE_AVATAR_INGEST_SIZE = 512  # Max pixels per side of the stored copy
+PROFILE_AVATAR_INGEST_MAX_BYTES = 5 * 1024 * 1024
+PROFILE_AVATAR_INGEST_TIMEOUT = 15  # Seconds for a whole download
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
@@ -150,7 +306,9 @@ INTERNAL_IPS = [
 
 NPM_BIN_PATH = r"D:\Program\Node\npm.cmd"
 
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# Emails are queued in the database and delivered over SMTP by `manage.py send_outbox`.
+EMAIL_BACKEND = "users.mail.OutboxEmailBackend"
+# EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 # EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 EMAIL_HOST = "smtp.gmail.com"  # Replace with your SMTP server
 EMAIL_PORT = 587  # Typically 587 for TLS, 465 for SSL
@@ -160,13 +318,15 @@ EMAIL_HOST_USER = str(os.getenv("EMAIL_USER"))
 EMAIL_HOST_PASSWORD = str(os.getenv("EMAIL_PASSWORD"))
 DEFAULT_FROM_EMAIL = "Social_app"
 PASSWORD_RESET_TIMEOUT = 60 * 60 * 6  # 24 hours
+OUTBOX_BATCH_SIZE = 100  # Emails sent per SMTP session
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BACKOFF = 60  # Seconds before the first retry, doubled each time
+OUTBOX_CLAIM_TIMEOUT = 600  # Seconds before a crashed worker's batch is retried
 
 LOGIN_REDIRECT_URL = "home"
 LOGIN_URL = "users:login"
 LOGOUT_REDIRECT_URL = "users:login"
 
-# STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
-
 GOOGLE_CLIENT_ID = str(os.getenv("GOOGLE_CLIENT_ID"))
 GOOGLE_CLIENT_SECRET = str(os.getenv("GOOGLE_CLIENT_SECRET"))
 GOOGLE_REDIRECT_URI = str(os.getenv("GOOGLE_REDIRECT_URI"))
@@ -193,5 +353,31 @@ LOGGING = {
             "level": "DEBUG",
             "propagate": True,
         },
+        "profiles": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": True,
+        },
+        "core": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": True,
+        },
     },
 }
+
+# Request profiling (core.middleware.ProfilingMiddleware).
+PROFILING_SERVER_TIMING = DEBUG  # Send the Server-Timing header
+PROFILING_DUPLICATE_QUERIES = 5  # Warn when one statement runs this often
+PROFILING_SAMPLE_RATE = 0.0  # Fraction of requests run under cProfile
+PROFILING_DUMP_DIR = os.path.join(BASE_DIR, "var", "cprofile")
+
+# Outbound HTTP client shared by third-party integrations (users.common.http).
+HTTP_CLIENT_POOL_SIZE = 20  # Keep-alive connections kept per host
+HTTP_CLIENT_MAX_CONCURRENCY = 20  # Requests in flight per process
+HTTP_CLIENT_CONNECT_TIMEOUT = 3.05  # Seconds
+HTTP_CLIENT_READ_TIMEOUT = 10  # Seconds
+
+# Google ID tokens are verified locally against these keys (users.common.jwks).
+GOOGLE_JWKS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ID_TOKEN_ISSUERS = ["https://accounts.google.com", "accounts.google.com"]
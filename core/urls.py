@@ -10,6 +10,7 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("", HomeView.as_view(), name="index"),
     path("home/", HomeView.as_view(), name="index"),
+    path("feed/", include("home.urls")),
     path("users/", include("users.urls")),
     path("profiles/", include("profiles.urls")),
     path("__reload__/", include("django_browser_reload.urls")),
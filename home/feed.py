@@ -0,0 +1,159 @@
+"""
+Home timeline engine.
+
+Posts are written once. For authors with at most ``FEED_FANOUT_LIMIT``
+followers the post is copied into each follower's timeline on write, so
+reading a feed is one index range scan. Posts by authors above the limit are
+not fanned out; readers merge them in from the ``Post`` table instead. An
+author stays merged in (``Profile.feed_pulled``) after dropping back below
+the limit, since those posts are in no timeline. Unfollowing drops the
+author's posts from the follower's timeline (``home.signals``).
+
+Pages are addressed by an opaque ``(created_at, post_id)`` cursor rather than
+an offset, so page N costs the same as page 1.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from profiles.cache import invalidate_profile
+from profiles.models import Follow, Profile
+from .models import Post, TimelineEntry
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MAX_POST_ID = 2**63 - 1  # BigAutoField
+
+
+def publish(author, body):
+    """
+    Create a post and deliver it to the author's and followers' timelines.
+
+    Returns:
+        Post: The new post.
+    """
+
+    with transaction.atomic():
+        post = Post.objects.create(author=author, body=body)
+        owner_ids = [author.pk]
+        if author.followers_count <= settings.FEED_FANOUT_LIMIT:
+            owner_ids += Follow.objects.filter(followee=author).values_list(
+                "follower_id", flat=True
+            )
+        elif Profile.objects.filter(pk=author.pk, feed_pulled=False).update(
+            feed_pulled=True, **Profile.change_stamp()
+        ):
+            transaction.on_commit(lambda: invalidate_profile(author))
+        fan_out(post, owner_ids)
+    return post
+
+
+def fan_out(post, owner_ids):
+    batch_size = settings.FEED_FANOUT_BATCH_SIZE
+    owner_ids = list(owner_ids)
+    for start in range(0, len(owner_ids), batch_size):
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(owner_id=owner_id, post=post, created_at=post.created_at)
+                for owner_id in owner_ids[start : start + batch_size]
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def get_feed_page(profile, cursor=None, size=None):
+    """
+    Return one page of ``profile``'s home timeline, newest first.
+
+    Args:
+        profile (Profile): The reader.
+        cursor (str): The ``next_cursor`` of the previous page, or None.
+        size (int): Posts per page, ``FEED_PAGE_SIZE`` by default.
+
+    Returns:
+        tuple: ``(posts, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+
+    size = size or settings.FEED_PAGE_SIZE
+    posts = list(_page_query(profile, decode_cursor(cursor), size))
+    return posts, _next_cursor(posts, size)
+
+
+async def aget_feed_page(profile, cursor=None, size=None):
+    """
+    Async counterpart of ``get_feed_page``.
+    """
+
+    size = size or settings.FEED_PAGE_SIZE
+    posts = [post async for post in _page_query(profile, decode_cursor(cursor), size)]
+    return posts, _next_cursor(posts, size)
+
+
+def _page_query(profile, after, size):
+    """
+    Return the query for one page of posts, newest first: the reader's
+    fanned-out timeline merged with the posts pulled from big authors.
+
+    Both sources are sub-selects of at most ``size`` ids, each an index range
+    scan, so the page and its authors come back in a single round trip.
+    """
+
+    entries = TimelineEntry.objects.filter(owner=profile)
+    if after:
+        entries = entries.filter(_before(after, "post_id"))
+    entries = entries.order_by("-created_at", "-post_id").values("post_id")[:size]
+
+    celebrity_ids = Follow.objects.filter(
+        follower=profile, followee__feed_pulled=True
+    ).values_list("followee_id", flat=True)
+    pulled = Post.objects.filter(author_id__in=celebrity_ids)
+    if after:
+        pulled = pulled.filter(_before(after, "id"))
+    pulled = pulled.order_by("-created_at", "-id").values("id")[:size]
+
+    # Timeline entries carry their post's created_at, so the posts sort the
+    # same way the entries do.
+    return (
+        Post.objects.filter(Q(pk__in=entries) | Q(pk__in=pulled))
+        .select_related("author")
+        .order_by("-created_at", "-id")[:size]
+    )
+
+
+def _next_cursor(posts, size):
+    if len(posts) < size:
+        return None
+    return encode_cursor(posts[-1].created_at, posts[-1].pk)
+
+
+def encode_cursor(created_at, post_id):
+    delta = created_at - EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f"{micros}_{post_id}"
+
+
+def decode_cursor(cursor):
+    """
+    Return the ``(created_at, post_id)`` of ``cursor``, or None (the first
+    page) if it is missing or malformed.
+    """
+
+    if not cursor:
+        return None
+    try:
+        micros, post_id = (int(part) for part in cursor.split("_", 1))
+        created_at = EPOCH + timedelta(microseconds=micros)
+    except (ValueError, OverflowError):
+        return None
+    if not 0 < post_id <= MAX_POST_ID:
+        return None
+    return created_at, post_id
+
+
+def _before(after, id_field):
+    created_at, post_id = after
+    return Q(created_at__lt=created_at) | Q(
+        created_at=created_at, **{f"{id_field}__lt": post_id}
+    )
@@ -0,0 +1,15 @@
+from django import forms
+
+from .models import Post
+
+
+class PostForm(forms.ModelForm):
+
+    class Meta:
+        model = Post
+        fields = ("body",)
+        widgets = {
+            "body": forms.Textarea(
+                attrs={"rows": 3, "placeholder": "What's on your mind?"}
+            ),
+        }
@@ -0,0 +1,110 @@
+import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from home.feed import get_feed_page
+from home.models import Post, TimelineEntry
+from profiles.models import Follow, Profile
+from users.common.bench import format_summary, timed
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large home timeline and report p50/p99 feed page latency. "
+        "Everything is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--entries", type=int, default=100_000)
+        parser.add_argument("--authors", type=int, default=100)
+        parser.add_argument(
+            "--celebrity-posts",
+            type=int,
+            default=1_000,
+            help="Posts by a followed account above FEED_FANOUT_LIMIT.",
+        )
+        parser.add_argument("--pages", type=int, default=500)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            reader = self._seed(options)
+            self._measure(reader, options["pages"])
+            transaction.set_rollback(True)
+
+    def _seed(self, options):
+        stamp = timezone.now().strftime("%Y%m%d%H%M%S%f")
+        users = User.objects.bulk_create(
+            User(email=f"bench-feed-{stamp}-{i}@example.com", password="!")
+            for i in range(options["authors"] + 2)
+        )
+        profiles = Profile.objects.bulk_create(
+            Profile(
+                user=user,
+                first_name="Bench",
+                last_name=str(i),
+                birthdate=datetime.date(2000, 1, 1),
+            )
+            for i, user in enumerate(users)
+        )
+        reader, celebrity, authors = profiles[0], profiles[1], profiles[2:]
+        celebrity.followers_count = settings.FEED_FANOUT_LIMIT + 1
+        celebrity.save(update_fields=["followers_count"])
+        Follow.objects.create(follower=reader, followee=celebrity)
+
+        now = timezone.now()
+        batch_size = settings.FEED_FANOUT_BATCH_SIZE
+        for start in range(0, options["entries"], batch_size):
+            posts = Post.objects.bulk_create(
+                Post(
+                    author=authors[i % len(authors)],
+                    body=f"Post {i}",
+                    created_at=now - datetime.timedelta(seconds=i),
+                )
+                for i in range(start, min(start + batch_size, options["entries"]))
+            )
+            TimelineEntry.objects.bulk_create(
+                TimelineEntry(owner=reader, post=post, created_at=post.created_at)
+                for post in posts
+            )
+        Post.objects.bulk_create(
+            (
+                Post(
+                    author=celebrity,
+                    body=f"Celebrity post {i}",
+                    created_at=now - datetime.timedelta(seconds=i * 7, microseconds=1),
+                )
+                for i in range(options["celebrity_posts"])
+            ),
+            batch_size=batch_size,
+        )
+        self.stdout.write(
+            f"Seeded {options['entries']} timeline rows and "
+            f"{options['celebrity_posts']} fan-out-on-read posts."
+        )
+        return reader
+
+    def _measure(self, reader, pages):
+        first_page = []
+        for _ in range(pages):
+            elapsed, _ = timed(get_feed_page, reader)
+            first_page.append(elapsed)
+
+        walk = []
+        cursor = None
+        for _ in range(pages):
+            elapsed, (posts, cursor) = timed(get_feed_page, reader, cursor)
+            walk.append(elapsed)
+            if cursor is None:
+                break
+
+        self.stdout.write(format_summary("page 1", first_page))
+        self.stdout.write(format_summary(f"pages 1-{len(walk)}", walk))
+        self.stdout.write(
+            format_summary(f"last {len(walk) // 10} pages", walk[-(len(walk) // 10) :])
+        )
@@ -0,0 +1,79 @@
+import copy
+import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from profiles.models import Profile
+from users.common.bench import format_summary, timed
+
+User = get_user_model()
+
+
+def _uncached_settings():
+    templates = copy.deepcopy(settings.TEMPLATES)
+    for engine in templates:
+        loaders = engine["OPTIONS"].pop("loaders", None)
+        if loaders:
+            engine["OPTIONS"]["loaders"] = loaders[0][1]
+    caches = copy.deepcopy(settings.CACHES)
+    caches["template_fragments"] = {
+        "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+    }
+    return {"TEMPLATES": templates, "CACHES": caches}
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the main pages and HTMX error fragments repeatedly and report "
+        "render time with and without the cached template loader and fragment "
+        "cache. Everything is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self._seed()
+            for label, overrides in (
+                ("uncached", _uncached_settings()),
+                ("cached", {}),
+            ):
+                with override_settings(RATELIMITS={}, **overrides):
+                    self._measure(label, user, options["requests"])
+            transaction.set_rollback(True)
+
+    def _seed(self):
+        stamp = timezone.now().strftime("%Y%m%d%H%M%S%f")
+        user = User.objects.create_user(
+            email=f"bench-render-{stamp}@example.com", password=None
+        )
+        Profile.objects.create(
+            user=user,
+            first_name="Bench",
+            last_name="Render",
+            birthdate=datetime.date(2000, 1, 1),
+        )
+        return user
+
+    def _measure(self, label, user, total):
+        reader = Client(HTTP_HOST="localhost")
+        reader.force_login(user)
+        anonymous = Client(HTTP_HOST="localhost", HTTP_HX_REQUEST="true")
+        pages = {
+            "home": lambda: reader.get(reverse("index")),
+            "profile": lambda: reader.get(reverse("profiles:index")),
+            "login": lambda: anonymous.get(reverse("users:login")),
+            "login error": lambda: anonymous.post(reverse("users:login"), {}),
+            "register error": lambda: anonymous.post(reverse("users:register"), {}),
+        }
+        for name, fetch in pages.items():
+            fetch()  # Warm up
+            samples = [timed(fetch)[0] for _ in range(total)]
+            self.stdout.write(format_summary(f"{label} {name}", samples))
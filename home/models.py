@@ -1,3 +1,51 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+from profiles.models import Profile
+
+
+class Post(models.Model):
+    author = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="posts", db_index=False
+    )
+    body = models.TextField(max_length=1000)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Fan-out-on-read pages through an author's posts newest first.
+            models.Index(
+                fields=["author", "-created_at", "-id"], name="post_author_created_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.author_id}: {self.body[:30]}"
+
+
+class TimelineEntry(models.Model):
+    """
+    A post delivered to one reader's home timeline (fan-out on write).
+
+    ``created_at`` is copied from the post so a timeline page is a single
+    index range scan on (owner, created_at, post) without joining posts.
+    """
+
+    owner = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="+", db_index=False
+    )
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "post"], name="unique_timeline_post"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["owner", "-created_at", "-post"],
+                name="timeline_owner_created_idx",
+            ),
+        ]
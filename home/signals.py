@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from profiles.models import Follow
+from .models import TimelineEntry
+
+
+@receiver(post_delete, sender=Follow)
+def drop_unfollowed_posts(sender, instance, origin=None, **kwargs):
+    # Only for unfollows: when a profile or its user is deleted, its timeline
+    # and posts go with it anyway.
+    if not (isinstance(origin, Follow) or getattr(origin, "model", None) is Follow):
+        return
+    TimelineEntry.objects.filter(
+        owner_id=instance.follower_id, post__author_id=instance.followee_id
+    ).delete()
@@ -1,3 +1,104 @@
-from django.test import TestCase
+from django.test import override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from profiles.follows import follow, unfollow
+from users.common.testing import AppTestCase, QueryBudgetMixin, create_profile
+from .feed import EPOCH, decode_cursor, encode_cursor, get_feed_page, publish
+from .models import TimelineEntry
+
+
+class FeedPageBudgetTests(QueryBudgetMixin, AppTestCase):
+    # The user and profile, plus the feed page with its posts and authors.
+    budgets = ("index", "home:feed")
+    expected_text = "Hello"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = create_profile("reader")
+        author = create_profile("author")
+        follow(cls.profile, author)
+        publish(author, "Hello")
+
+
+class FeedTests(AppTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_profile("reader")
+        cls.author = create_profile("author")
+        follow(cls.reader, cls.author)
+
+    def _bodies(self):
+        posts, _ = get_feed_page(self.reader)
+        return [post.body for post in posts]
+
+    def test_unfollow_drops_author_posts(self):
+        publish(self.author, "Fanned out")
+        other = create_profile("other")
+        follow(self.reader, other)
+        publish(other, "Still followed")
+        self.assertEqual(self._bodies(), ["Still followed", "Fanned out"])
+
+        unfollow(self.reader, self.author)
+        self.assertEqual(self._bodies(), ["Still followed"])
+        # The author's own timeline keeps the post.
+        self.assertTrue(TimelineEntry.objects.filter(owner=self.author).exists())
+
+    def test_posts_pulled_while_above_limit_stay_after_dropping_below(self):
+        self.author.refresh_from_db()  # follow() counts with F-expressions
+        with override_settings(FEED_FANOUT_LIMIT=0):
+            publish(self.author, "Pulled")
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.reader).exists())
+        self.assertEqual(self._bodies(), ["Pulled"])
+
+        publish(self.author, "Fanned out")
+        self.assertEqual(self._bodies(), ["Fanned out", "Pulled"])
+
+    @override_settings(FEED_PAGE_SIZE=3)
+    def test_cursor_pages_are_disjoint_and_complete(self):
+        self.author.refresh_from_db()
+        # Two posts pulled in on read, the rest fanned out, some sharing a
+        # created_at, so pages have to break ties by post id.
+        with override_settings(FEED_FANOUT_LIMIT=0):
+            pulled = [publish(self.author, f"Pulled {i}") for i in range(2)]
+        posts = pulled + [publish(self.author, f"Fanned out {i}") for i in range(5)]
+        TimelineEntry.objects.filter(post__in=posts[3:5]).update(
+            created_at=posts[2].created_at
+        )
+        for post in posts[3:5]:
+            post.created_at = posts[2].created_at
+            post.save(update_fields=["created_at"])
+        expected = sorted(posts, key=lambda post: (post.created_at, post.pk))[::-1]
+
+        seen, cursor = [], None
+        self.client.force_login(self.reader.user)
+        while True:
+            response = self.client.get(
+                reverse("home:feed"), {"cursor": cursor} if cursor else {}
+            )
+            page = list(response.context["posts"])
+            self.assertLessEqual(len(page), 3)
+            seen += page
+            cursor = response.context["next_cursor"]
+            if cursor is None:
+                break
+            self.assertContains(response, f"?cursor={cursor}")
+        self.assertEqual([post.pk for post in seen], [post.pk for post in expected])
+
+    def test_malformed_cursor_returns_first_page(self):
+        publish(self.author, "First")
+        self.client.force_login(self.reader.user)
+        cursors = [
+            "nonsense",
+            "12_",
+            "99999999999999999999_1",  # Past timedelta's range
+            f"{300_000 * 365 * 86400 * 10**6}_1",  # Past year 9999
+            "1_99999999999999999999999",  # Past the id column's range
+            "1_-1",
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+                response = self.client.get(reverse("home:feed"), {"cursor": cursor})
+                self.assertContains(response, "First")
+        created_at, post_id = decode_cursor(encode_cursor(EPOCH, 7))
+        self.assertEqual((created_at, post_id), (EPOCH, 7))
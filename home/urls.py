@@ -0,0 +1,10 @@
+from django.urls import path
+
+from .views import FeedView, PostCreateView
+
+app_name = "home"
+
+urlpatterns = [
+    path("", FeedView.as_view(), name="feed"),
+    path("posts/", PostCreateView.as_view(), name="post_create"),
+]
@@ -1,8 +1,63 @@
-from django.shortcuts import render
-from django.views.generic import TemplateView
+from django.shortcuts import render, redirect
+from django.views import View
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+
+from core.db import ReplicaReadMixin
+from profiles.cache import get_profile_for_user
+from users.common.asyncviews import AsyncViewMixin
+from users.common.common import is_htmx
+from .feed import aget_feed_page, get_feed_page, publish
+from .forms import PostForm
 
 # Create your views here.
 
-class HomeView(TemplateView):
-    template_name = 'home/home.html'
-    
\ No newline at end of file
+
+class HomeView(ReplicaReadMixin, AsyncViewMixin, View):
+    template_name = "home/home.html"
+
+    async def get(self, request):
+        context = {}
+        profile = request.current_profile
+        if profile is not None:
+            posts, next_cursor = await aget_feed_page(profile)
+            context.update(
+                {"post_form": PostForm(), "posts": posts, "next_cursor": next_cursor}
+            )
+        return render(request, self.template_name, context)
+
+
+class FeedView(ReplicaReadMixin, LoginRequiredMixin, View):
+    template_name = "home/_feed_page.html"
+
+    def get(self, request):
+        profile = get_profile_for_user(request.user.pk)
+        posts, next_cursor = (
+            get_feed_page(profile, request.GET.get("cursor"))
+            if profile is not None
+            else ([], None)
+        )
+        return render(
+            request,
+            self.template_name,
+            {"posts": posts, "next_cursor": next_cursor},
+        )
+
+
+class PostCreateView(LoginRequiredMixin, View):
+
+    def post(self, request):
+        form = PostForm(request.POST)
+        profile = get_profile_for_user(request.user.pk)
+        if form.is_valid() and profile is not None:
+            post = publish(profile, form.cleaned_data["body"])
+            if is_htmx(request):
+                return render(request, "home/_post.html", {"post": post})
+            return redirect("index")
+        if is_htmx(request):
+            html = render_to_string(
+                "home/_post_form.html", {"post_form": form}, request=request
+            )
+            return JsonResponse({"html": html}, status=400)
+        return redirect("index")
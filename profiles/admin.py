@@ -1,6 +1,31 @@
+from django.conf import settings
 from django.contrib import admin
+from django.db import connections
+
+from users.common.admin import LargeTableAdminMixin
+from users.common.common import normalize_name
 from .models import Profile
+from .search import get_search_backend
+
 
+@admin.register(Profile)
+class ProfileAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ["__str__", "user", "sex", "followers_count", "following_count"]
+    list_select_related = ["user"]
+    list_filter = ["sex"]
+    # Searched through the name search index (profiles.search).
+    search_fields = ["search_name"]
+    search_help_text = "Names containing words starting with the search terms."
+    ordering = ["-pk"]
+    raw_id_fields = ["user"]
+    readonly_fields = ["version", "updated_at"]
 
-# Register your models here.
-admin.site.register(Profile)
\ No newline at end of file
+    def get_search_results(self, request, queryset, search_term):
+        query = normalize_name(search_term)
+        if not query:
+            return queryset, False
+        db = connections[queryset.db]
+        ids = get_search_backend(db.vendor).search(
+            db, query, settings.ADMIN_SEARCH_LIMIT
+        )
+        return queryset.filter(pk__in=ids), False
@@ -0,0 +1,145 @@
+"""
+Local copies of remote profile pictures, such as Google account avatars.
+
+Signing in only records the picture URL and calls ``schedule_ingest``. A
+background thread downloads the picture (with the outbound HTTP timeouts and a
+size cap), a worker process validates and resizes it, and the result is stored
+in ``profile_images/`` like an upload, followed by its responsive variants.
+Later sign-ins schedule a refresh, which sends the stored ETag and stops at
+``304 Not Modified``.
+"""
+
+import logging
+import time
+
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+
+from users.common import http
+from users.common.pools import get_process_pool, get_thread_pool
+from .cache import invalidate_profile
+from .images import render_avatar, schedule_variants
+from .models import Profile
+from .storage import change_references, referenced_files
+
+logger = logging.getLogger("profiles")
+
+
+def schedule_ingest(profile, url):
+    """
+    Queue a download of ``url`` as ``profile``'s avatar, unless it cannot have
+    changed.
+
+    An avatar the user uploaded is never replaced. A picture already ingested
+    from ``url`` is only checked again if its ETag is known, as that makes the
+    check a conditional request.
+    """
+
+    if not url:
+        return
+    if profile.avatar and (
+        not profile.avatar_source_url
+        or (url == profile.avatar_source_url and not profile.avatar_source_etag)
+    ):
+        return
+    get_thread_pool("avatars", settings.PROFILE_AVATAR_INGEST_WORKERS).submit(
+        _ingest, profile.pk, url
+    )
+
+
+def _ingest(pk, url):
+    try:
+        profile = Profile.objects.only(
+            "user_id",
+            "avatar",
+            "avatar_variants",
+            "avatar_source_url",
+            "avatar_source_etag",
+        ).get(pk=pk)
+        headers = {}
+        if profile.avatar and url == profile.avatar_source_url:
+            # schedule_ingest only lets this through with a known ETag.
+            headers["If-None-Match"] = profile.avatar_source_etag
+        data, etag = _download(url, headers)
+        if data is None:
+            return  # Not modified
+        data = (
+            get_process_pool("images", settings.PROFILE_IMAGE_WORKERS)
+            .submit(
+                render_avatar,
+                data,
+                settings.PROFILE_AVATAR_INGEST_SIZE,
+                settings.PROFILE_IMAGE_QUALITY,
+            )
+            .result()
+        )
+        _store(profile, url, etag, data)
+    except Profile.DoesNotExist:
+        pass
+    except (requests.RequestException, ValueError) as exc:
+        logger.warning(f"Could not ingest avatar {url} for profile {pk}: {exc}")
+    except Exception:
+        logger.exception(f"Failed to ingest avatar {url} for profile {pk}")
+    finally:
+        close_old_connections()
+
+
+def _download(url, headers):
+    """
+    Fetch a picture.
+
+    Returns:
+        tuple: ``(data, etag)``, or ``(None, None)`` if it was not modified.
+    """
+
+    limit = settings.PROFILE_AVATAR_INGEST_MAX_BYTES
+    deadline = time.monotonic() + settings.PROFILE_AVATAR_INGEST_TIMEOUT
+    with http.stream("GET", url, headers=headers) as response:
+        if response.status_code == 304:
+            return None, None
+        response.raise_for_status()
+        if not response.headers.get("Content-Type", "").startswith("image/"):
+            raise ValueError(f"Not an image: {response.headers.get('Content-Type')}")
+        if int(response.headers.get("Content-Length") or 0) > limit:
+            raise ValueError(f"Larger than {limit} bytes")
+        data = bytearray()
+        for chunk in response.iter_content(64 * 1024):
+            data += chunk
+            if len(data) > limit:
+                raise ValueError(f"Larger than {limit} bytes")
+            if time.monotonic() > deadline:
+                raise requests.Timeout(
+                    f"Download took over {settings.PROFILE_AVATAR_INGEST_TIMEOUT}s"
+                )
+        return bytes(data), response.headers.get("ETag", "")[:200]
+
+
+def _store(profile, url, etag, data):
+    field = Profile._meta.get_field("avatar")
+    name = field.storage.save(f"{field.upload_to}/remote.jpg", ContentFile(data))
+    previous = profile.avatar.name
+    with transaction.atomic():
+        # Skip the write if the user uploaded an avatar while we were working;
+        # the unreferenced copy is left to gc_media.
+        updated = Profile.objects.filter(pk=profile.pk, avatar=previous).update(
+            avatar=name,
+            avatar_source_url=url,
+            avatar_source_etag=etag,
+            avatar_variants={},
+            **Profile.change_stamp(),
+        )
+        if not updated:
+            return
+        # QuerySet.update() bypasses the signals that count references.
+        change_references([name], 1)
+        change_references(
+            referenced_files(
+                {"avatar": previous, "avatar_variants": profile.avatar_variants}
+            ),
+            -1,
+        )
+    profile.avatar = name
+    invalidate_profile(profile)
+    schedule_variants(profile, "avatar")
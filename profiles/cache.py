@@ -0,0 +1,238 @@
+"""
+Read-through cache for ``Profile`` rows.
+
+Lookups go through a per-process LRU first, then Django's cache, then the
+database. Entries in Django's cache are keyed by a per-profile version stamp,
+so invalidating a profile only has to replace its stamp; other processes stop
+seeing the old entry as soon as their local copy expires
+(``PROFILE_CACHE_LOCAL_TTL`` seconds at most).
+
+Async views use the ``a``-prefixed counterparts, which go through the async
+cache and ORM APIs and share the same per-process LRU.
+"""
+
+import copy
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from core import profiling
+from users.common.lru import LRUCache
+from .models import Profile
+
+_profiles = LRUCache(
+    settings.PROFILE_CACHE_LOCAL_SIZE, settings.PROFILE_CACHE_LOCAL_TTL
+)
+_user_profile_ids = LRUCache(
+    settings.PROFILE_CACHE_LOCAL_SIZE, settings.PROFILE_CACHE_TIMEOUT
+)
+_stats = Counter()
+
+
+def _count(outcome):
+    _stats[outcome] += 1
+    profiling.record(f"cache.profile_{outcome}")
+
+
+def _version_key(pk):
+    return f"profile:{pk}:version"
+
+
+def _profile_key(pk, version):
+    return f"profile:{pk}:{version}"
+
+
+def _user_key(user_id):
+    return f"profile:user:{user_id}"
+
+
+def get_version(pk):
+    """
+    Return the profile's current version stamp.
+
+    The stamp changes whenever the profile is invalidated, so it can also key
+    other cached data derived from the profile (e.g. template fragments).
+    """
+
+    version = cache.get(_version_key(pk))
+    if version is None:
+        cache.add(_version_key(pk), time.time_ns(), None)
+        version = cache.get(_version_key(pk))
+    return version
+
+
+async def aget_version(pk):
+    version = await cache.aget(_version_key(pk))
+    if version is None:
+        await cache.aadd(_version_key(pk), time.time_ns(), None)
+        version = await cache.aget(_version_key(pk))
+    return version
+
+
+def get_profile(pk):
+    """
+    Return the profile with the given primary key, or None if it does not exist.
+
+    The returned instance is a private copy and can be modified freely.
+    """
+
+    profile = _profiles.get(pk)
+    if profile is not None:
+        _count("local_hits")
+        return copy.copy(profile)
+
+    version = get_version(pk)
+    profile = cache.get(_profile_key(pk, version))
+    if profile is not None:
+        _count("hits")
+    else:
+        _count("misses")
+        # From the primary: a lagging replica could park a stale row under
+        # the new version for the whole timeout.
+        profile = Profile.objects.using(DEFAULT_DB_ALIAS).filter(pk=pk).first()
+        if profile is None:
+            return None
+        cache.set(_profile_key(pk, version), profile, settings.PROFILE_CACHE_TIMEOUT)
+    _profiles.set(pk, profile)
+    return copy.copy(profile)
+
+
+async def aget_profile(pk):
+    """
+    Async counterpart of ``get_profile``.
+    """
+
+    profile = _profiles.get(pk)
+    if profile is not None:
+        _count("local_hits")
+        return copy.copy(profile)
+
+    version = await aget_version(pk)
+    profile = await cache.aget(_profile_key(pk, version))
+    if profile is not None:
+        _count("hits")
+    else:
+        _count("misses")
+        profile = await Profile.objects.using(DEFAULT_DB_ALIAS).filter(pk=pk).afirst()
+        if profile is None:
+            return None
+        await cache.aset(
+            _profile_key(pk, version), profile, settings.PROFILE_CACHE_TIMEOUT
+        )
+    _profiles.set(pk, profile)
+    return copy.copy(profile)
+
+
+async def aget_stamp(pk):
+    """
+    Return the profile's ``(pk, version, updated_at)``, or None if it does
+    not exist, without loading the whole row.
+    """
+
+    profile = _profiles.get(pk)
+    if profile is not None:
+        return profile.pk, profile.version, profile.updated_at
+    # From the primary, like get_profile: a lagging replica would confirm
+    # a client's stale copy.
+    return (
+        await Profile.objects.using(DEFAULT_DB_ALIAS)
+        .filter(pk=pk)
+        .values_list("pk", "version", "updated_at")
+        .afirst()
+    )
+
+
+def get_profile_for_user(user_id):
+    """
+    Return the profile belonging to the given user, or None if there is none.
+    """
+
+    pk = _get_profile_id(user_id)
+    return None if pk is None else get_profile(pk)
+
+
+async def aget_profile_for_user(user_id):
+    pk = await _aget_profile_id(user_id)
+    return None if pk is None else await aget_profile(pk)
+
+
+def get_version_for_user(user_id):
+    """
+    Return the version stamp of the user's profile, or None if there is none.
+    """
+
+    pk = _get_profile_id(user_id)
+    return None if pk is None else f"{pk}.{get_version(pk)}"
+
+
+def _get_profile_id(user_id):
+    pk = _user_profile_ids.get(user_id)
+    if pk is None:
+        pk = cache.get(_user_key(user_id))
+    if pk is None:
+        pk = (
+            Profile.objects.filter(user_id=user_id).values_list("pk", flat=True).first()
+        )
+        if pk is None:
+            return None
+        cache.set(_user_key(user_id), pk, settings.PROFILE_CACHE_TIMEOUT)
+    _user_profile_ids.set(user_id, pk)
+    return pk
+
+
+async def aget_version_for_user(user_id):
+    pk = await _aget_profile_id(user_id)
+    return None if pk is None else f"{pk}.{await aget_version(pk)}"
+
+
+async def _aget_profile_id(user_id):
+    pk = _user_profile_ids.get(user_id)
+    if pk is None:
+        pk = await cache.aget(_user_key(user_id))
+    if pk is None:
+        pk = (
+            await Profile.objects.filter(user_id=user_id)
+            .values_list("pk", flat=True)
+            .afirst()
+        )
+        if pk is None:
+            return None
+        await cache.aset(_user_key(user_id), pk, settings.PROFILE_CACHE_TIMEOUT)
+    _user_profile_ids.set(user_id, pk)
+    return pk
+
+
+def prime_profile(profile):
+    """
+    Seed this process' cache with a profile that was just read from the
+    database (e.g. joined to its user), saving the lookups on its next use.
+    """
+
+    _user_profile_ids.set(profile.user_id, profile.pk)
+    _profiles.set(profile.pk, profile)
+
+
+def invalidate_profile(profile, deleted=False):
+    """
+    Drop the cached copies of a profile after it changed or was deleted.
+    """
+
+    cache.set(_version_key(profile.pk), time.time_ns(), None)
+    _profiles.delete(profile.pk)
+    if deleted:
+        cache.delete(_user_key(profile.user_id))
+        _user_profile_ids.delete(profile.user_id)
+
+
+def get_stats():
+    """
+    Return this process' hit/miss counters.
+
+    ``local_hits`` were served from the in-process LRU, ``hits`` from Django's
+    cache and ``misses`` went to the database.
+    """
+
+    return dict(_stats)
@@ -0,0 +1,77 @@
+"""
+Conditional GET for pages rendered from profiles.
+
+Such pages carry a strong ETag and a ``Last-Modified`` date computed from the
+``version`` and ``updated_at`` stamps of the profiles they show. The viewer's
+profile is always one of them: the header shows it, and following someone
+bumps both profiles. Views compare the validators with ``not_modified`` before
+loading the profile, so a matching ``If-None-Match`` costs a stamp lookup at
+most and renders nothing.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def stamp(profile):
+    """
+    Return the stamp of a loaded profile, as ``aget_stamp`` does for one that
+    is not.
+    """
+
+    return profile.pk, profile.version, profile.updated_at
+
+
+def page_validators(request, template_name, *stamps):
+    """
+    Compute the validators of a page.
+
+    Args:
+        request (HttpRequest): The request. Its CSRF secret is included, as
+            forms on the page embed tokens derived from it; rendering may set
+            a new one, so compute the validators of a rendered page again.
+        template_name (str): The template the page is rendered with.
+        *stamps: ``(pk, version, updated_at)`` of each profile the page shows;
+            duplicates are ignored.
+
+    Returns:
+        tuple: The quoted ETag and the ``Last-Modified`` timestamp.
+    """
+
+    digest = hashlib.sha256()
+    for part in (
+        settings.PAGE_ETAG_SALT,
+        getattr(staticfiles_storage, "manifest_hash", ""),
+        request.META.get("CSRF_COOKIE", ""),
+        template_name,
+        *(
+            f"{pk}:{version}:{updated_at.isoformat()}"
+            for pk, version, updated_at in sorted(set(stamps))
+        ),
+    ):
+        digest.update(f"{part}\0".encode())
+    last_modified = max(updated_at for _, _, updated_at in stamps)
+    return quote_etag(digest.hexdigest()[:32]), int(last_modified.timestamp())
+
+
+def not_modified(request, etag, last_modified):
+    """
+    Return a 304 (or 412) response if the request's preconditions say the
+    client's copy is current, or None if the page must be rendered.
+    """
+
+    response = get_conditional_response(request, etag, last_modified)
+    if response is not None and response.status_code == 304:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    # Pages are per viewer: revalidate on every use, never share.
+    patch_cache_control(response, private=True, no_cache=True)
@@ -0,0 +1,48 @@
+from django.utils.functional import SimpleLazyObject
+
+from .cache import (
+    aget_profile_for_user,
+    aget_version_for_user,
+    get_profile_for_user,
+    get_version_for_user,
+)
+
+
+def current_profile(request):
+    """
+    Expose the logged-in user's profile to templates as ``current_profile``,
+    and its version stamp as ``profile_version`` for keying per-user
+    ``{% cache %}`` fragments.
+
+    Both are only loaded (through the profile cache) when a template actually
+    uses them, unless ``apreload_current_profile`` already did.
+    """
+
+    if hasattr(request, "current_profile"):
+        return {
+            "current_profile": request.current_profile,
+            "profile_version": request.profile_version,
+        }
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {"current_profile": None, "profile_version": None}
+    return {
+        "current_profile": SimpleLazyObject(lambda: get_profile_for_user(user.pk)),
+        "profile_version": SimpleLazyObject(lambda: get_version_for_user(user.pk)),
+    }
+
+
+async def apreload_current_profile(request):
+    """
+    Load what ``current_profile`` exposes ahead of rendering.
+
+    Async views must call this: templates render synchronously, and the lazy
+    lookups would otherwise query the database from the event loop.
+    """
+
+    user = request.user
+    if user.is_authenticated:
+        request.current_profile = await aget_profile_for_user(user.pk)
+        request.profile_version = await aget_version_for_user(user.pk)
+    else:
+        request.current_profile = request.profile_version = None
@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models import F
+
+from .cache import invalidate_profile
+from .models import Follow, Profile
+
+
+def follow(follower, followee):
+    """
+    Make ``follower`` follow ``followee``.
+
+    The edge and both counters are written in one transaction; counters are
+    bumped with F-expressions so concurrent follows never lose an update.
+
+    Args:
+        follower (Profile): The profile that follows.
+        followee (Profile): The profile being followed.
+
+    Returns:
+        bool: True if a new edge was created, False if it already existed.
+    """
+
+    if follower.pk == followee.pk:
+        return False
+    with transaction.atomic():
+        _, created = Follow.objects.get_or_create(follower=follower, followee=followee)
+        if created:
+            _adjust_counters(follower, followee, 1)
+    return created
+
+
+def unfollow(follower, followee):
+    """
+    Remove the ``follower`` -> ``followee`` edge if it exists.
+
+    Returns:
+        bool: True if an edge was removed.
+    """
+
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(
+            follower=follower, followee=followee
+        ).delete()
+        if deleted:
+            _adjust_counters(follower, followee, -1)
+    return bool(deleted)
+
+
+def is_following(follower_id, followee_id):
+    return Follow.objects.filter(
+        follower_id=follower_id, followee_id=followee_id
+    ).exists()
+
+
+async def ais_following(follower_id, followee_id):
+    return await Follow.objects.filter(
+        follower_id=follower_id, followee_id=followee_id
+    ).aexists()
+
+
+def _adjust_counters(follower, followee, delta):
+    Profile.objects.filter(pk=follower.pk).update(
+        following_count=F("following_count") + delta, **Profile.change_stamp()
+    )
+    Profile.objects.filter(pk=followee.pk).update(
+        followers_count=F("followers_count") + delta, **Profile.change_stamp()
+    )
+    # QuerySet.update() does not send post_save, so drop the cached copies here.
+    transaction.on_commit(lambda: invalidate_profile(follower))
+    transaction.on_commit(lambda: invalidate_profile(followee))
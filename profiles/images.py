@@ -0,0 +1,134 @@
+"""
+Responsive variants for profile avatars and cover images.
+
+After a profile update commits, the uploaded image is handed to a worker
+process which resizes it to the widths in ``PROFILE_IMAGE_VARIANT_WIDTHS`` and
+re-encodes each size as WebP and JPEG. The request returns without waiting;
+when the worker is done the variant names are stored on the profile
+(``avatar_variants`` / ``cover_image_variants``) and templates start emitting
+``srcset`` for them.
+"""
+
+import logging
+import os
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from users.common.pools import get_process_pool
+from .cache import invalidate_profile
+from .models import Profile
+from .storage import change_references, referenced_files
+
+logger = logging.getLogger("profiles")
+
+FORMATS = (("webp", "WEBP"), ("jpeg", "JPEG"))
+REMOTE_FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+
+
+def render_variants(data, widths, quality):
+    """
+    Resize and re-encode an image. Runs in a worker process.
+
+    Args:
+        data (bytes): The original upload.
+        widths (list[int]): Target widths; images are never upscaled.
+        quality (int): Encoder quality for both formats.
+
+    Returns:
+        list: ``(width, extension, encoded bytes)`` tuples.
+    """
+
+    image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    image = image.convert("RGB")
+    variants = []
+    for width in sorted(set(min(width, image.width) for width in widths)):
+        resized = image.copy()
+        resized.thumbnail((width, image.height), Image.LANCZOS)
+        for extension, image_format in FORMATS:
+            buffer = BytesIO()
+            resized.save(buffer, image_format, quality=quality, optimize=True)
+            variants.append((width, extension, buffer.getvalue()))
+    return variants
+
+
+def render_avatar(data, size, quality):
+    """
+    Validate a downloaded picture and re-encode it as a JPEG no larger than
+    ``size`` pixels on either side. Runs in a worker process.
+
+    Raises:
+        ValueError: If ``data`` is not a JPEG, PNG, GIF or WebP image, or is
+            too large to decode safely.
+    """
+
+    try:
+        Image.open(BytesIO(data)).verify()
+        image = Image.open(BytesIO(data))  # verify() leaves the image unusable
+    except (OSError, SyntaxError, Image.DecompressionBombError) as exc:
+        raise ValueError(f"Not a usable image: {exc}") from exc
+    if image.format not in REMOTE_FORMATS:
+        raise ValueError(f"Unsupported image format: {image.format}")
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    image.thumbnail((size, size), Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def schedule_variants(profile, field_name):
+    """
+    Queue variant generation for ``profile.<field_name>`` on the image pool.
+    """
+
+    field_file = getattr(profile, field_name)
+    if not field_file:
+        return
+    with field_file.open("rb") as source:
+        data = source.read()
+    future = get_process_pool("images", settings.PROFILE_IMAGE_WORKERS).submit(
+        render_variants,
+        data,
+        settings.PROFILE_IMAGE_VARIANT_WIDTHS[field_name],
+        settings.PROFILE_IMAGE_QUALITY,
+    )
+    future.add_done_callback(
+        partial(_store_variants, profile.pk, field_name, field_file.name)
+    )
+
+
+def _store_variants(pk, field_name, source_name, future):
+    try:
+        rendered = future.result()
+        field = Profile._meta.get_field(field_name)
+        stem = os.path.splitext(os.path.basename(source_name))[0]
+        variants = {"source": source_name}
+        for width, extension, data in rendered:
+            name = field.storage.save(
+                f"{field.upload_to}/variants/{stem}-{width}w.{extension}",
+                ContentFile(data),
+            )
+            variants.setdefault(extension, {})[str(width)] = name
+
+        variants_field = f"{field_name}_variants"
+        with transaction.atomic():
+            # Skip the write if the image was replaced while we were working.
+            profiles = Profile.objects.filter(pk=pk, **{field_name: source_name})
+            previous = profiles.values_list(variants_field, flat=True).first()
+            updated = profiles.update(
+                **{variants_field: variants}, **Profile.change_stamp()
+            )
+            if updated:
+                # QuerySet.update() bypasses the signals that count references.
+                change_references(referenced_files({variants_field: variants}), 1)
+                change_references(referenced_files({variants_field: previous}), -1)
+        if updated:
+            invalidate_profile(Profile.objects.only("pk", "user_id").get(pk=pk))
+    except Exception:
+        logger.exception(f"Failed to build {field_name} variants for profile {pk}")
+    finally:
+        close_old_connections()
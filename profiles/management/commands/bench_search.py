@@ -0,0 +1,144 @@
+import datetime
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from profiles.models import Profile
+from profiles.search import get_search_backend, search_profiles
+from users.common.bench import format_summary, timed
+from users.common.common import normalize_name
+
+User = get_user_model()
+
+FAMILY_NAMES = [
+    "Nguyễn",
+    "Trần",
+    "Lê",
+    "Phạm",
+    "Hoàng",
+    "Huỳnh",
+    "Phan",
+    "Vũ",
+    "Võ",
+    "Đặng",
+    "Bùi",
+    "Đỗ",
+    "Hồ",
+    "Ngô",
+    "Dương",
+    "Lý",
+]
+MIDDLE_NAMES = ["Văn", "Thị", "Hữu", "Đức", "Minh", "Ngọc", "Thanh", "Quốc", "Gia"]
+GIVEN_NAMES = [
+    "An",
+    "Bình",
+    "Châu",
+    "Dũng",
+    "Đạt",
+    "Giang",
+    "Hà",
+    "Hải",
+    "Hạnh",
+    "Hiếu",
+    "Hoa",
+    "Hùng",
+    "Hương",
+    "Khánh",
+    "Lan",
+    "Linh",
+    "Long",
+    "Mai",
+    "Minh",
+    "Nam",
+    "Ngọc",
+    "Phương",
+    "Quân",
+    "Quang",
+    "Sơn",
+    "Tâm",
+    "Thảo",
+    "Thu",
+    "Trang",
+    "Trung",
+    "Tuấn",
+    "Vy",
+    "Yến",
+]
+# One profile in RARE_EVERY gets this given name, so some queries match few rows.
+RARE_NAME = "Khuê"
+RARE_EVERY = 10_000
+QUERIES = ["ng", "nguyen van", "tran thi", "đặng h", "yen", "khue", "khuê ng", "zzz"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic Vietnamese-named profiles and compare indexed search "
+        "latency against a LIKE scan. Everything is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._seed(options["profiles"], options["batch_size"])
+            self._measure(options["repeat"])
+            transaction.set_rollback(True)
+
+    def _seed(self, count, batch_size):
+        rng = random.Random(42)
+        stamp = timezone.now().strftime("%Y%m%d%H%M%S%f")
+        for start in range(0, count, batch_size):
+            users = User.objects.bulk_create(
+                User(email=f"bench-search-{stamp}-{i}@example.com", password="!")
+                for i in range(start, min(start + batch_size, count))
+            )
+            profiles = []
+            for i, user in enumerate(users, start):
+                first_name = (
+                    RARE_NAME if i % RARE_EVERY == 0 else rng.choice(GIVEN_NAMES)
+                )
+                last_name = f"{rng.choice(FAMILY_NAMES)} {rng.choice(MIDDLE_NAMES)}"
+                profiles.append(
+                    Profile(
+                        user=user,
+                        first_name=first_name,
+                        last_name=last_name,
+                        birthdate=datetime.date(2000, 1, 1),
+                        # bulk_create skips Profile.save(), so fold the name here.
+                        search_name=normalize_name(f"{first_name} {last_name}"),
+                    )
+                )
+            Profile.objects.bulk_create(profiles)
+        self.stdout.write(f"Seeded {count} profiles.")
+
+    def _measure(self, repeat):
+        backend = get_search_backend(connection.vendor)
+        for query in QUERIES:
+            folded = normalize_name(query)
+            indexed, naive, cached = [], [], []
+            for _ in range(repeat):
+                indexed.append(timed(backend.search, connection, folded, 10)[0])
+                naive.append(
+                    timed(
+                        lambda: list(
+                            Profile.objects.filter(
+                                search_name__contains=folded
+                            ).values_list("pk", flat=True)[:10]
+                        )
+                    )[0]
+                )
+            cache.delete_many([f"profile-search:10:{folded.replace(' ', '+')}"])
+            search_profiles(query, 10)
+            for _ in range(repeat):
+                cached.append(timed(search_profiles, query, 10)[0])
+            self.stdout.write(f"query {query!r}")
+            self.stdout.write("  " + format_summary(type(backend).__name__, indexed))
+            self.stdout.write("  " + format_summary("LIKE scan", naive))
+            self.stdout.write("  " + format_summary("cached", cached))
@@ -0,0 +1,190 @@
+import os
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from profiles.models import Blob, Profile
+from profiles.signals import IMAGE_FIELDS
+from profiles.storage import is_blob, profile_media_storage, referenced_files
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete profile media blobs that no profile has referenced for the grace "
+        "period, a chunk per transaction. --recount first recomputes reference "
+        "counts from the Profile table; --scan also removes blob files on disk "
+        "that have no Blob row (e.g. left by a crash)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--grace",
+            type=int,
+            default=settings.MEDIA_GC_GRACE_SECONDS,
+            help="Seconds a blob must have been unreferenced and untouched.",
+        )
+        parser.add_argument("--recount", action="store_true")
+        parser.add_argument("--scan", action="store_true")
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Report without deleting."
+        )
+
+    def handle(self, *args, **options):
+        self.storage = profile_media_storage()
+        self.chunk_size = options["chunk_size"]
+        self.dry_run = options["dry_run"]
+        cutoff = timezone.now() - timedelta(seconds=options["grace"])
+        if options["recount"]:
+            self._recount()
+        deleted = self._collect(cutoff)
+        if options["scan"]:
+            deleted += self._scan(time.time() - options["grace"])
+        verb = "Would delete" if self.dry_run else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {deleted} blobs."))
+
+    def _recount(self):
+        counts = Counter()
+        last_pk = 0
+        while True:
+            rows = list(
+                Profile.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values("pk", *IMAGE_FIELDS)[: self.chunk_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1]["pk"]
+            for row in rows:
+                counts.update(name for name in referenced_files(row) if is_blob(name))
+
+        fixed = 0
+        last_pk = 0
+        while True:
+            blobs = list(
+                Blob.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only("pk", "name", "references")[: self.chunk_size]
+            )
+            if not blobs:
+                break
+            last_pk = blobs[-1].pk
+            changed = []
+            for blob in blobs:
+                if blob.references != counts.get(blob.name, 0):
+                    blob.references = counts.get(blob.name, 0)
+                    changed.append(blob)
+            if changed and not self.dry_run:
+                Blob.objects.bulk_update(changed, ["references"])
+            fixed += len(changed)
+        self.stdout.write(f"Fixed {fixed} reference counts.")
+
+    def _collect(self, cutoff):
+        deleted = 0
+        last_pk = 0
+        while True:
+            candidates = Blob.objects.filter(
+                references__lte=0, touched_at__lt=cutoff, pk__gt=last_pk
+            )
+            chunk = list(
+                candidates.order_by("pk").values_list("pk", "name")[: self.chunk_size]
+            )
+            if not chunk:
+                break
+            last_pk = chunk[-1][0]
+            if self.dry_run:
+                deleted += len(chunk)
+                continue
+            with transaction.atomic():
+                # Re-checked in the delete: the blob may have been referenced or
+                # uploaded again since it was listed.
+                candidates.filter(pk__in=[pk for pk, _ in chunk]).delete()
+                kept = set(
+                    Blob.objects.filter(
+                        name__in=[name for _, name in chunk]
+                    ).values_list("name", flat=True)
+                )
+            for _, name in chunk:
+                if name not in kept and self._delete_blob_file(name):
+                    deleted += 1
+            self.stdout.write(f"Deleted {deleted} unreferenced blobs.")
+        return deleted
+
+    def _scan(self, cutoff):
+        deleted = 0
+        for directory in {
+            Profile._meta.get_field(name).upload_to
+            for name in ("avatar", "cover_image")
+        }:
+            names = [
+                name
+                for name in self._walk(directory)
+                if is_blob(name)
+                # Temporary files left behind by a crashed upload or collection.
+                or os.path.basename(name).startswith((".upload-", ".gc-"))
+            ]
+            for start in range(0, len(names), self.chunk_size):
+                chunk = names[start : start + self.chunk_size]
+                known = set(
+                    Blob.objects.filter(name__in=chunk).values_list("name", flat=True)
+                )
+                for name in chunk:
+                    if name in known:
+                        continue
+                    if os.path.getmtime(self.storage.path(name)) >= cutoff:
+                        continue  # Possibly an upload still being written
+                    if self.dry_run:
+                        deleted += 1
+                    elif not is_blob(name):
+                        self._delete_file(name)
+                        deleted += 1
+                    elif self._delete_blob_file(name):
+                        deleted += 1
+        self.stdout.write(f"Found {deleted} blob files without a Blob row.")
+        return deleted
+
+    def _walk(self, directory):
+        if not self.storage.exists(directory):
+            return
+        subdirectories, files = self.storage.listdir(directory)
+        for name in files:
+            yield f"{directory}/{name}"
+        for subdirectory in subdirectories:
+            yield from self._walk(f"{directory}/{subdirectory}")
+
+    def _delete_blob_file(self, name):
+        """
+        Delete the file of a blob found without a row, unless an upload of the
+        same content has recreated the row since.
+
+        Returns:
+            bool: Whether the file was deleted.
+        """
+
+        path = self.storage.path(name)
+        directory, filename = os.path.split(path)
+        # Moved aside first: an upload that recreates the row from here on
+        # finds no file and writes its own (ContentAddressedStorage._save).
+        doomed = os.path.join(directory, f".gc-{filename}")
+        try:
+            os.rename(path, doomed)
+        except FileNotFoundError:
+            return False
+        if Blob.objects.filter(name=name).exists():
+            # Recreated before the move, so the upload kept this file. Same
+            # content as anything the upload may have written meanwhile.
+            os.replace(doomed, path)
+            return False
+        os.remove(doomed)
+        return True
+
+    def _delete_file(self, name):
+        try:
+            os.remove(self.storage.path(name))
+        except FileNotFoundError:
+            pass
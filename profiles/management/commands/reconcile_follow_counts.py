@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from profiles.cache import invalidate_profile
+from profiles.models import Follow, Profile
+
+
+class Command(BaseCommand):
+    help = "Recompute Profile.followers_count/following_count from the Follow table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of profiles recomputed per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        last_pk = 0
+        checked = fixed = 0
+        while True:
+            ids = list(
+                Profile.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            last_pk = ids[-1]
+            checked += len(ids)
+            fixed += self._reconcile_chunk(ids)
+            self.stdout.write(f"Checked {checked} profiles, fixed {fixed}.")
+        self.stdout.write(self.style.SUCCESS(f"Done: fixed {fixed} of {checked}."))
+
+    def _reconcile_chunk(self, ids):
+        # Counted inside the UPDATE itself, so a follow or unfollow committed
+        # while the chunk is processed cannot be overwritten by a stale count.
+        followers = _count(Follow.objects.filter(followee=OuterRef("pk")))
+        following = _count(Follow.objects.filter(follower=OuterRef("pk")))
+        with transaction.atomic():
+            stale = Profile.objects.filter(pk__in=ids).exclude(
+                followers_count=followers, following_count=following
+            )
+            changed = list(stale.only("pk", "user_id"))
+            if changed:
+                stale.filter(pk__in=[profile.pk for profile in changed]).update(
+                    followers_count=followers,
+                    following_count=following,
+                    **Profile.change_stamp(),
+                )
+        for profile in changed:
+            invalidate_profile(profile)
+        return len(changed)
+
+
+def _count(follows):
+    """
+    Return a subquery expression counting ``follows``, 0 when there are none.
+    """
+
+    counts = follows.order_by().values(_group=Value(1)).annotate(n=Count("pk"))
+    return Coalesce(Subquery(counts.values("n")), 0)
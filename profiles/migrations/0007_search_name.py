@@ -0,0 +1,42 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:18
+
+from django.db import migrations, models
+
+from users.common.common import normalize_name
+
+
+def fill_search_name(apps, schema_editor):
+    Profile = apps.get_model("profiles", "Profile")
+    profiles = Profile.objects.only("first_name", "last_name").order_by("pk")
+    batch = []
+    for profile in profiles.iterator(chunk_size=1000):
+        profile.search_name = normalize_name(f"{profile.first_name} {profile.last_name}")
+        batch.append(profile)
+        if len(batch) == 1000:
+            Profile.objects.bulk_update(batch, ["search_name"])
+            batch = []
+    Profile.objects.bulk_update(batch, ["search_name"])
+
+
+def create_search_index(apps, schema_editor):
+    from profiles.search import get_search_backend
+
+    connection = schema_editor.connection
+    get_search_backend(connection.vendor).install(connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0006_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='search_name',
+            field=models.CharField(blank=True, editable=False, max_length=61),
+        ),
+        migrations.RunPython(fill_search_name, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, migrations.RunPython.noop),
+    ]
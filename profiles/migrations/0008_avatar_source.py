@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0007_search_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='avatar_source_etag',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='avatar_source_url',
+            field=models.URLField(blank=True, editable=False, max_length=500),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:55
+
+import profiles.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0008_avatar_source'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=profiles.storage.profile_media_storage, upload_to='profile_images'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='cover_image',
+            field=models.ImageField(blank=True, null=True, storage=profiles.storage.profile_media_storage, upload_to='cover_images'),
+        ),
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('references', models.IntegerField(default=0)),
+                ('touched_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['references', 'touched_at'], name='blob_gc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.7 on 2026-10-18 21:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def flag_pulled_authors(apps, schema_editor):
+    # Authors already above the limit may have posts that were never fanned out.
+    Profile = apps.get_model("profiles", "Profile")
+    Profile.objects.filter(followers_count__gt=settings.FEED_FANOUT_LIMIT).update(
+        feed_pulled=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("profiles", "0010_profile_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="feed_pulled",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(flag_pulled_authors, migrations.RunPython.noop),
+    ]
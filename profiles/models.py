@@ -1,6 +1,11 @@
 from django.db import models
+from django.db.models import F, Q
+from django.db.models.functions import Now
 from django.contrib.auth import get_user_model
 
+from users.common.common import normalize_name
+from .storage import profile_media_storage
+
 
 class Profile(models.Model):
     class Sex(models.TextChoices):
@@ -17,8 +22,109 @@ class Profile(models.Model):
     sex = models.CharField(max_length=6, choices=Sex, default=Sex.MALE)
     bio = models.TextField(max_length=500, blank=True)
     birthdate = models.DateField()
-    avatar = models.ImageField(upload_to="profile_images", blank=True, null=True)
-    cover_image = models.ImageField(upload_to="cover_images", blank=True, null=True)
+    avatar = models.ImageField(
+        upload_to="profile_images",
+        storage=profile_media_storage,
+        blank=True,
+        null=True,
+    )
+    cover_image = models.ImageField(
+        upload_to="cover_images",
+        storage=profile_media_storage,
+        blank=True,
+        null=True,
+    )
+    # Resized WebP/JPEG copies built by profiles.images, keyed by format and width.
+    avatar_variants = models.JSONField(default=dict, blank=True)
+    cover_image_variants = models.JSONField(default=dict, blank=True)
+    # Remote picture the avatar was ingested from (profiles.avatars), if any,
+    # and its ETag, so it is only downloaded again when it changed upstream.
+    avatar_source_url = models.URLField(max_length=500, blank=True, editable=False)
+    avatar_source_etag = models.CharField(max_length=200, blank=True, editable=False)
+    # Accent-folded "first last" name; indexed for search by profiles.search.
+    search_name = models.CharField(max_length=61, blank=True, editable=False)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    # Set once a post was not fanned out (home.feed.publish); followers' feeds
+    # keep merging this author's posts in on read from then on.
+    feed_pulled = models.BooleanField(default=False, editable=False)
+    # Bumped on every change, including QuerySet.update()s (see change_stamp);
+    # the validators for conditional GETs (profiles.conditional).
+    version = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
+
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_name(f"{self.first_name} {self.last_name}")
+        self.version += 1
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            extra = {"version", "updated_at"}
+            if {"first_name", "last_name"} & set(update_fields):
+                extra.add("search_name")
+            kwargs["update_fields"] = {*update_fields, *extra}
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def change_stamp():
+        """
+        Return the assignments that mark rows as changed, for
+        ``QuerySet.update()`` calls (which bypass ``save()``).
+        """
+
+        return {"version": F("version") + 1, "updated_at": Now()}
+
+
+class Follow(models.Model):
+    follower = models.ForeignKey(
+        Profile,
+        on_delete=models.CASCADE,
+        related_name="following_edges",
+        db_index=False,
+    )
+    followee = models.ForeignKey(
+        Profile,
+        on_delete=models.CASCADE,
+        related_name="follower_edges",
+        db_index=False,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Also serves as the index for "who does X follow" lookups.
+            models.UniqueConstraint(
+                fields=["follower", "followee"], name="unique_follow"
+            ),
+            models.CheckConstraint(
+                check=~Q(follower=F("followee")), name="no_self_follow"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["followee", "follower"], name="follow_followee_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.follower_id} -> {self.followee_id}"
+
+
+class Blob(models.Model):
+    """
+    A file in profile media storage (``profiles.storage``) and the number of
+    profile image references to it.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    references = models.IntegerField(default=0)
+    touched_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # gc_media's scan for unreferenced blobs.
+            models.Index(fields=["references", "touched_at"], name="blob_gc_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.references} references)"
@@ -0,0 +1,193 @@
+"""
+Profile search by name.
+
+Every profile stores an accent-folded ``search_name`` (see ``Profile.save``).
+The backend indexes that column: an FTS5 table kept in sync by triggers on
+SQLite, a trigram GIN index on PostgreSQL. Queries are folded the same way,
+so "nguyen duc" finds "Nguyễn Đức", and every term matches as a prefix.
+Result ids are cached briefly because typeahead traffic concentrates on a few
+short prefixes.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router
+from django.utils.module_loading import import_string
+
+from users.common.common import normalize_name
+from .models import Profile
+
+
+class SearchBackend:
+    """
+    Fallback backend using plain LIKE queries on ``search_name``.
+    """
+
+    def install(self, connection):
+        """
+        Create or repair the search index. Must be idempotent.
+        """
+
+    def search(self, connection, query, limit):
+        """
+        Return up to ``limit`` profile ids matching the folded ``query``, read
+        through ``connection``.
+        """
+
+        terms = query.split()
+        profiles = Profile.objects.using(connection.alias).filter(
+            search_name__startswith=terms[0]
+        )
+        for term in terms[1:]:
+            profiles = profiles.filter(search_name__contains=f" {term}")
+        return list(profiles.values_list("pk", flat=True)[:limit])
+
+
+class SQLiteFTSBackend(SearchBackend):
+    create_table = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS profiles_profile_fts USING fts5(
+            search_name,
+            content='profiles_profile',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='1 2 3'
+        )
+    """
+    triggers = {
+        "profiles_profile_fts_insert": """
+            CREATE TRIGGER profiles_profile_fts_insert
+            AFTER INSERT ON profiles_profile BEGIN
+                INSERT INTO profiles_profile_fts(rowid, search_name)
+                VALUES (new.id, new.search_name);
+            END
+        """,
+        "profiles_profile_fts_delete": """
+            CREATE TRIGGER profiles_profile_fts_delete
+            AFTER DELETE ON profiles_profile BEGIN
+                INSERT INTO profiles_profile_fts(profiles_profile_fts, rowid, search_name)
+                VALUES ('delete', old.id, old.search_name);
+            END
+        """,
+        "profiles_profile_fts_update": """
+            CREATE TRIGGER profiles_profile_fts_update
+            AFTER UPDATE OF search_name ON profiles_profile BEGIN
+                INSERT INTO profiles_profile_fts(profiles_profile_fts, rowid, search_name)
+                VALUES ('delete', old.id, old.search_name);
+                INSERT INTO profiles_profile_fts(rowid, search_name)
+                VALUES (new.id, new.search_name);
+            END
+        """,
+    }
+
+    def install(self, connection):
+        # Django rebuilds SQLite tables on many schema changes, which drops their
+        # triggers; recreate whatever is missing and reindex if we had to.
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            existing = {row[0] for row in cursor.fetchall()}
+            cursor.execute(self.create_table)
+            missing = [name for name in self.triggers if name not in existing]
+            for name in missing:
+                cursor.execute(self.triggers[name])
+            if missing:
+                cursor.execute(
+                    "INSERT INTO profiles_profile_fts(profiles_profile_fts) "
+                    "VALUES ('rebuild')"
+                )
+
+    def search(self, connection, query, limit):
+        match = " ".join(f'"{term}"*' for term in query.split())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT rowid FROM profiles_profile_fts "
+                # No ORDER BY rank: scoring every hit of a one-letter prefix costs
+                # far more than it is worth for a name typeahead.
+                "WHERE profiles_profile_fts MATCH %s LIMIT %s",
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresTrigramBackend(SearchBackend):
+
+    def install(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS profiles_profile_search_trgm "
+                "ON profiles_profile USING gin (search_name gin_trgm_ops)"
+            )
+
+    def search(self, connection, query, limit):
+        terms = query.split()
+        # Every term must start a word; the trigram index serves both LIKE forms.
+        where = " AND ".join(
+            "(search_name LIKE %s OR search_name LIKE %s)" for _ in terms
+        )
+        params = []
+        for term in terms:
+            params += [f"{term}%", f"% {term}%"]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id FROM profiles_profile WHERE {where} "
+                "ORDER BY similarity(search_name, %s) DESC LIMIT %s",
+                [*params, query, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+VENDOR_BACKENDS = {
+    "sqlite": SQLiteFTSBackend,
+    "postgresql": PostgresTrigramBackend,
+}
+
+
+def get_search_backend(vendor):
+    """
+    Return the backend named by ``PROFILE_SEARCH_BACKEND``, or the default one
+    for the database vendor.
+    """
+
+    if settings.PROFILE_SEARCH_BACKEND:
+        return import_string(settings.PROFILE_SEARCH_BACKEND)()
+    return VENDOR_BACKENDS.get(vendor, SearchBackend)()
+
+
+def search_profiles(query, limit=None):
+    """
+    Find profiles whose name matches ``query``, best matches first.
+
+    Args:
+        query (str): Free text; accents and case are ignored and every word
+            matches as a prefix.
+        limit (int): Maximum number of results, ``PROFILE_SEARCH_LIMIT`` by default.
+
+    Returns:
+        list[Profile]: The matching profiles.
+    """
+
+    limit = limit or settings.PROFILE_SEARCH_LIMIT
+    query = normalize_name(query)[: Profile._meta.get_field("search_name").max_length]
+    if not query:
+        return []
+    key = f"profile-search:{limit}:{query.replace(' ', '+')}"
+    # One alias for both queries, so the profiles come from the replica the
+    # ids were found on.
+    using = router.db_for_read(Profile)
+    ids = cache.get(key)
+    if ids is None:
+        db = connections[using]
+        ids = get_search_backend(db.vendor).search(db, query, limit)
+        cache.set(key, ids, settings.PROFILE_SEARCH_CACHE_TIMEOUT)
+    profiles = Profile.objects.using(using).in_bulk(ids)
+    return [profiles[pk] for pk in ids if pk in profiles]
+
+
+def install_search_index(sender, using, **kwargs):
+    """
+    ``post_migrate`` receiver making sure the search index and its triggers exist.
+    """
+
+    db = connections[using]
+    if Profile._meta.db_table in db.introspection.table_names():
+        get_search_backend(db.vendor).install(db)
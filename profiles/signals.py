@@ -0,0 +1,65 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from users.backends import forget_user
+from .cache import invalidate_profile
+from .models import Profile
+from .storage import change_references, referenced_files
+
+IMAGE_FIELDS = ("avatar", "avatar_variants", "cover_image", "cover_image_variants")
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_saved_profile(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_profile(instance))
+    transaction.on_commit(lambda: forget_user(instance.user_id))
+
+
+@receiver(post_delete, sender=Profile)
+def invalidate_deleted_profile(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_profile(instance, deleted=True))
+    transaction.on_commit(lambda: forget_user(instance.user_id))
+
+
+def _saved_fields(update_fields):
+    return [
+        field
+        for field in IMAGE_FIELDS
+        if update_fields is None or field in update_fields
+    ]
+
+
+@receiver(pre_save, sender=Profile)
+def load_file_references(sender, instance, using, update_fields=None, **kwargs):
+    # Read back rather than trusting the instance: a cached copy may predate
+    # another change, and counting from it would free a blob still in use.
+    fields = _saved_fields(update_fields)
+    saved = None
+    if fields and not instance._state.adding:
+        saved = Profile.objects.using(using).filter(pk=instance.pk).values(*fields)
+        saved = saved.first()
+    instance._old_files = Counter(referenced_files(saved or {}))
+
+
+@receiver(post_save, sender=Profile)
+def count_file_references(sender, instance, update_fields=None, **kwargs):
+    new_files = Counter(
+        referenced_files(
+            {field: getattr(instance, field) for field in _saved_fields(update_fields)}
+        )
+    )
+    change_references((new_files - instance._old_files).elements(), 1)
+    change_references((instance._old_files - new_files).elements(), -1)
+
+
+@receiver(post_delete, sender=Profile)
+def release_file_references(sender, instance, **kwargs):
+    change_references(
+        referenced_files(
+            {field: instance.__dict__.get(field) for field in IMAGE_FIELDS}
+        ),
+        -1,
+    )
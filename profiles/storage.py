@@ -0,0 +1,132 @@
+"""
+Content-addressed storage for profile images.
+
+Files are named after the SHA-256 of their content
+(``<upload_to>/<h[:2]>/<h>.<ext>``), so identical uploads share one file. The
+hash is computed while the upload is copied to a temporary file next to its
+destination, which is then renamed into place, or dropped if the blob already
+exists.
+
+Each blob has a ``Blob`` row counting the profile fields that reference it
+(images and their variants); ``profiles.signals`` keeps the counts up to date.
+``delete()`` leaves blobs alone, since other profiles may share them: the
+``gc_media`` command removes blobs nobody has referenced for
+``MEDIA_GC_GRACE_SECONDS``.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from collections import Counter
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.db.models import F
+from django.utils import timezone
+
+BLOB_NAME_RE = re.compile(r"(?:^|/)([0-9a-f]{2})/\1[0-9a-f]{62}(?:\.\w+)?$")
+
+
+def profile_media_storage():
+    # A callable, so Profile fields and migrations refer to the
+    # STORAGES["profile_media"] alias rather than a fixed instance.
+    return storages["profile_media"]
+
+
+def is_blob(name):
+    return bool(name) and BLOB_NAME_RE.search(name) is not None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known once the content is hashed.
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        os.makedirs(self.path(directory), exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.path(directory), prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+            hexdigest = digest.hexdigest()
+            name = f"{directory}/{hexdigest[:2]}/{hexdigest}{extension}".lstrip("/")
+            # Before the file is (re)placed, so gc_media skips the blob. If it
+            # is collecting the blob right now, it only deletes the file after
+            # moving it aside and finding no row, so the check below then
+            # finds no file and writes it again.
+            _touch(name)
+            path = self.path(name)
+            if os.path.exists(path):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp_path, self.file_permissions_mode)
+                os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+    def delete(self, name):
+        if is_blob(name):
+            return  # Possibly shared; reclaimed by gc_media once unreferenced
+        super().delete(name)
+
+
+def _touch(name):
+    """
+    Record that ``name`` was just written, which keeps ``gc_media`` away from
+    it for the grace period even before anything references it.
+    """
+
+    from .models import Blob
+
+    if not Blob.objects.filter(name=name).update(touched_at=timezone.now()):
+        Blob.objects.get_or_create(name=name)
+
+
+def change_references(names, delta):
+    """
+    Add ``delta`` to the reference count of each blob in ``names``; other
+    file names are ignored. A name listed twice counts twice.
+    """
+
+    from .models import Blob
+
+    for name, count in Counter(name for name in names if is_blob(name)).items():
+        updated = Blob.objects.filter(name=name).update(
+            references=F("references") + delta * count
+        )
+        if not updated and delta > 0:
+            Blob.objects.get_or_create(name=name, defaults={"references": count})
+
+
+def referenced_files(values):
+    """
+    Return the file names a profile's image fields reference.
+
+    Args:
+        values (dict): Field name to value, for any of ``avatar``,
+            ``cover_image`` and their ``*_variants`` fields.
+
+    Returns:
+        list: One entry per reference.
+    """
+
+    names = []
+    for field_name in ("avatar", "cover_image"):
+        if field_name in values:
+            value = values[field_name]
+            names.append(getattr(value, "name", value))
+        variants = values.get(f"{field_name}_variants") or {}
+        for extension, widths in variants.items():
+            if extension != "source":  # The field itself, counted above
+                names.extend(widths.values())
+    return [name for name in names if name]
@@ -0,0 +1,69 @@
+from django import template
+from django.forms.utils import flatatt
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.filter
+def compact_count(value):
+    """
+    Format a counter the way the profile page shows it: 950, 2.5k, 1.2M.
+    """
+
+    value = int(value or 0)
+    for divisor, suffix in ((1_000_000, "M"), (1_000, "k")):
+        if value >= divisor:
+            return f"{value / divisor:.1f}".rstrip("0").rstrip(".") + suffix
+    return str(value)
+
+
+@register.simple_tag
+def profile_image(profile, field_name, default, sizes, **attrs):
+    """
+    Render ``profile.<field_name>`` as a responsive, lazily loaded image.
+
+    Emits a ``<picture>`` with WebP and JPEG ``srcset`` once the resized
+    variants exist, the original upload while they are being built, and the
+    ``default`` static image when nothing was uploaded.
+
+    Usage::
+
+        {% profile_image profile "avatar" "pacman_avatar_default.png" "128px" class="h-32 w-32" alt="Avatar" %}
+    """
+
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+    field_file = getattr(profile, field_name, None)
+    if not field_file:
+        return format_html('<img src="{}"{}>', static(default), flatatt(attrs))
+
+    variants = getattr(profile, f"{field_name}_variants", None) or {}
+    if variants.get("source") != field_file.name:
+        return format_html('<img src="{}"{}>', field_file.url, flatatt(attrs))
+
+    storage = field_file.storage
+
+    def srcset(extension):
+        return ", ".join(
+            f"{storage.url(name)} {width}w"
+            for width, name in sorted(
+                variants.get(extension, {}).items(), key=lambda item: int(item[0])
+            )
+        )
+
+    jpeg = variants.get("jpeg", {})
+    fallback = jpeg[max(jpeg, key=int)] if jpeg else field_file.name
+    return format_html(
+        "<picture>"
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}>'
+        "</picture>",
+        srcset("webp"),
+        sizes,
+        storage.url(fallback),
+        srcset("jpeg"),
+        sizes,
+        flatatt(attrs),
+    )
@@ -1,3 +1,387 @@
-from django.test import TestCase
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.db import pinned_to_primary, replica_reads
+from core.middleware import PIN_COOKIE
+from users.common.testing import (
+    AppTestCase,
+    AppTransactionTestCase,
+    QueryBudgetMixin,
+    clear_caches,
+    create_profile,
+    extra_database,
+)
+from .cache import get_profile
+from .follows import follow
+from .management.commands.gc_media import Command as GCMediaCommand
+from .models import Blob, Profile
+from .storage import profile_media_storage
+
+REPLICA = "replica_test"
+
+
+class ProfilePageBudgetTests(QueryBudgetMixin, AppTestCase):
+    budgets = ("profiles:index", "profiles:index_with_pk")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = create_profile("reader")
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTests(AppTransactionTestCase):
+    """
+    Reads against a second connection to the test database, standing in for a
+    replica; committed data, so both connections see it.
+    """
+
+    # Resolved in setUpClass, once the replica alias exists.
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.enterClassContext(extra_database(REPLICA, TEST={"MIRROR": "default"}))
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        self.viewer = create_profile("viewer")
+        self.other = create_profile("other", first_name="Zoë")
+        self.client.force_login(self.viewer.user)
+
+    def _reads(self, url, **params):
+        clear_caches()
+        self.client.force_login(self.viewer.user)
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary:
+                response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(primary), len(replica)
+
+    def test_router(self):
+        self.assertEqual(router.db_for_read(Profile), DEFAULT_DB_ALIAS)
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Profile), REPLICA)
+            self.assertEqual(router.db_for_write(Profile), DEFAULT_DB_ALIAS)
+            with pinned_to_primary():
+                self.assertEqual(router.db_for_read(Profile), DEFAULT_DB_ALIAS)
+        self.assertFalse(router.allow_migrate(REPLICA, "profiles"))
+
+    def test_profile_page_reads_from_replica(self):
+        url = reverse("profiles:index_with_pk", kwargs={"pk": self.other.pk})
+        _, replica = self._reads(url)
+        self.assertGreater(replica, 0)
+
+    def test_search_reads_from_replica(self):
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            self._reads(reverse("profiles:search"), q="zoe")
+        self.assertTrue(
+            any("profiles_profile_fts" in query["sql"] for query in replica)
+        )
+
+    def test_profile_update_pins_reads_to_primary(self):
+        url = reverse("profiles:index_with_pk", kwargs={"pk": self.other.pk})
+        response = self.client.post(
+            reverse("profiles:update"),
+            {
+                "first_name": "Viewer",
+                "last_name": "Updated",
+                "sex": Profile.Sex.MALE,
+                "birthdate": "2000-01-01",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(Profile.objects.get(pk=self.viewer.pk).last_name, "Updated")
+        primary, replica = self._reads(url)
+        self.assertEqual(replica, 0)
+        self.assertGreater(primary, 0)
+
+        # Back on the replica once the pin expires.
+        self.client.cookies[PIN_COOKIE] = str(time.time() - 1)
+        _, replica = self._reads(url)
+        self.assertGreater(replica, 0)
+
+    def test_registration_pins_reads_to_primary(self):
+        self.client.logout()
+        password = "Correct-Horse-Battery-9"
+        response = self.client.post(
+            reverse("users:register"),
+            {
+                "user_form-email": "new@example.com",
+                "user_form-password1": password,
+                "user_form-password2": password,
+                "profile_form-first_name": "New",
+                "profile_form-last_name": "User",
+                "profile_form-sex": Profile.Sex.FEMALE,
+                "profile_form-birthdate": "2000-01-01",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Profile.objects.filter(user__email="new@example.com").exists())
+        pinned_until = float(response.cookies[PIN_COOKIE].value)
+        self.assertAlmostEqual(
+            pinned_until, time.time() + settings.DATABASE_PIN_SECONDS, delta=5
+        )
+
+
+class SQLitePragmaTests(SimpleTestCase):
+    # What SQLite reports back for the values in SQLITE_PRAGMAS.
+    reported = {"journal_mode": "wal", "synchronous": 1, "temp_store": 2}
+
+    def test_new_connections_get_pragmas(self):
+        with tempfile.TemporaryDirectory() as directory:
+            name = os.path.join(directory, "db.sqlite3")
+            with extra_database("pragmas", NAME=name) as connection:
+                with connection.cursor() as cursor:
+                    for pragma, value in settings.SQLITE_PRAGMAS.items():
+                        with self.subTest(pragma=pragma):
+                            cursor.execute(f"PRAGMA {pragma}")
+                            self.assertEqual(
+                                cursor.fetchone()[0], self.reported.get(pragma, value)
+                            )
+
+
+class MediaStorageTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media_root = override_settings(MEDIA_ROOT=directory.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.storage = profile_media_storage()
+        self.alice = create_profile("alice")
+        self.bob = create_profile("bob")
+
+    def _upload(self, profile, content):
+        profile.avatar.save("avatar.png", ContentFile(content))
+        return profile.avatar.name
+
+    def _references(self, name):
+        blob = Blob.objects.filter(name=name).first()
+        return None if blob is None else blob.references
+
+    def _gc(self, *args):
+        call_command("gc_media", *args, stdout=StringIO())
+
+    def _age_blobs(self):
+        Blob.objects.update(touched_at=timezone.now() - timedelta(days=1))
+
+    def test_identical_uploads_share_a_blob(self):
+        name = self._upload(self.alice, b"same")
+        self.assertEqual(self._upload(self.bob, b"same"), name)
+        self.assertEqual(self._references(name), 2)
+        self.assertEqual(len(self.storage.listdir(os.path.dirname(name))[1]), 1)
+
+    def test_replacing_and_reuploading_moves_references(self):
+        first = self._upload(self.alice, b"first")
+        second = self._upload(self.alice, b"second")
+        self.assertEqual((self._references(first), self._references(second)), (0, 1))
+        self.assertEqual(self._upload(self.alice, b"first"), first)
+        self.assertEqual((self._references(first), self._references(second)), (1, 0))
+        self.alice.delete()
+        self.assertEqual(self._references(first), 0)
+
+    def test_gc_removes_only_unreferenced_blobs_past_grace(self):
+        kept = self._upload(self.alice, b"kept")
+        dropped = self._upload(self.bob, b"dropped")
+        self._upload(self.bob, b"replacement")
+        self._gc()  # Still within the grace period
+        self.assertTrue(self.storage.exists(dropped))
+
+        self._age_blobs()
+        self._gc()
+        self.assertFalse(self.storage.exists(dropped))
+        self.assertIsNone(self._references(dropped))
+        self.assertTrue(self.storage.exists(kept))
+        self.assertEqual(self._references(kept), 1)
+
+    def test_gc_keeps_a_blob_referenced_during_the_sweep(self):
+        name = self._upload(self.alice, b"shared")
+        self._upload(self.alice, b"replacement")
+        self._age_blobs()
+        delete_blob_file = GCMediaCommand._delete_blob_file
+
+        def reference_first(command, blob_name):
+            # After the sweep deleted the row, before it deletes the file.
+            self.bob.avatar = blob_name
+            self.bob.save()
+            return delete_blob_file(command, blob_name)
+
+        with mock.patch.object(GCMediaCommand, "_delete_blob_file", reference_first):
+            self._gc()
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self._references(name), 1)
+
+    def test_gc_keeps_a_blob_reuploaded_while_its_file_is_moved_aside(self):
+        name = self._upload(self.alice, b"shared")
+        self._upload(self.alice, b"replacement")
+        self._age_blobs()
+        rename = os.rename
+
+        def upload_after_move(source, destination):
+            rename(source, destination)
+            if os.path.basename(destination).startswith(".gc-"):
+                self.assertEqual(self._upload(self.bob, b"shared"), name)
+
+        with mock.patch("os.rename", upload_after_move):
+            self._gc()
+        self.assertTrue(self.storage.exists(name))
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), b"shared")
+        self.assertEqual(self._references(name), 1)
+        self.assertEqual(
+            [
+                file
+                for file in self.storage.listdir(os.path.dirname(name))[1]
+                if file.startswith((".gc-", ".upload-"))
+            ],
+            [],
+        )
+
+    def test_scan_removes_orphaned_files(self):
+        name = self._upload(self.alice, b"orphan")
+        Blob.objects.filter(name=name).delete()
+        old = time.time() - 86400
+        os.utime(self.storage.path(name), (old, old))
+        self._gc("--scan")
+        self.assertFalse(self.storage.exists(name))
+
+
+class ConditionalGetTests(AppTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = create_profile("viewer")
+        cls.other = create_profile("other")
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.viewer.user)
+        self.url = reverse("profiles:index_with_pk", kwargs={"pk": self.other.pk})
+        # The first page sets the CSRF cookie, which the ETag covers.
+        self.client.get(self.url)
+
+    def _get(self, **headers):
+        return self.client.get(self.url, headers=headers)
+
+    def test_repeated_get_is_not_modified(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        response = self._get(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(self._get(if_modified_since=last_modified).status_code, 304)
+
+    def _assert_changes_etag(self, change):
+        etag = self._get()["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self._get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_profile_update_changes_etag(self):
+        def update():
+            self.other.bio = "Changed"
+            self.other.save()
+
+        self._assert_changes_etag(update)
+
+    def test_viewer_update_changes_etag(self):
+        # The header shows the viewer's own profile.
+        self._assert_changes_etag(
+            lambda: self.client.post(
+                reverse("profiles:update"),
+                {
+                    "first_name": "Renamed",
+                    "last_name": "Viewer",
+                    "sex": Profile.Sex.MALE,
+                    "birthdate": "2000-01-01",
+                },
+            )
+        )
+
+    def test_follow_changes_etag(self):
+        self._assert_changes_etag(
+            lambda: self.client.post(
+                reverse("profiles:follow", kwargs={"pk": self.other.pk})
+            )
+        )
+
+    def test_new_csrf_cookie_changes_etag(self):
+        etag = self._get()["ETag"]
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = "x" * 32
+        response = self._get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class ProfileCacheTests(AppTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_profile("alice")
+        cls.bob = create_profile("bob")
+
+    def test_save_evicts_cached_profile_on_commit(self):
+        cached = get_profile(self.alice.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.alice.bio = "Changed"
+            self.alice.save()
+            # Until the transaction commits, others still get the old row.
+            self.assertEqual(get_profile(self.alice.pk).bio, "")
+        for callback in callbacks:
+            callback()
+        profile = get_profile(self.alice.pk)
+        self.assertEqual(profile.bio, "Changed")
+        self.assertGreater(profile.version, cached.version)
+
+    def test_follow_evicts_both_profiles(self):
+        cached = {pk: get_profile(pk) for pk in (self.alice.pk, self.bob.pk)}
+        with self.captureOnCommitCallbacks(execute=True):
+            follow(self.alice, self.bob)
+        alice, bob = get_profile(self.alice.pk), get_profile(self.bob.pk)
+        self.assertEqual((alice.following_count, bob.followers_count), (1, 1))
+        self.assertGreater(alice.version, cached[alice.pk].version)
+        self.assertGreater(bob.version, cached[bob.pk].version)
+
+
+class ReconcileFollowCountsTests(AppTestCase):
+    def test_fixes_drifted_counters(self):
+        alice, bob, carol = (create_profile(name) for name in ("alice", "bob", "carol"))
+        follow(alice, bob)
+        follow(carol, bob)
+        Profile.objects.filter(pk=bob.pk).update(followers_count=7)
+        Profile.objects.filter(pk=carol.pk).update(following_count=0)
+        versions = dict(Profile.objects.values_list("pk", "version"))
+        cached = get_profile(bob.pk)
+        self.assertEqual(cached.followers_count, 7)
+
+        stdout = StringIO()
+        call_command("reconcile_follow_counts", "--chunk-size=2", stdout=stdout)
+        self.assertIn("fixed 2 of 3", stdout.getvalue())
+        counts = {
+            profile.pk: (profile.followers_count, profile.following_count)
+            for profile in Profile.objects.all()
+        }
+        self.assertEqual(counts, {alice.pk: (0, 1), bob.pk: (2, 0), carol.pk: (0, 1)})
+        # Only the fixed profiles are marked as changed, and not served stale.
+        self.assertEqual(Profile.objects.get(pk=alice.pk).version, versions[alice.pk])
+        self.assertGreater(Profile.objects.get(pk=bob.pk).version, versions[bob.pk])
+        self.assertEqual(get_profile(bob.pk).followers_count, 2)
@@ -1,7 +1,13 @@
 from django.urls import path
 
-from .views import ProfileView, ProfileUpdateView
-
+from .views import (
+    ProfileView,
+    ProfileUpdateView,
+    FollowView,
+    UnfollowView,
+    ProfileSearchView,
+    PresenceView,
+)
 
 app_name = "profiles"
 
@@ -9,4 +15,8 @@ urlpatterns = [
     path("", ProfileView.as_view(), name="index"),  # Default to current user's profile
     path("<int:pk>/", ProfileView.as_view(), name="index_with_pk"),
     path("update/", ProfileUpdateView.as_view(), name="update"),
-]
\ No newline at end of file
+    path("search/", ProfileSearchView.as_view(), name="search"),
+    path("<int:pk>/follow/", FollowView.as_view(), name="follow"),
+    path("<int:pk>/unfollow/", UnfollowView.as_view(), name="unfollow"),
+    path("<int:pk>/presence/", PresenceView.as_view(), name="presence"),
+]
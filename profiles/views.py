@@ -1,55 +1,206 @@
-from django.shortcuts import render
-from django.views.generic import UpdateView, DetailView
+import copy
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect
+from django.views import View
+from django.db import DEFAULT_DB_ALIAS
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseRedirect, Http404
 from django.template.loader import render_to_string
-from django.shortcuts import get_object_or_404
 
-from profiles.models import Profile
+from core.db import ReplicaReadMixin
+from profiles.cache import aget_profile, aget_stamp, get_profile, get_profile_for_user
+from profiles.conditional import not_modified, page_validators, set_validators, stamp
 from profiles.forms import ProfileUpdateForm
+from profiles.images import schedule_variants
+from profiles.models import Profile
+from profiles.follows import follow, unfollow, is_following, ais_following
+from profiles.search import search_profiles
+from users.common.asyncviews import AsyncLoginRequiredMixin
 from users.common.common import is_htmx
+from users.presence import aget_presence
 
 
-class ProfileView(LoginRequiredMixin, DetailView):
-    model = Profile
+class ProfileView(ReplicaReadMixin, AsyncLoginRequiredMixin, View):
     template_name = "profiles/profile.html"
-    context_object_name = "profile"
 
-    def get_object(self):
-        pk = self.kwargs.get("pk")
-        if pk:
-            return get_object_or_404(Profile, pk=pk)
+    async def get(self, request, pk=None):
+        viewer = request.current_profile
+        if pk is None and viewer is not None:
+            pk = viewer.pk
+        is_own_profile = viewer is not None and viewer.pk == pk
+        viewer_stamps = [] if viewer is None else [stamp(viewer)]
+        if is_own_profile:
+            profile_stamp = stamp(viewer)
         else:
-            return get_object_or_404(Profile, user=self.request.user)
+            profile_stamp = None if pk is None else await aget_stamp(pk)
+        if profile_stamp is None:
+            raise Http404("No profile found.")
+        response = not_modified(
+            request,
+            *page_validators(
+                request, self.template_name, profile_stamp, *viewer_stamps
+            ),
+        )
+        if response is not None:
+            return response
+
+        profile = viewer if is_own_profile else await aget_profile(pk)
+        if profile is None:
+            raise Http404("No profile found.")
+        context = {
+            "profile": profile,
+            "is_own_profile": is_own_profile,
+            "is_following": viewer is not None
+            and not is_own_profile
+            and await ais_following(viewer.pk, profile.pk),
+        }
+        response = render(request, self.template_name, context)
+        # Again, from the profile actually rendered (which may be newer than
+        # the stamp) and the CSRF secret rendering may have set.
+        set_validators(
+            response,
+            *page_validators(
+                request, self.template_name, stamp(profile), *viewer_stamps
+            ),
+        )
+        return response
 
 
-class ProfileUpdateView(LoginRequiredMixin, UpdateView):
-    model = Profile
+class ProfileUpdateView(AsyncLoginRequiredMixin, View):
     form_class = ProfileUpdateForm
     template_name = "profiles/update_form_modal.html"
     success_url = reverse_lazy("profiles:index")
 
-    def get_object(self):
-        return self.request.user.profile
+    async def get(self, request):
+        profile = self.get_object()
+        response = not_modified(
+            request, *page_validators(request, self.template_name, stamp(profile))
+        )
+        if response is not None:
+            return response
+        context = {
+            "profile": profile,
+            "profile_form": self.form_class(instance=profile),
+        }
+        response = render(request, self.template_name, context)
+        set_validators(
+            response, *page_validators(request, self.template_name, stamp(profile))
+        )
+        return response
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context["profile_form"] = self.form_class(instance=self.request.user.profile)
-        return context
+    async def post(self, request):
+        # The row itself: the cached copy may be behind it by up to
+        # PROFILE_CACHE_LOCAL_TTL seconds.
+        profile = await Profile.objects.using(DEFAULT_DB_ALIAS).aget(
+            pk=self.get_object().pk
+        )
+        form = self.form_class(request.POST, request.FILES, instance=profile)
+        if form.is_valid():
+            return await self.form_valid(form)
+        return self.form_invalid(form)
+
+    def get_object(self):
+        # Loaded by AsyncLoginRequiredMixin. Copied, as binding the form
+        # modifies it and the header renders the original.
+        if self.request.current_profile is None:
+            raise Http404("No profile found.")
+        return copy.copy(self.request.current_profile)
 
-    def form_valid(self, form):
-        response = super().form_valid(form)
+    async def form_valid(self, form):
+        changed_images = [
+            name for name in ("avatar", "cover_image") if name in form.changed_data
+        ]
+        profile = form.save(commit=False)
+        # Only what the form changed, so counters and image variants updated
+        # since the row was read are kept.
+        update_fields = set(form.changed_data)
+        for name in changed_images:
+            setattr(profile, f"{name}_variants", {})
+            update_fields.add(f"{name}_variants")
+        if "avatar" in changed_images:
+            # The user's own picture; stop syncing the remote one.
+            profile.avatar_source_url = profile.avatar_source_etag = ""
+            update_fields.update(["avatar_source_url", "avatar_source_etag"])
+        await profile.asave(update_fields=update_fields)
+        for name in changed_images:
+            # Reads the upload back from storage before queueing it.
+            await sync_to_async(schedule_variants, thread_sensitive=False)(
+                profile, name
+            )
         if is_htmx(self.request):
             response = HttpResponse()
             response["HX-Redirect"] = self.success_url
             return response
-        return response
+        return HttpResponseRedirect(self.success_url)
 
     def form_invalid(self, form):
+        context = {"profile_form": form}
         if is_htmx(self.request):
-            html = render_to_string(
-                self.template_name, {"profile_form": form}, request=self.request
-            )
+            html = render_to_string(self.template_name, context, request=self.request)
             return JsonResponse({"html": html}, status=400)
-        return super().form_invalid(form)
+        return render(self.request, self.template_name, context)
+
+
+def get_follow_context(request, profile):
+    viewer = get_profile_for_user(request.user.pk)
+    is_own_profile = viewer is not None and viewer.pk == profile.pk
+    return {
+        "is_own_profile": is_own_profile,
+        "is_following": viewer is not None
+        and not is_own_profile
+        and is_following(viewer.pk, profile.pk),
+    }
+
+
+class FollowView(LoginRequiredMixin, View):
+    template_name = "profiles/_follow_stats.html"
+
+    def post(self, request, pk):
+        follower = get_profile_for_user(request.user.pk)
+        followee = get_profile(pk)
+        if follower is None or followee is None:
+            raise Http404("No profile found.")
+        self.change_follow(follower, followee)
+        if is_htmx(request):
+            followee = get_profile(pk)
+            context = {"profile": followee, **get_follow_context(request, followee)}
+            return render(request, self.template_name, context)
+        return redirect("profiles:index_with_pk", pk=pk)
+
+    def change_follow(self, follower, followee):
+        follow(follower, followee)
+
+
+class UnfollowView(FollowView):
+
+    def change_follow(self, follower, followee):
+        unfollow(follower, followee)
+
+
+class ProfileSearchView(ReplicaReadMixin, LoginRequiredMixin, View):
+    template_name = "profiles/search.html"
+
+    def get(self, request):
+        query = request.GET.get("q", "")
+        context = {"query": query, "results": search_profiles(query)}
+        if is_htmx(request):
+            return render(request, "profiles/_search_results.html", context)
+        return render(request, self.template_name, context)
+
+
+class PresenceView(AsyncLoginRequiredMixin, View):
+    """
+    Online status or last activity of a profile's user, polled by profile.html.
+    """
+
+    template_name = "profiles/_presence.html"
+
+    async def get(self, request, pk):
+        profile = await aget_profile(pk)
+        if profile is None:
+            raise Http404("No profile found.")
+        last_seen, online = await aget_presence(profile.user_id)
+        context = {"last_seen": last_seen, "online": online}
+        return render(request, self.template_name, context)
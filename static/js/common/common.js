@@ -46,4 +46,15 @@ document.addEventListener("htmx:beforeSwap", function (event) {
     const inputs = document.querySelectorAll("input");
     inputs.forEach(showHelpRemoveError);
   }
+  if (event.detail.xhr.status === 429) {
+    // Rate limited: show the notice above the form and keep what was typed.
+    const previous = document.getElementById("rate-limited");
+    if (previous) {
+      previous.remove();
+    }
+    event.detail.target.insertAdjacentHTML(
+      "afterbegin",
+      JSON.parse(event.detail.xhr.responseText).html
+    );
+  }
 });
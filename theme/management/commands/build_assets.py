@@ -0,0 +1,76 @@
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+ASSET_RE = re.compile(r"""(?:href|src)="([^"]+)\"""")
+CSS_URL_RE = re.compile(r"""url\(["']?([^"')]+)["']?\)""")
+
+
+class Command(BaseCommand):
+    help = (
+        "Production static build: subset Font Awesome, collect, fingerprint and "
+        "precompress static files, then report the bytes a first visit to the "
+        "login page downloads (raw, gzip and brotli)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--skip-subset",
+            action="store_true",
+            help="Reuse the committed static/fontawesome-subset.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["skip_subset"]:
+            call_command("subset_fontawesome", stdout=self.stdout)
+        call_command("collectstatic", interactive=False, verbosity=0)
+        self._report()
+
+    def _report(self):
+        client = Client(HTTP_HOST="localhost")
+        html = client.get(reverse("users:login")).content.decode()
+        names = [
+            self._stored_name(url)
+            for url in ASSET_RE.findall(html)
+            if url.startswith(settings.STATIC_URL)
+            or url.startswith("/" + settings.STATIC_URL)
+        ]
+        for name in list(names):
+            if name.endswith(".css"):
+                css = staticfiles_storage.open(name).read().decode()
+                directory = os.path.dirname(name)
+                names += [
+                    os.path.normpath(os.path.join(directory, url.split("?")[0]))
+                    for url in CSS_URL_RE.findall(css)
+                    if not url.startswith(("data:", "http", "/"))
+                ]
+
+        totals = [0, 0, 0]
+        for name in dict.fromkeys(names):
+            sizes = [
+                self._size(name + suffix) or self._size(name)
+                for suffix in ("", ".gz", ".br")
+            ]
+            totals = [total + size for total, size in zip(totals, sizes)]
+            self.stdout.write(f"{name}: {sizes[0]} / {sizes[1]} gz / {sizes[2]} br")
+        self.stdout.write(
+            f"First page static bytes: {totals[0]} raw, {totals[1]} gzip, "
+            f"{totals[2]} brotli"
+        )
+
+    def _stored_name(self, url):
+        name = url.split("?")[0].lstrip("/")[len(settings.STATIC_URL.lstrip("/")) :]
+        try:
+            return staticfiles_storage.stored_name(name)
+        except ValueError:
+            return name  # Already the hashed name
+
+    def _size(self, name):
+        path = staticfiles_storage.path(name)
+        return os.path.getsize(path) if os.path.exists(path) else 0
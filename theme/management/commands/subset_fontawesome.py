@@ -0,0 +1,173 @@
+import os
+import re
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+
+SOURCE_DIR = Path(settings.BASE_DIR) / "static" / "fontawesome"
+OUTPUT_DIR = Path(settings.BASE_DIR) / "static" / "fontawesome-subset"
+
+CLASS_RE = re.compile(r"""class\s*=\s*["']([^"']*)["']""")
+SVG_RE = re.compile(r"fontawesome(?:-subset)?/svgs/([\w-]+/[\w-]+\.svg)")
+CLASS_TOKEN_RE = re.compile(r"\.([\w-]+)")
+FONT_URL_RE = re.compile(r'url\("\.\./webfonts/([\w-]+)\.woff2"\)')
+
+# Font file needed by each style class.
+STYLE_FONTS = {
+    "fa": "fa-solid-900",
+    "fas": "fa-solid-900",
+    "fa-solid": "fa-solid-900",
+    "far": "fa-regular-400",
+    "fa-regular": "fa-regular-400",
+    "fab": "fa-brands-400",
+    "fa-brands": "fa-brands-400",
+}
+
+
+def _template_dirs():
+    for engine in engines.all():
+        yield from engine.template_dirs
+
+
+def _scan_templates():
+    """
+    Return the Font Awesome classes and SVG files referenced by the templates.
+    """
+
+    classes, svgs = set(), set()
+    for directory in _template_dirs():
+        for path in Path(directory).rglob("*.html"):
+            text = path.read_text(encoding="utf-8")
+            for match in CLASS_RE.finditer(text):
+                classes.update(
+                    token
+                    for token in match.group(1).split()
+                    if token in STYLE_FONTS or token.startswith("fa-")
+                )
+            svgs.update(SVG_RE.findall(text))
+    return classes, svgs
+
+
+def _blocks(css):
+    """
+    Yield ``(prelude, body)`` for each top-level block of a stylesheet.
+    """
+
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    depth, start, prelude = 0, 0, ""
+    for index, char in enumerate(css):
+        if char == "{":
+            if depth == 0:
+                prelude, start = css[start:index].strip(), index + 1
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                yield prelude, css[start:index].strip()
+                start = index + 1
+
+
+def _subset_css(css, classes):
+    """
+    Keep the rules of ``css`` whose selectors only use ``classes``.
+
+    Returns:
+        tuple: ``(stylesheet, font_files, codepoints)``.
+    """
+
+    fonts = {STYLE_FONTS[name] for name in classes if name in STYLE_FONTS}
+    codepoints, rules = set(), []
+    for prelude, body in _blocks(css):
+        if prelude == "@font-face":
+            match = FONT_URL_RE.search(body)
+            if match and match.group(1) in fonts and "Font Awesome 6" in body:
+                # Every browser we support takes woff2; drop the ttf fallback.
+                body = re.sub(
+                    r"src:[^;]*", f'src: {match.group(0)} format("woff2")', body
+                )
+                rules.append(f"@font-face{{{' '.join(body.split())}}}")
+            continue
+        if prelude.startswith("@keyframes"):
+            if prelude.split()[1] in classes:
+                rules.append(f"{prelude}{{{body}}}")
+            continue
+        if prelude.startswith(("@", ":root")):
+            continue
+        selectors = [
+            selector.strip()
+            for selector in prelude.split(",")
+            if set(CLASS_TOKEN_RE.findall(selector.split(":")[0])) <= classes
+            and CLASS_TOKEN_RE.search(selector)
+        ]
+        if not selectors:
+            continue
+        rules.append(f"{','.join(selectors)}{{{' '.join(body.split())}}}")
+        match = re.search(r'content:\s*"\\([0-9a-f]+)"', body)
+        if match:
+            codepoints.add(int(match.group(1), 16))
+    return "\n".join(rules) + "\n", fonts, codepoints
+
+
+class Command(BaseCommand):
+    help = (
+        "Write static/fontawesome-subset/ with only the Font Awesome icons the "
+        "templates use: a trimmed stylesheet, subsetted woff2 fonts and copies "
+        "of the referenced SVGs. Run it after adding or removing icons."
+    )
+
+    def handle(self, *args, **options):
+        try:
+            from fontTools import subset
+        except ImportError:
+            raise CommandError(
+                "Subsetting fonts needs fontTools: pip install fonttools brotli"
+            )
+
+        classes, svgs = _scan_templates()
+        css = (SOURCE_DIR / "css" / "all.css").read_text(encoding="utf-8")
+        stylesheet, fonts, codepoints = _subset_css(css, classes)
+
+        if OUTPUT_DIR.exists():
+            shutil.rmtree(OUTPUT_DIR)
+        (OUTPUT_DIR / "css").mkdir(parents=True)
+        (OUTPUT_DIR / "webfonts").mkdir()
+        header = (
+            "/* Generated by `manage.py subset_fontawesome` from Font Awesome Free "
+            "(https://fontawesome.com/license/free). Do not edit. */\n"
+        )
+        (OUTPUT_DIR / "css" / "fontawesome.css").write_text(header + stylesheet)
+
+        for font in sorted(fonts):
+            font_options = subset.Options()
+            font_options.flavor = "woff2"
+            font_options.layout_features = []
+            font_file = subset.load_font(
+                str(SOURCE_DIR / "webfonts" / f"{font}.woff2"), font_options
+            )
+            subsetter = subset.Subsetter(font_options)
+            subsetter.populate(unicodes=codepoints)
+            subsetter.subset(font_file)
+            subset.save_font(
+                font_file, str(OUTPUT_DIR / "webfonts" / f"{font}.woff2"), font_options
+            )
+
+        for svg in sorted(svgs):
+            target = OUTPUT_DIR / "svgs" / svg
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(SOURCE_DIR / "svgs" / svg, target)
+
+        before = os.path.getsize(SOURCE_DIR / "css" / "all.min.css") + sum(
+            os.path.getsize(SOURCE_DIR / "webfonts" / f"{font}.woff2") for font in fonts
+        )
+        after = sum(
+            path.stat().st_size
+            for path in OUTPUT_DIR.rglob("*")
+            if path.is_file() and path.suffix != ".svg"
+        )
+        self.stdout.write(
+            f"{len(codepoints)} icons, {len(fonts)} fonts, {len(svgs)} SVGs; "
+            f"stylesheet + fonts: {before} -> {after} bytes"
+        )
@@ -2,17 +2,21 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth import get_user_model
 
+from .common.admin import LargeTableAdminMixin
 from .forms import CustomUserCreationForm, CustomUserChangeForm
+from .models import OutboxEmail
 
 
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(LargeTableAdminMixin, UserAdmin):
     add_form = CustomUserCreationForm
     form = CustomUserChangeForm
     model = get_user_model()
     # Specify the fields to be displayed in the list view of the admin
-    list_display = ['email', 'is_staff', 'is_active']
+    list_display = ['email', 'profile', 'is_staff', 'is_active']
+    # Join the profile instead of querying it per row
+    list_select_related = ['profile']
     # Specify the fields to be used as filters in the list view of the admin
-    list_filter = ['email', 'is_staff', 'is_active']
+    list_filter = ['is_staff', 'is_active']
     # Define the layout of fields in the detail view of the admin
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
@@ -26,7 +30,15 @@ class CustomUserAdmin(UserAdmin):
         }),
     )
     # Specify the fields to be used in the search functionality of the admin
-    search_fields = ['email']
-    # Specify the default ordering of the user list in the admin
-    ordering = ['email']
-admin.site.register(get_user_model(), CustomUserAdmin)
\ No newline at end of file
+    # (email prefixes, served by the unique index)
+    search_fields = ['^email']
+    search_help_text = 'Emails starting with the search term.'
+    # Newest first, paged by primary key
+    ordering = ['-pk']
+admin.site.register(get_user_model(), CustomUserAdmin)
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['recipients', 'status', 'attempts', 'next_attempt_at', 'created_at']
+    list_filter = ['status']
+    readonly_fields = ['last_error', 'sent_at']
@@ -0,0 +1,183 @@
+import asyncio
+import copy
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model, load_backend, user_login_failed
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+
+from profiles.cache import prime_profile
+from users.common.lru import LRUCache
+from users.common.pools import get_process_pool
+from users.email_filter import email_filter
+
+UserModel = get_user_model()
+
+_users = LRUCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
+
+
+def _check_password(password, encoded):
+    """
+    Verify ``password`` against ``encoded``. Runs in a worker process.
+
+    Returns:
+        tuple: ``(is_correct, new_encoded)``; ``new_encoded`` is set when the
+        hash should be upgraded to the preferred hasher.
+    """
+
+    if encoded is None:
+        make_password(password)
+        return False, None
+    upgraded = []
+    is_correct = check_password(
+        password, encoded, setter=lambda raw: upgraded.append(make_password(raw))
+    )
+    return is_correct, upgraded[0] if upgraded else None
+
+
+def _submit(password, encoded):
+    pool = get_process_pool("passwords", settings.PASSWORD_HASH_WORKERS)
+    return pool.submit(_check_password, password, encoded)
+
+
+async def amake_password(password):
+    """
+    Hash ``password`` on the password pool without blocking the event loop.
+    """
+
+    pool = get_process_pool("passwords", settings.PASSWORD_HASH_WORKERS)
+    return await asyncio.wrap_future(pool.submit(make_password, password))
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ``ModelBackend`` that verifies password hashes in a process pool.
+
+    The request thread only waits on the result (without holding the GIL), so
+    PBKDF2 no longer competes with other requests for the worker's CPU. Hashes
+    made by an outdated hasher are upgraded on a successful login, like
+    ``User.check_password`` does.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        username = self._get_username(username, kwargs)
+        if username is None or password is None:
+            return None
+        user = None
+        if email_filter.might_exist(username):
+            try:
+                user = UserModel._default_manager.get_by_natural_key(username)
+            except UserModel.DoesNotExist:
+                email_filter.record_false_positive()
+        if user is None:
+            # Hash anyway so unknown emails take as long as wrong passwords.
+            _submit(password, None).result()
+            return None
+        is_correct, new_encoded = _submit(password, user.password).result()
+        return self._finish(user, is_correct, new_encoded)
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        username = self._get_username(username, kwargs)
+        if username is None or password is None:
+            return None
+        user = None
+        if await sync_to_async(email_filter.might_exist)(username):
+            try:
+                user = await UserModel._default_manager.aget(
+                    **{UserModel.USERNAME_FIELD: username}
+                )
+            except UserModel.DoesNotExist:
+                email_filter.record_false_positive()
+        if user is None:
+            await asyncio.wrap_future(_submit(password, None))
+            return None
+        is_correct, new_encoded = await asyncio.wrap_future(
+            _submit(password, user.password)
+        )
+        if is_correct and new_encoded:
+            user.password = new_encoded
+            await user.asave(update_fields=["password"])
+            new_encoded = None
+        return self._finish(user, is_correct, new_encoded)
+
+    def get_user(self, user_id):
+        """
+        Resolve the session's user, with their profile, in at most one query.
+
+        Users are kept in a per-process cache for ``USER_CACHE_TTL`` seconds;
+        the profile loaded alongside primes the profile cache, so views and
+        templates asking for the current profile do not query again.
+        """
+
+        user_id = UserModel._meta.pk.to_python(user_id)
+        user = _users.get(user_id)
+        if user is None:
+            user = (
+                UserModel._default_manager.select_related("profile")
+                .filter(pk=user_id)
+                .first()
+            )
+            if user is None:
+                return None
+            try:
+                prime_profile(user.profile)
+            except ObjectDoesNotExist:
+                pass
+            _users.set(user_id, user)
+        user = copy.copy(user)
+        return user if self.user_can_authenticate(user) else None
+
+    def _get_username(self, username, kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        return username
+
+    def _finish(self, user, is_correct, new_encoded):
+        if not is_correct:
+            return None
+        if new_encoded:
+            user.password = new_encoded
+            user.save(update_fields=["password"])
+        return user if self.user_can_authenticate(user) else None
+
+
+def forget_user(user_id):
+    """
+    Drop a user from this process' cache after it (or its profile) changed.
+    """
+
+    _users.delete(user_id)
+
+
+async def aauthenticate(request=None, **credentials):
+    """
+    Async counterpart of ``django.contrib.auth.authenticate``.
+
+    Backends with an ``aauthenticate`` method are awaited directly; others run
+    through ``sync_to_async``.
+    """
+
+    for backend_path in settings.AUTHENTICATION_BACKENDS:
+        backend = load_backend(backend_path)
+        try:
+            if hasattr(backend, "aauthenticate"):
+                user = await backend.aauthenticate(request, **credentials)
+            else:
+                user = await sync_to_async(backend.authenticate)(request, **credentials)
+        except PermissionDenied:
+            break
+        if user is not None:
+            user.backend = backend_path
+            return user
+
+    await sync_to_async(user_login_failed.send)(
+        sender=__name__,
+        credentials={
+            key: "*" * 20 if key == "password" else value
+            for key, value in credentials.items()
+        },
+        request=request,
+    )
+    return None
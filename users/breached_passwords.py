@@ -0,0 +1,93 @@
+"""
+Password validation against breached-password corpora.
+
+``build_breached_passwords`` turns password lists (or SHA-1 hash lists such as
+Have I Been Pwned's) into a ``SortedIndex`` of SHA-1 prefixes at
+``BREACHED_PASSWORDS_PATH``. Every process maps that file instead of loading
+it, so the OS page cache holds one copy however many workers there are, and a
+check is a binary search over a few pages.
+
+Each process reopens the index when the file is replaced. Until one has been
+built, ``BreachedPasswordValidator`` falls back to Django's
+``CommonPasswordValidator``.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.auth.password_validation import CommonPasswordValidator
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext as _
+
+from .common.sortedindex import SortedIndex
+
+logger = logging.getLogger("users")
+
+_index = None
+_index_key = None
+_lock = threading.Lock()
+
+
+def password_key(password):
+    """
+    Return the key a password is stored under (its SHA-1, which the index
+    truncates to its key size).
+    """
+
+    return hashlib.sha1(password.encode()).digest()
+
+
+def get_index():
+    """
+    Return this process' mapping of the breached-password index, or None if
+    there is no usable index file.
+    """
+
+    global _index, _index_key
+    path = settings.BREACHED_PASSWORDS_PATH
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if key != _index_key:
+        with _lock:
+            if key != _index_key:
+                try:
+                    # The old mapping is left to the garbage collector, as
+                    # other threads may still be searching it.
+                    _index = SortedIndex(path)
+                except (OSError, ValueError) as exc:
+                    logger.warning(f"Ignoring breached password index {path}: {exc}")
+                    _index = None
+                _index_key = key
+    return _index
+
+
+class BreachedPasswordValidator:
+    """
+    Reject passwords that appear in the breached-password index.
+    """
+
+    def __init__(self):
+        self._fallback = None
+
+    def validate(self, password, user=None):
+        index = get_index()
+        if index is None:
+            if self._fallback is None:
+                self._fallback = CommonPasswordValidator()
+            self._fallback.validate(password, user)
+        elif password_key(password) in index:
+            raise ValidationError(
+                _("This password has appeared in a data breach."),
+                code="password_breached",
+            )
+
+    def get_help_text(self):
+        return _("Your password can’t be one that has appeared in a data breach.")
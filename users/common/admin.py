@@ -0,0 +1,136 @@
+"""
+Admin changelists for tables too large to count or page by offset.
+
+``LargeTableAdminMixin`` makes a ``ModelAdmin``:
+
+- show an estimated row count for the unfiltered table (``pg_class`` on
+  PostgreSQL, the highest primary key elsewhere) and count filtered results
+  only up to ``ADMIN_COUNT_LIMIT`` rows;
+- page the default newest-first list by primary key (``?after=<pk>``), so
+  every page costs the same index range scan however deep it is; lists sorted
+  by a column fall back to numbered pages;
+- search the ``^field`` entries of ``search_fields`` (the others are then
+  ignored) as index range scans, ``field >= term AND field < term +
+  U+10FFFF``, instead of a case-insensitive ``LIKE`` that neither SQLite nor
+  PostgreSQL can serve from a plain B-tree index. The match is case-sensitive,
+  so the term is tried as typed and lowercased.
+"""
+
+from django.conf import settings
+from django.contrib.admin.options import IncorrectLookupParameters, ShowFacets
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+CURSOR_VAR = "after"
+# Sorts after any character an indexed string column holds.
+PREFIX_END = "\U0010ffff"
+
+
+def estimate_count(queryset):
+    """
+    Return an estimate of the number of rows in ``queryset``'s table.
+    """
+
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:  # -1 until the table is first analyzed
+            return int(row[0])
+    # An upper bound, close unless many rows were deleted.
+    return (
+        queryset.model._base_manager.using(queryset.db).aggregate(n=Max("pk"))["n"] or 0
+    )
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            self.is_estimate = True
+            return estimate_count(queryset)
+        count = queryset.order_by()[: settings.ADMIN_COUNT_LIMIT].count()
+        self.is_estimate = count >= settings.ADMIN_COUNT_LIMIT
+        return count
+
+
+class KeysetChangeList(ChangeList):
+    def get_results(self, request):
+        self.cursor = getattr(request, "changelist_cursor", None)
+        self.next_page_url = None
+        self.first_page_url = self.get_query_string()
+        # ModelAdmin.get_queryset() and ChangeList.get_ordering() each
+        # contribute the default "-pk".
+        self.keyset = not self.show_all and set(self.queryset.query.order_by) == {"-pk"}
+        if not self.keyset:
+            super().get_results(request)
+            return
+
+        queryset = self.queryset
+        if self.cursor is not None:
+            try:
+                queryset = queryset.filter(pk__lt=int(self.cursor))
+            except ValueError:
+                raise IncorrectLookupParameters
+        rows = list(queryset[: self.list_per_page + 1])
+        if len(rows) > self.list_per_page:
+            rows = rows[: self.list_per_page]
+            self.next_page_url = self.get_query_string({CURSOR_VAR: rows[-1].pk})
+
+        self.paginator = self.model_admin.get_paginator(
+            request, self.queryset, self.list_per_page
+        )
+        self.result_count = self.paginator.count
+        self.show_full_result_count = self.full_result_count = None
+        self.show_admin_actions = True
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = self.next_page_url is not None or self.cursor is not None
+
+
+class LargeTableAdminMixin:
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Facet counts would run a COUNT per filter choice on every page view.
+    show_facets = ShowFacets.NEVER
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def changelist_view(self, request, extra_context=None):
+        # Taken out of the query string before ChangeList reads it, as it
+        # would otherwise be taken for a field lookup; it is also dropped
+        # from the filter and search links, which start from the first page.
+        request.GET = request.GET.copy()
+        request.changelist_cursor = request.GET.pop(CURSOR_VAR, [None])[-1]
+        return super().changelist_view(request, extra_context)
+
+    def get_search_prefixes(self, search_term):
+        """
+        Return the prefixes to look for; override to normalize the term.
+        """
+
+        return dict.fromkeys([search_term, search_term.lower()])
+
+    def get_search_results(self, request, queryset, search_term):
+        prefix_fields = [
+            field[1:] for field in self.get_search_fields(request) if field[0] == "^"
+        ]
+        search_term = search_term.strip()
+        if not search_term or not prefix_fields:
+            return super().get_search_results(request, queryset, search_term)
+        condition = Q()
+        for field in prefix_fields:
+            for prefix in self.get_search_prefixes(search_term):
+                condition |= Q(
+                    **{f"{field}__gte": prefix, f"{field}__lt": prefix + PREFIX_END}
+                )
+        return queryset.filter(condition), False
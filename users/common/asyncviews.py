@@ -0,0 +1,31 @@
+"""
+Base mixins for class-based views whose handlers are coroutines.
+
+Under ASGI such views run on the event loop, where the lazy ``request.user``
+and the template context's ``current_profile`` cannot be resolved (they query
+the database synchronously). These mixins resolve both with the async APIs
+before the handler runs.
+"""
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+
+from profiles.context_processors import apreload_current_profile
+
+
+async def aprepare_request(request):
+    request.user = await request.auser()
+    await apreload_current_profile(request)
+
+
+class AsyncViewMixin:
+    async def dispatch(self, request, *args, **kwargs):
+        await aprepare_request(request)
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    async def dispatch(self, request, *args, **kwargs):
+        await aprepare_request(request)
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await super().dispatch(request, *args, **kwargs)
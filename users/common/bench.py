@@ -0,0 +1,44 @@
+import time
+
+
+def percentile(samples, p):
+    """
+    Return the ``p``-th percentile (0-100) of ``samples`` by nearest rank.
+    """
+
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def timed(func, *args, **kwargs):
+    """
+    Call ``func`` and return ``(elapsed_ms, result)``.
+    """
+
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def summarize(samples):
+    """
+    Summarize latency samples (milliseconds) as a dict of count/p50/p99/max.
+    """
+
+    return {
+        "count": len(samples),
+        "p50": percentile(samples, 50),
+        "p99": percentile(samples, 99),
+        "max": max(samples, default=0.0),
+    }
+
+
+def format_summary(label, samples):
+    stats = summarize(samples)
+    return (
+        f"{label}: n={stats['count']} p50={stats['p50']:.2f}ms "
+        f"p99={stats['p99']:.2f}ms max={stats['max']:.2f}ms"
+    )
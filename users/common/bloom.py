@@ -0,0 +1,81 @@
+import hashlib
+import math
+import struct
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    ``item in bloom`` is False only for items that were never added; it can be
+    True for items that were not added, at roughly ``error_rate`` once
+    ``capacity`` items are in. Items cannot be removed.
+    """
+
+    _header = struct.Struct(">QQQQ")
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, capacity)
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        """
+        Add ``item``; ``count`` only grows if the item was not already in.
+        """
+
+        bits = self.bits
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                added = True
+        self.count += added
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def error_rate(self):
+        """
+        Expected false-positive rate for the number of items added so far.
+        """
+
+        return (
+            1 - math.exp(-self.hash_count * self.count / self.size)
+        ) ** self.hash_count
+
+    def to_bytes(self):
+        return self._header.pack(
+            self.size, self.hash_count, self.capacity, self.count
+        ) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data):
+        bloom = cls.__new__(cls)
+        bloom.size, bloom.hash_count, bloom.capacity, bloom.count = (
+            cls._header.unpack_from(data)
+        )
+        bloom.bits = bytearray(data[cls._header.size :])
+        if len(bloom.bits) != (bloom.size + 7) // 8:
+            raise ValueError("Truncated Bloom filter data")
+        return bloom
@@ -1,3 +1,9 @@
+import unicodedata
+
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
 def is_htmx(request):
     """
     Check if the given request is an HTMX request by checking the 'HX-Request' header.
@@ -9,4 +15,39 @@ def is_htmx(request):
         bool: True if the request is an HTMX request, False otherwise.
     """
 
-    return True if request.META.get('HTTP_HX_REQUEST') else False
\ No newline at end of file
+    return True if request.META.get('HTTP_HX_REQUEST') else False
+
+def normalize_name(text):
+    """
+    Fold a person's name for accent-insensitive matching.
+
+    Diacritics are stripped (including the Vietnamese "đ", which Unicode does not
+    decompose), the text is lower-cased and everything except letters, digits
+    and single spaces is dropped, so "Nguyễn  Đức" becomes "nguyen duc".
+
+    Args:
+        text (str): The name to fold.
+
+    Returns:
+        str: The folded name.
+    """
+
+    text = (text or "").replace("đ", "d").replace("Đ", "D")
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char)).lower()
+    return " ".join("".join(char if char.isalnum() else " " for char in text).split())
+
+
+def is_process_local(cache):
+    """
+    Check whether a cache is private to the current process.
+
+    Args:
+        cache (BaseCache): A cache from ``django.core.cache.caches``.
+
+    Returns:
+        bool: True for local-memory and dummy caches, whose entries other
+        processes (workers, management commands) never see.
+    """
+
+    return isinstance(cache, (LocMemCache, DummyCache))
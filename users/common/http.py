@@ -0,0 +1,128 @@
+import threading
+from contextlib import contextmanager
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from core import profiling
+
+_session = None
+_slots = None
+_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Return the process-wide HTTP session.
+
+    The session keeps a pool of keep-alive connections so repeated calls to the
+    same host (e.g. Google's OAuth endpoints) skip the TCP and TLS handshakes.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+
+    global _session, _slots
+    if _session is None:
+        with _lock:
+            if _session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=settings.HTTP_CLIENT_POOL_SIZE,
+                    pool_maxsize=settings.HTTP_CLIENT_POOL_SIZE,
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _slots = threading.BoundedSemaphore(
+                    settings.HTTP_CLIENT_MAX_CONCURRENCY
+                )
+                _session = session
+    return _session
+
+
+def request(method, url, **kwargs):
+    """
+    Send a request through the shared session with connect/read timeouts.
+
+    At most ``HTTP_CLIENT_MAX_CONCURRENCY`` requests are in flight per process;
+    callers waiting longer than the connect timeout for a free slot get a
+    ``requests.ConnectionError`` instead of queueing forever. The body is read
+    before the slot is released; use ``stream`` to read it in chunks.
+
+    Args:
+        method (str): The HTTP method.
+        url (str): The URL to request.
+        **kwargs: Extra arguments passed to ``requests.Session.request``.
+
+    Returns:
+        requests.Response: The response.
+    """
+
+    if kwargs.get("stream"):
+        raise TypeError("Use http.stream() for streamed responses")
+    with _slot(url):
+        return _send(method, url, **kwargs)
+
+
+@contextmanager
+def stream(method, url, **kwargs):
+    """
+    Like ``request``, but the body is left to the caller to read.
+
+    The slot is held, and the response kept open, until the block exits.
+
+    Yields:
+        requests.Response: The response.
+    """
+
+    with _slot(url), _send(method, url, stream=True, **kwargs) as response:
+        yield response
+
+
+@contextmanager
+def _slot(url):
+    get_session()
+    if not _slots.acquire(timeout=settings.HTTP_CLIENT_CONNECT_TIMEOUT):
+        raise requests.ConnectionError(f"Too many outbound requests in flight: {url}")
+    try:
+        yield
+    finally:
+        _slots.release()
+
+
+def _send(method, url, **kwargs):
+    kwargs.setdefault(
+        "timeout",
+        (settings.HTTP_CLIENT_CONNECT_TIMEOUT, settings.HTTP_CLIENT_READ_TIMEOUT),
+    )
+    with profiling.timer("http"):
+        return get_session().request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+async def arequest(method, url, **kwargs):
+    """
+    Async version of ``request``.
+
+    The blocking call runs in a worker thread outside the thread-sensitive
+    executor, so a slow upstream does not hold up other sync code.
+    """
+
+    return await sync_to_async(request, thread_sensitive=False)(method, url, **kwargs)
+
+
+async def aget(url, **kwargs):
+    return await arequest("GET", url, **kwargs)
+
+
+async def apost(url, **kwargs):
+    return await arequest("POST", url, **kwargs)
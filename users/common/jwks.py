@@ -0,0 +1,128 @@
+import logging
+import re
+import threading
+import time
+
+import jwt
+from django.conf import settings
+
+from . import http
+
+
+logger = logging.getLogger("users")
+
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class JWKSCache:
+    """
+    Process-wide cache of a JSON Web Key Set.
+
+    Keys are kept for as long as the provider's ``Cache-Control: max-age``
+    allows. Once expired, the stale keys keep being served while a background
+    thread fetches fresh ones. An unknown key id (the provider rotated its keys)
+    triggers an immediate refresh, throttled to one fetch per
+    ``min_refresh_interval`` seconds so forged tokens cannot hammer the provider.
+    """
+
+    def __init__(self, url, default_max_age=3600, min_refresh_interval=60):
+        self.url = url
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self._keys = {}
+        self._expires_at = 0
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get_signing_key(self, kid):
+        """
+        Return the ``jwt.PyJWK`` for the given key id.
+
+        Raises:
+            jwt.PyJWKClientError: If the key set has no such key.
+        """
+
+        if not self._keys:
+            self.refresh()
+        elif time.monotonic() >= self._expires_at:
+            self.refresh_in_background()
+
+        key = self._keys.get(kid)
+        if key is None:
+            self.refresh()
+            key = self._keys.get(kid)
+        if key is None:
+            raise jwt.PyJWKClientError(f"Unknown signing key: {kid}")
+        return key
+
+    def refresh(self):
+        with self._lock:
+            now = time.monotonic()
+            if (
+                self._fetched_at is not None
+                and now - self._fetched_at < self.min_refresh_interval
+            ):
+                return
+            self._fetched_at = now
+            response = http.get(self.url)
+            response.raise_for_status()
+            key_set = jwt.PyJWKSet.from_dict(response.json())
+            self._keys = {key.key_id: key for key in key_set.keys}
+            self._expires_at = now + self._get_max_age(response)
+            logger.debug(f"Loaded {len(self._keys)} signing keys from {self.url}")
+
+    def refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as exc:
+            logger.warning(f"Failed to refresh signing keys from {self.url}: {exc}")
+        finally:
+            self._refreshing = False
+
+    def _get_max_age(self, response):
+        match = MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+        return int(match.group(1)) if match else self.default_max_age
+
+
+_google_jwks = None
+
+
+def get_google_jwks():
+    global _google_jwks
+    if _google_jwks is None:
+        _google_jwks = JWKSCache(settings.GOOGLE_JWKS_URL)
+    return _google_jwks
+
+
+def verify_google_id_token(id_token):
+    """
+    Verify a Google ID token locally and return its claims.
+
+    Args:
+        id_token (str): The ``id_token`` returned by Google's token endpoint.
+
+    Returns:
+        dict: The verified claims (``email``, ``given_name``, ``picture``...).
+
+    Raises:
+        jwt.PyJWTError: If the signing key is unknown or the signature,
+            audience, issuer or expiry does not check out.
+    """
+
+    kid = jwt.get_unverified_header(id_token).get("kid")
+    key = get_google_jwks().get_signing_key(kid)
+    return jwt.decode(
+        id_token,
+        key.key,
+        algorithms=["RS256"],
+        audience=settings.GOOGLE_CLIENT_ID,
+        issuer=settings.GOOGLE_ID_TOKEN_ISSUERS,
+    )
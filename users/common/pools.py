@@ -0,0 +1,73 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def _setup_django():
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    django.setup()
+
+
+def get_process_pool(name, max_workers=None):
+    """
+    Return the process-wide worker pool called ``name``, creating it on first use.
+
+    Workers are spawned (not forked, so they never inherit open database
+    connections or locks) and run ``django.setup()`` once at start-up, so tasks
+    may use settings and Django utilities. Tasks must be picklable top-level
+    functions and should not touch the database.
+
+    Args:
+        name (str): Pool name, so unrelated workloads get separate pools.
+        max_workers (int): Pool size, defaults to the number of CPUs.
+
+    Returns:
+        ProcessPoolExecutor: The pool.
+    """
+
+    pool = _pools.get(name)
+    if pool is None:
+        with _lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_setup_django,
+                )
+                _pools[name] = pool
+    return pool
+
+
+def get_thread_pool(name, max_workers=None):
+    """
+    Return the process-wide thread pool called ``name``, creating it on first use.
+
+    For background jobs that mostly wait on I/O. Tasks may use the ORM; each
+    thread has its own connections, so tasks should call
+    ``close_old_connections()`` when done.
+
+    Args:
+        name (str): Pool name, so unrelated workloads get separate pools.
+        max_workers (int): Pool size, defaults to ``ThreadPoolExecutor``'s.
+
+    Returns:
+        ThreadPoolExecutor: The pool.
+    """
+
+    pool = _pools.get(name)
+    if pool is None:
+        with _lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix=name
+                )
+                _pools[name] = pool
+    return pool
@@ -0,0 +1,28 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+@contextmanager
+def assert_max_queries(limit, using=DEFAULT_DB_ALIAS):
+    """
+    Fail if the block runs more than ``limit`` queries on ``using``.
+
+    Like ``TestCase.assertNumQueries`` but an upper bound, so query budgets
+    can be asserted from tests and from management commands alike.
+
+    Raises:
+        AssertionError: Listing the executed queries, if over budget.
+    """
+
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    if len(context) > limit:
+        queries = "\n".join(
+            f"{i}. {query['sql']}"
+            for i, query in enumerate(context.captured_queries, 1)
+        )
+        raise AssertionError(
+            f"{len(context)} queries executed, at most {limit} expected:\n{queries}"
+        )
@@ -0,0 +1,271 @@
+"""
+Sliding-window rate limiting for the auth views.
+
+Each scope (``login``, ``register``, ``password_reset``) has limits per key
+type in ``settings.RATELIMITS``: ``{"ip": (limit, window_seconds), ...}``.
+Attempts are counted with the sliding-window counter approximation: the
+current fixed window's count plus the previous window's count weighted by how
+much of it still overlaps the sliding window. That needs two counters per key
+instead of a log of timestamps.
+
+Limits are checked in ``dispatch`` before the form is even parsed, so a burst
+of attempts costs a couple of cache operations each instead of a password hash,
+a database query or an SMTP send.
+"""
+
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.module_loading import import_string
+
+from .asyncviews import aprepare_request
+from .common import is_htmx
+
+
+class RateLimitBackend:
+    """
+    Base class; subclasses store the per-window counters.
+    """
+
+    def incr(self, key, timeout):
+        """
+        Increment ``key`` (created at 0 if missing) and return the new value.
+        """
+
+        raise NotImplementedError
+
+    def get(self, key):
+        raise NotImplementedError
+
+    async def aincr(self, key, timeout):
+        return await sync_to_async(self.incr)(key, timeout)
+
+    async def aget(self, key):
+        return await sync_to_async(self.get)(key)
+
+    def hit(self, key, limit, window):
+        """
+        Count one attempt for ``key``.
+
+        Returns:
+            int: 0 if the attempt is allowed, otherwise the seconds to wait.
+        """
+
+        now = time.time()
+        current = int(now // window)
+        count = self.incr(f"{key}:{current}", window * 2)
+        previous = self.get(f"{key}:{current - 1}") or 0
+        return self._retry_after(now - current * window, count, previous, limit, window)
+
+    async def ahit(self, key, limit, window):
+        """
+        Async counterpart of ``hit``.
+        """
+
+        now = time.time()
+        current = int(now // window)
+        count = await self.aincr(f"{key}:{current}", window * 2)
+        previous = await self.aget(f"{key}:{current - 1}") or 0
+        return self._retry_after(now - current * window, count, previous, limit, window)
+
+    def _retry_after(self, elapsed, count, previous, limit, window):
+        if previous * (1 - elapsed / window) + count <= limit:
+            return 0
+        return max(1, int(window - elapsed))
+
+
+class MemoryBackend(RateLimitBackend):
+    """
+    Per-process counters. Only suitable for a single worker process.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._next_prune = 0
+
+    def incr(self, key, timeout):
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_prune:
+                self._prune(now)
+            expires_at, value = self._counters.get(key, (now + timeout, 0))
+            self._counters[key] = (expires_at, value + 1)
+            return value + 1
+
+    def get(self, key):
+        expires_at, value = self._counters.get(key, (0, 0))
+        return value if expires_at > time.monotonic() else 0
+
+    # In memory and quick, so fine to run on the event loop.
+    async def aincr(self, key, timeout):
+        return self.incr(key, timeout)
+
+    async def aget(self, key):
+        return self.get(key)
+
+    def _prune(self, now):
+        self._counters = {
+            key: entry for key, entry in self._counters.items() if entry[0] > now
+        }
+        self._next_prune = now + 60
+
+
+class CacheBackend(RateLimitBackend):
+    """
+    Counters in Django's cache (``RATELIMIT_CACHE``), shared by all processes
+    when that cache is shared (Redis, Memcached...).
+    """
+
+    def __init__(self):
+        self.cache = caches[settings.RATELIMIT_CACHE]
+
+    def incr(self, key, timeout):
+        self.cache.add(key, 0, timeout)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr().
+            self.cache.set(key, 1, timeout)
+            return 1
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    async def aincr(self, key, timeout):
+        await self.cache.aadd(key, 0, timeout)
+        try:
+            return await self.cache.aincr(key)
+        except ValueError:
+            await self.cache.aset(key, 1, timeout)
+            return 1
+
+    async def aget(self, key):
+        return await self.cache.aget(key)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.RATELIMIT_BACKEND)()
+    return _backend
+
+
+def get_client_ip(request):
+    return request.META.get(settings.RATELIMIT_IP_META_KEY, "")
+
+
+def check_rate_limits(request, scope, email_field="email"):
+    """
+    Count this request against every limit of ``scope``.
+
+    Returns:
+        int: 0 if the request may proceed, otherwise the seconds to wait.
+    """
+
+    retry_after = 0
+    for key, limit, window in _limits(request, scope, email_field):
+        retry_after = max(retry_after, get_backend().hit(key, limit, window))
+    return retry_after
+
+
+async def acheck_rate_limits(request, scope, email_field="email"):
+    """
+    Async counterpart of ``check_rate_limits``, for async views: a shared
+    cache must not be waited on from the event loop.
+    """
+
+    retry_after = 0
+    for key, limit, window in _limits(request, scope, email_field):
+        retry_after = max(retry_after, await get_backend().ahit(key, limit, window))
+    return retry_after
+
+
+def _limits(request, scope, email_field):
+    values = {
+        "ip": get_client_ip(request),
+        "email": request.POST.get(email_field, "").strip().lower(),
+    }
+    for key_type, (limit, window) in settings.RATELIMITS.get(scope, {}).items():
+        value = values.get(key_type)
+        if not value:
+            continue
+        digest = hashlib.sha256(value.encode()).hexdigest()[:32]
+        yield f"ratelimit:{scope}:{key_type}:{digest}", limit, window
+
+
+def rate_limited_response(request, retry_after):
+    html = render_to_string(
+        "users/_rate_limited.html", {"retry_after": retry_after}, request=request
+    )
+    if is_htmx(request):
+        response = JsonResponse({"html": html}, status=429)
+    else:
+        response = HttpResponse(html, status=429)
+    response["Retry-After"] = str(retry_after)
+    return response
+
+
+class RateLimitMixin:
+    """
+    Rate-limit POST requests of a class-based view.
+
+    Attributes:
+        ratelimit_scope (str): Key into ``settings.RATELIMITS``.
+        ratelimit_email_field (str): POST field holding the email, if any.
+    """
+
+    ratelimit_scope = None
+    ratelimit_email_field = "email"
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self._adispatch(request, *args, **kwargs)
+        if request.method == "POST":
+            retry_after = check_rate_limits(
+                request, self.ratelimit_scope, self.ratelimit_email_field
+            )
+            if retry_after:
+                return rate_limited_response(request, retry_after)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def _adispatch(self, request, *args, **kwargs):
+        if request.method == "POST":
+            retry_after = await acheck_rate_limits(
+                request, self.ratelimit_scope, self.ratelimit_email_field
+            )
+            if retry_after:
+                # The notice renders with the context processors, which must
+                # not load the session, user or profile from the event loop.
+                await aprepare_request(request)
+                return rate_limited_response(request, retry_after)
+        return await super().dispatch(request, *args, **kwargs)
+
+
+def ratelimit(scope, email_field="email"):
+    """
+    Decorator version of ``RateLimitMixin`` for function-based views.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method == "POST":
+                retry_after = check_rate_limits(request, scope, email_field)
+                if retry_after:
+                    return rate_limited_response(request, retry_after)
+            return view_func(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
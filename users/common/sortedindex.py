@@ -0,0 +1,124 @@
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+from contextlib import ExitStack
+from itertools import islice
+
+
+class SortedIndex:
+    """
+    Read-only set of fixed-width byte keys, stored sorted in a file and
+    memory-mapped.
+
+    Lookups binary-search the mapping, so they touch about log2(n) pages and
+    load nothing up front. Processes mapping the same file share its pages
+    through the OS page cache instead of each holding a copy.
+    """
+
+    MAGIC = b"SIDX"
+    _header = struct.Struct(">4sB3xQ")
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < self._header.size:
+            raise ValueError(f"{path} is not a sorted index")
+        magic, self.key_size, self.count = self._header.unpack_from(self._mmap)
+        if magic != self.MAGIC or len(self._mmap) != (
+            self._header.size + self.key_size * self.count
+        ):
+            raise ValueError(f"{path} is not a sorted index, or is truncated")
+        if hasattr(self._mmap, "madvise"):
+            # Lookups jump around; reading ahead would only evict other pages.
+            self._mmap.madvise(mmap.MADV_RANDOM)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        """
+        Return whether the first ``key_size`` bytes of ``key`` are in the index.
+        """
+
+        key = key[: self.key_size]
+        data = self._mmap
+        size = self.key_size
+        offset = self._header.size
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            start = offset + middle * size
+            probe = data[start : start + size]
+            if probe < key:
+                low = middle + 1
+            elif probe > key:
+                high = middle
+            else:
+                return True
+        return False
+
+    def close(self):
+        self._mmap.close()
+
+    @classmethod
+    def write(cls, path, keys, key_size, run_size=5_000_000):
+        """
+        Build an index file from ``keys`` in any order, replacing ``path``
+        atomically.
+
+        Keys must be at least ``key_size`` bytes long and are truncated to it.
+        They are sorted ``run_size`` at a time into temporary files next to
+        ``path``, which are then merged, so memory use does not grow with the
+        input. Duplicates are dropped.
+
+        Returns:
+            int: The number of distinct keys written.
+        """
+
+        directory = os.path.dirname(os.path.abspath(path))
+        keys = iter(keys)
+        count = 0
+        with tempfile.TemporaryDirectory(dir=directory) as runs_directory:
+            runs = []
+            while True:
+                run = sorted({key[:key_size] for key in islice(keys, run_size)})
+                if not run:
+                    break
+                runs.append(os.path.join(runs_directory, f"run-{len(runs)}"))
+                with open(runs[-1], "wb") as file:
+                    file.write(b"".join(run))
+
+            output = tempfile.NamedTemporaryFile("wb", dir=directory, delete=False)
+            try:
+                with output, ExitStack() as stack:
+                    files = [stack.enter_context(open(run, "rb")) for run in runs]
+                    output.write(cls._header.pack(cls.MAGIC, key_size, 0))
+                    previous = None
+                    for key in heapq.merge(
+                        *(cls._read_keys(file, key_size) for file in files)
+                    ):
+                        if key != previous:
+                            output.write(key)
+                            count += 1
+                            previous = key
+                    output.seek(0)
+                    output.write(cls._header.pack(cls.MAGIC, key_size, count))
+                    output.flush()
+                    os.fsync(output.fileno())
+            except BaseException:
+                os.remove(output.name)
+                raise
+        # Processes that mapped the old file keep reading it until they reopen.
+        os.replace(output.name, path)
+        return count
+
+    @staticmethod
+    def _read_keys(file, key_size):
+        while True:
+            block = file.read(key_size * 8192)
+            if not block:
+                return
+            for start in range(0, len(block), key_size):
+                yield block[start : start + key_size]
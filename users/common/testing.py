@@ -0,0 +1,156 @@
+"""
+Shared helpers for the apps' test modules.
+"""
+
+import copy
+import datetime
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from profiles.cache import _profiles, _user_profile_ids
+from profiles.models import Profile
+from users import presence
+from users.backends import _users
+from users.common.queries import assert_max_queries
+from users.management.commands.check_query_budget import BUDGETS
+
+
+def clear_local_caches():
+    """
+    Empty the per-process LRUs in front of Django's cache.
+    """
+
+    for local in (_users, _profiles, _user_profile_ids):
+        local.clear()
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+    clear_local_caches()
+
+
+def create_profile(name, password=None, **fields):
+    """
+    Create a user ``<name>@example.com`` and their profile.
+
+    Args:
+        name (str): The email's local part, and the default first name.
+        password (str): The user's password; unusable by default.
+        **fields: Profile fields overriding the defaults.
+
+    Returns:
+        Profile: The profile; its user is ``profile.user``.
+    """
+
+    user = get_user_model().objects.create_user(
+        email=f"{name}@example.com", password=password
+    )
+    fields = {
+        "first_name": name[:30],
+        "last_name": "Test",
+        "birthdate": datetime.date(2000, 1, 1),
+        **fields,
+    }
+    return Profile.objects.create(user=user, **fields)
+
+
+# Tests do not run collectstatic, so there is no manifest to look files up in.
+plain_staticfiles = override_settings(
+    STORAGES={
+        **settings.STORAGES,
+        "staticfiles": {
+            "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+        },
+    }
+)
+
+
+@contextmanager
+def extra_database(alias, **overrides):
+    """
+    Add a database alias configured like ``default`` (the test database, once
+    it exists), with ``overrides``, for the duration of the block.
+
+    ``TEST={"MIRROR": "default"}`` keeps test cases from flushing it.
+    """
+
+    connections.settings[alias] = {
+        **copy.deepcopy(connections[DEFAULT_DB_ALIAS].settings_dict),
+        **overrides,
+    }
+    try:
+        yield connections[alias]
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+
+class AppTestMixin:
+    def setUp(self):
+        super().setUp()
+        clear_caches()
+
+    def tearDown(self):
+        # Write buffered activity now, into the test database, rather than
+        # from a timer or at exit once it is gone.
+        presence.flush()
+        super().tearDown()
+
+
+@plain_staticfiles
+class AppTestCase(AppTestMixin, TestCase):
+    pass
+
+
+@plain_staticfiles
+class AppTransactionTestCase(AppTestMixin, TransactionTestCase):
+    pass
+
+
+class QueryBudgetMixin:
+    """
+    Check the pages named in ``budgets`` against their query budgets
+    (``check_query_budget.BUDGETS``) as ``self.profile``'s user.
+
+    Pages whose URL takes a ``pk`` get ``self.profile.pk``. If
+    ``expected_text`` is set, every page must contain it.
+    """
+
+    budgets = ()
+    expected_text = None
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.profile.user)
+
+    def _urls(self):
+        for name in self.budgets:
+            kwargs = {"pk": self.profile.pk} if "pk" in name else None
+            yield name, reverse(name, kwargs=kwargs)
+
+    def test_cold_process_caches(self):
+        for name, url in self._urls():
+            with self.subTest(name=name):
+                self.client.get(url)  # The session into the cache
+                clear_local_caches()
+                with assert_max_queries(BUDGETS[name]):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                if self.expected_text:
+                    self.assertContains(response, self.expected_text)
+
+    def test_warm_process_caches(self):
+        for name, url in self._urls():
+            with self.subTest(name=name):
+                self.client.get(url)
+                with assert_max_queries(1):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,242 @@
+"""
+In-process Bloom filter of registered email addresses.
+
+Login, registration and password reset ask ``might_exist`` first; a "no" is
+definite, so junk emails are answered without a database query. Emails are
+folded to lower case, which can only add false positives.
+
+Every process builds its own filter on first use. Two generation stamps in
+Django's cache keep processes in step:
+
+* ``emailfilter:generation`` is bumped when users are created; other processes
+  then add the rows with a primary key above the highest one they loaded.
+* ``emailfilter:rebuild`` is bumped when an existing user changes email; other
+  processes then rebuild from scratch.
+
+A process only compares stamps when its filter answers "no", since a "yes"
+goes to the database anyway. Deleted users stay in the filter (as false
+positives) until the next rebuild.
+
+The stamps only keep processes in step if the default cache is shared between
+them. With a per-process cache (local memory, the default), a user created by
+another worker or a management command would be reported as unknown, so the
+filter stays off unless ``EMAIL_FILTER_ENABLED`` is set to True explicitly.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+
+from .common.bloom import BloomFilter
+from .common.common import is_process_local
+
+logger = logging.getLogger("users")
+
+GENERATION_KEY = "emailfilter:generation"
+REBUILD_KEY = "emailfilter:rebuild"
+
+# Rows re-read below the highest loaded primary key on an incremental load, in
+# case transactions committed out of primary key order.
+PK_OVERLAP = 100
+
+
+def _get_stamps():
+    stamps = cache.get_many([GENERATION_KEY, REBUILD_KEY])
+    for key in (GENERATION_KEY, REBUILD_KEY):
+        if key not in stamps:
+            cache.add(key, time.time_ns(), None)
+            stamps[key] = cache.get(key)
+    return stamps[GENERATION_KEY], stamps[REBUILD_KEY]
+
+
+def is_enabled():
+    """
+    Return whether the filter may answer "no": ``EMAIL_FILTER_ENABLED``, or if
+    that is None, whether the default cache is shared between processes.
+    """
+
+    if settings.EMAIL_FILTER_ENABLED is None:
+        return not is_process_local(caches[DEFAULT_CACHE_ALIAS])
+    return settings.EMAIL_FILTER_ENABLED
+
+
+def bump_generation(rebuild=False):
+    """
+    Tell every process that users were added (or, with ``rebuild``, that
+    emails of existing users changed).
+    """
+
+    cache.set(REBUILD_KEY if rebuild else GENERATION_KEY, time.time_ns(), None)
+
+
+class EmailFilter:
+    def __init__(self):
+        self._bloom = None
+        self._max_pk = 0
+        self._generation = None
+        self._rebuild_generation = None
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def might_exist(self, email):
+        """
+        Return False if no user has this email, True if one may have it.
+        """
+
+        if not email or not is_enabled():
+            return True
+        email = email.lower()
+        self.stats["checks"] += 1
+        if self._bloom is not None and email in self._bloom:
+            self.stats["positives"] += 1
+            return True
+        self.sync()
+        if email in self._bloom:
+            self.stats["positives"] += 1
+            return True
+        self.stats["negatives"] += 1
+        return False
+
+    def record_false_positive(self):
+        """
+        Count a "maybe" that the database then answered with "no".
+        """
+
+        self.stats["false_positives"] += 1
+
+    def add(self, email):
+        bloom = self._bloom
+        if bloom is not None and email:
+            bloom.add(email.lower())
+
+    def __contains__(self, email):
+        bloom = self._bloom
+        return bloom is not None and email.lower() in bloom
+
+    def sync(self):
+        """
+        Bring the filter up to date with the users table.
+        """
+
+        generation, rebuild_generation = _get_stamps()
+        if (
+            self._bloom is not None
+            and generation == self._generation
+            and rebuild_generation == self._rebuild_generation
+        ):
+            return
+        with self._lock:
+            if self._bloom is None or rebuild_generation != self._rebuild_generation:
+                self._rebuild_generation = rebuild_generation
+                if not self._load():
+                    self._rebuild()
+            self._load_new_users()
+            self._generation = generation
+
+    def _rebuild(self):
+        User = get_user_model()
+        count = User._default_manager.count()
+        bloom = BloomFilter(
+            max(count * 2, settings.EMAIL_FILTER_MIN_CAPACITY),
+            settings.EMAIL_FILTER_ERROR_RATE,
+        )
+        max_pk = self._add_users(bloom, 0)
+        # Only swapped in once filled: might_exist() reads it without the lock.
+        self._bloom, self._max_pk = bloom, max_pk
+        self.stats["rebuilds"] += 1
+        if settings.EMAIL_FILTER_PATH:
+            self._save()
+        logger.debug(
+            f"Built email filter: {len(bloom)} emails, {len(bloom.bits)} bytes"
+        )
+
+    def _load_new_users(self, overlap=PK_OVERLAP):
+        bloom = self._bloom
+        self._max_pk = max(self._max_pk, self._add_users(bloom, self._max_pk - overlap))
+        if len(bloom) > bloom.capacity:
+            # Past capacity the false-positive rate climbs; start over bigger.
+            self._rebuild()
+
+    def _add_users(self, bloom, after_pk):
+        """
+        Add the emails of users with a primary key above ``after_pk`` to
+        ``bloom`` and return the highest primary key added (0 if none).
+        """
+
+        User = get_user_model()
+        emails = (
+            User._default_manager.filter(pk__gt=after_pk)
+            .order_by("pk")
+            .values_list("pk", "email")
+        )
+        max_pk = 0
+        for max_pk, email in emails.iterator(chunk_size=5000):
+            bloom.add(email.lower())
+        return max_pk
+
+    def _load(self):
+        path = settings.EMAIL_FILTER_PATH
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with open(path, "rb") as file:
+                saved_generation = int(file.readline())
+                max_pk = int(file.readline())
+                bloom = BloomFilter.from_bytes(file.read())
+        except (OSError, ValueError) as exc:
+            logger.warning(f"Ignoring email filter file {path}: {exc}")
+            return False
+        if saved_generation != self._rebuild_generation:
+            return False
+        self._bloom = bloom
+        self._max_pk = max_pk
+        return True
+
+    def _save(self):
+        path = settings.EMAIL_FILTER_PATH
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile("wb", dir=directory, delete=False) as file:
+            file.write(f"{self._rebuild_generation or 0}\n{self._max_pk}\n".encode())
+            file.write(self._bloom.to_bytes())
+        os.replace(file.name, path)
+
+    def get_stats(self):
+        """
+        Return this process' counters and the filter's false-positive rates.
+
+        ``observed_error_rate`` is the share of emails that are not registered
+        but still passed the filter, as reported via ``record_false_positive``.
+        """
+
+        stats = dict(self.stats)
+        wrong = stats.get("false_positives", 0)
+        stats["observed_error_rate"] = wrong / max(1, wrong + stats.get("negatives", 0))
+        bloom = self._bloom
+        if bloom is not None:
+            stats["emails"] = len(bloom)
+            stats["size_bytes"] = len(bloom.bits)
+            stats["expected_error_rate"] = bloom.error_rate
+        return stats
+
+
+email_filter = EmailFilter()
+
+
+def email_exists(email):
+    """
+    Return True if a user has this email, skipping the query on a definite no.
+    """
+
+    if not email_filter.might_exist(email):
+        return False
+    exists = get_user_model()._default_manager.filter(email=email).exists()
+    if not exists:
+        email_filter.record_false_positive()
+    return exists
@@ -12,6 +12,8 @@ from django import forms
 from django.contrib.auth import authenticate
 from django.utils.translation import gettext_lazy as _
 
+from .email_filter import email_exists, email_filter
+
 
 User = get_user_model()
 
@@ -33,7 +35,7 @@ class CustomPasswordResetForm(PasswordResetForm):
     def clean_email(self):
         email = self.cleaned_data.get("email")
         logger.debug(f"Checking email: {email}")
-        if not User.objects.filter(email=email).exists():
+        if not email_exists(email):
             logger.debug(f"Email {email} is not registered.")
             raise forms.ValidationError("This email address is not registered.")
         logger.debug(f"Email {email} is registered.")
@@ -46,6 +48,17 @@ class CustomUserCreationForm(UserCreationForm):
         model = User
         fields = ("email", "password1", "password2")
 
+    def validate_unique(self):
+        exclude = self._get_validation_exclusions()
+        email = self.cleaned_data.get("email")
+        if email and not email_filter.might_exist(email):
+            # Definitely unused; skip the unique-email query.
+            exclude.add("email")
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except forms.ValidationError as e:
+            self._update_errors(e)
+
 
 class LoginForm(forms.Form):
 
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import sanitize_address
+
+from .models import OutboxEmail
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """
+    Email backend that stores messages in the ``OutboxEmail`` table.
+
+    Sending costs one INSERT, so views like the password reset no longer wait
+    on the SMTP relay. The ``send_outbox`` management command delivers the
+    stored messages.
+    """
+
+    def send_messages(self, email_messages):
+        rows = []
+        for message in email_messages:
+            recipients = message.recipients()
+            if not recipients:
+                continue
+            encoding = message.encoding or settings.DEFAULT_CHARSET
+            rows.append(
+                OutboxEmail(
+                    from_email=sanitize_address(message.from_email, encoding),
+                    recipients=[
+                        sanitize_address(address, encoding) for address in recipients
+                    ],
+                    message=message.message().as_bytes(linesep="\r\n"),
+                )
+            )
+        try:
+            OutboxEmail.objects.bulk_create(rows)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+        return len(rows)
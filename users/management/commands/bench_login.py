@@ -0,0 +1,78 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from users.common.bench import format_summary
+from users.email_filter import bump_generation
+
+User = get_user_model()
+
+BACKENDS = {
+    "inline": "django.contrib.auth.backends.ModelBackend",
+    "pooled": "users.backends.PooledModelBackend",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test users:login at increasing concurrency and report logins/sec "
+        "and latency for inline and pooled password verification. Seeded users "
+        "are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=40)
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+        parser.add_argument(
+            "--backend", choices=sorted(BACKENDS), nargs="+", default=sorted(BACKENDS)
+        )
+
+    def handle(self, *args, **options):
+        password = "bench-login-password"
+        encoded = make_password(password)
+        prefix = f"bench-login-{time.time_ns()}"
+        users = User.objects.bulk_create(
+            User(email=f"{prefix}-{i}@example.com", password=encoded)
+            for i in range(options["users"])
+        )
+        bump_generation()
+        try:
+            for name in options["backend"]:
+                with override_settings(
+                    AUTHENTICATION_BACKENDS=[BACKENDS[name]], RATELIMITS={}
+                ):
+                    for concurrency in options["concurrency"]:
+                        self._run(
+                            name, users, password, concurrency, options["requests"]
+                        )
+        finally:
+            User.objects.filter(email__startswith=prefix).delete()
+
+    def _run(self, name, users, password, concurrency, total):
+        url = reverse("users:login")
+
+        def login(i):
+            client = Client(HTTP_HOST="localhost", HTTP_HX_REQUEST="true")
+            start = time.perf_counter()
+            response = client.post(
+                url, {"email": users[i % len(users)].email, "password": password}
+            )
+            elapsed = (time.perf_counter() - start) * 1000
+            return elapsed, response.status_code == 200
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(login, range(total)))
+        wall = time.perf_counter() - start
+        samples = [elapsed for elapsed, _ in results]
+        failed = sum(1 for _, ok in results if not ok)
+        self.stdout.write(
+            format_summary(f"{name} c={concurrency}", samples)
+            + f" {total / wall:.1f} logins/sec failed={failed}"
+        )
@@ -0,0 +1,101 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from users.presence import PresenceTracker
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a simulated stream of authenticated requests (a few users make "
+        "most of them) and compare the database writes of a last_seen UPDATE "
+        "per request against the buffered presence tracker. Everything is "
+        "rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=5000)
+        parser.add_argument("--requests", type=int, default=200_000)
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=600,
+            help="Simulated seconds the requests are spread over.",
+        )
+        parser.add_argument("--resolution", type=float, default=60)
+        parser.add_argument("--flush-interval", type=float, default=5)
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            pks = self._seed(options["users"])
+            stream = self._stream(pks, options["requests"], options["duration"])
+            for label, replay in (
+                ("per request", self._naive),
+                ("buffered", self._buffered),
+            ):
+                statements = []
+
+                def count(execute, sql, params, many, context):
+                    statements.append(sql)
+                    return execute(sql, params, many, context)
+
+                with connection.execute_wrapper(count):
+                    start = time.perf_counter()
+                    rows = replay(stream, options)
+                    elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{label}: {len(stream)} requests, {len(statements)} UPDATE "
+                    f"statements, {rows} rows written, {elapsed:.2f}s "
+                    f"({len(statements) / len(stream):.4f} statements per request)"
+                )
+            transaction.set_rollback(True)
+
+    def _seed(self, count):
+        stamp = time.time_ns()
+        users = User.objects.bulk_create(
+            User(email=f"bench-presence-{stamp}-{i}@example.com", password="!")
+            for i in range(count)
+        )
+        return [user.pk for user in users]
+
+    def _stream(self, pks, count, duration):
+        """
+        Return ``(time, user_id)`` pairs in time order, with user activity
+        following a Zipf-like distribution.
+        """
+
+        rng = random.Random(42)
+        weights = [1 / rank for rank in range(1, len(pks) + 1)]
+        users = rng.choices(pks, weights, k=count)
+        start = time.time()
+        return [
+            (start + duration * i / count, user_id) for i, user_id in enumerate(users)
+        ]
+
+    def _naive(self, stream, options):
+        for now, user_id in stream:
+            User.objects.filter(pk=user_id).update(
+                last_seen=datetime.datetime.fromtimestamp(now, datetime.timezone.utc)
+            )
+        return len(stream)
+
+    def _buffered(self, stream, options):
+        tracker = PresenceTracker(
+            options["resolution"], options["flush_interval"], options["batch_size"]
+        )
+        flush_at = None
+        for now, user_id in stream:
+            if flush_at is not None and now >= flush_at:
+                tracker.flush(flush_at)
+                flush_at = None
+            if tracker.record(user_id, now):
+                flush_at = now + tracker.flush_interval
+        tracker.flush(stream[-1][0])
+        return tracker.stats["rows"]
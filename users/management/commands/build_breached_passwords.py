@@ -0,0 +1,108 @@
+import gzip
+import hashlib
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth.password_validation import CommonPasswordValidator
+from django.core.management.base import BaseCommand, CommandError
+
+from users.common.sortedindex import SortedIndex
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the breached-password index used by BreachedPasswordValidator "
+        "from local password lists (one password per line) or SHA-1 hash lists "
+        "(HASH[:COUNT] per line, as Have I Been Pwned publishes them). Files may "
+        "be gzipped. The index replaces BREACHED_PASSWORDS_PATH atomically; "
+        "running processes pick it up on their next check."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*")
+        parser.add_argument("--format", choices=["plain", "sha1"], default="plain")
+        parser.add_argument(
+            "--min-count",
+            type=int,
+            default=1,
+            help="With --format sha1, skip hashes seen fewer times than this.",
+        )
+        parser.add_argument(
+            "--key-bytes",
+            type=int,
+            default=6,
+            help=(
+                "SHA-1 prefix bytes stored per password. 6 bytes keep false "
+                "positives below 1 in 100,000 for a billion passwords."
+            ),
+        )
+        parser.add_argument(
+            "--no-common",
+            action="store_true",
+            help="Leave out Django's list of 20,000 common passwords.",
+        )
+        parser.add_argument("--run-size", type=int, default=5_000_000)
+        parser.add_argument("--output", default=settings.BREACHED_PASSWORDS_PATH)
+
+    def handle(self, *args, **options):
+        if not options["output"]:
+            raise CommandError("Set BREACHED_PASSWORDS_PATH or pass --output.")
+        if not 4 <= options["key_bytes"] <= 20:
+            raise CommandError("--key-bytes must be between 4 and 20.")
+        for path in options["paths"]:
+            if not os.path.exists(path):
+                raise CommandError(f"No such file: {path}")
+        os.makedirs(os.path.dirname(os.path.abspath(options["output"])), exist_ok=True)
+
+        start = time.monotonic()
+        count = SortedIndex.write(
+            options["output"],
+            self._keys(options),
+            options["key_bytes"],
+            options["run_size"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {count} passwords to {options['output']} "
+                f"({os.path.getsize(options['output'])} bytes) "
+                f"in {time.monotonic() - start:.1f}s."
+            )
+        )
+
+    def _keys(self, options):
+        if not options["no_common"]:
+            for password in CommonPasswordValidator().passwords:
+                yield hashlib.sha1(password.encode()).digest()
+        for path in options["paths"]:
+            if options["format"] == "sha1":
+                yield from self._sha1_keys(path, options["min_count"])
+            else:
+                yield from self._plain_keys(path)
+            self.stdout.write(f"Read {path}.")
+
+    def _open(self, path):
+        return gzip.open(path, "rb") if str(path).endswith(".gz") else open(path, "rb")
+
+    def _plain_keys(self, path):
+        with self._open(path) as file:
+            for line in file:
+                password = line.rstrip(b"\r\n")
+                if password:
+                    yield hashlib.sha1(password).digest()
+
+    def _sha1_keys(self, path, min_count):
+        with self._open(path) as file:
+            for number, line in enumerate(file, 1):
+                digest, _, count = line.strip().partition(b":")
+                if not digest:
+                    continue
+                if count and int(count) < min_count:
+                    continue
+                try:
+                    key = bytes.fromhex(digest.decode())
+                except ValueError:
+                    key = b""
+                if len(key) != 20:
+                    raise CommandError(f"{path}:{number}: not a SHA-1 hash")
+                yield key
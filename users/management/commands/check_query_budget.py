@@ -0,0 +1,68 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from profiles import cache as profile_cache
+from profiles.models import Profile
+from users import backends
+from users.common.queries import assert_max_queries
+
+User = get_user_model()
+
+# Queries allowed per authenticated page view with cold per-process caches:
+# one for the user and profile, plus one for whatever else the page shows.
+BUDGETS = {
+    "profiles:index": 1,
+    "profiles:index_with_pk": 1,
+    "index": 2,  # + the feed page, posts and authors (home.feed)
+    "home:feed": 2,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Request the main pages as a logged-in user and fail if any of them "
+        "runs more database queries than its budget. Everything is rolled back "
+        "afterwards."
+    )
+
+    def handle(self, *args, **options):
+        failures = []
+        with transaction.atomic():
+            client, profile = self._login()
+            for name, limit in BUDGETS.items():
+                url = reverse(name, kwargs={"pk": profile.pk} if "pk" in name else None)
+                client.get(url)  # Warm the session cache and compiled templates
+                backends._users.clear()
+                profile_cache._profiles.clear()
+                profile_cache._user_profile_ids.clear()
+                try:
+                    with assert_max_queries(limit) as queries:
+                        client.get(url)
+                except AssertionError as exc:
+                    failures.append(f"{name}: {exc}")
+                    continue
+                self.stdout.write(f"{name}: {len(queries)}/{limit} queries")
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError("\n".join(failures))
+
+    def _login(self):
+        stamp = timezone.now().strftime("%Y%m%d%H%M%S%f")
+        user = User.objects.create_user(
+            email=f"query-budget-{stamp}@example.com", password=None
+        )
+        profile = Profile.objects.create(
+            user=user,
+            first_name="Query",
+            last_name="Budget",
+            birthdate=datetime.date(2000, 1, 1),
+        )
+        client = Client(HTTP_HOST="localhost")
+        client.force_login(user)
+        return client, profile
@@ -0,0 +1,55 @@
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from users.email_filter import EmailFilter
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the registered-email Bloom filter and report its size, build "
+        "time and expected vs. measured false-positive rate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--probes",
+            type=int,
+            default=100_000,
+            help="Unregistered emails to test against the filter.",
+        )
+
+    # The filter is built and probed in this process only.
+    @override_settings(EMAIL_FILTER_ENABLED=True)
+    def handle(self, *args, **options):
+        email_filter = EmailFilter()
+        start = time.perf_counter()
+        email_filter.sync()
+        build_ms = (time.perf_counter() - start) * 1000
+
+        probes = [
+            f"{uuid.uuid4().hex}@example.invalid" for _ in range(options["probes"])
+        ]
+        start = time.perf_counter()
+        passed = [email for email in probes if email_filter.might_exist(email)]
+        check_us = (time.perf_counter() - start) * 1e6 / max(1, len(probes))
+        # Random addresses are almost surely unregistered; make sure.
+        registered = set(
+            User.objects.filter(email__in=passed).values_list("email", flat=True)
+        )
+        false_positives = len(passed) - len(registered)
+
+        stats = email_filter.get_stats()
+        self.stdout.write(
+            f"{stats['emails']} emails in {stats['size_bytes']} bytes, "
+            f"built in {build_ms:.1f} ms\n"
+            f"check: {check_us:.2f} us\n"
+            f"false positives: {false_positives}/{len(probes)} "
+            f"({false_positives / max(1, len(probes)):.4%}), "
+            f"expected {stats['expected_error_rate']:.4%}"
+        )
@@ -0,0 +1,228 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from profiles.models import Profile
+from users.common.common import normalize_name
+from users.common.pools import get_process_pool
+from users.email_filter import bump_generation
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-create users and their profiles from a CSV or JSONL file with the "
+        "columns email, password, first_name, last_name, sex, birthdate and bio. "
+        "Rows that fail the model's validation are reported and skipped. "
+        "Progress is checkpointed after every batch, so re-running the same "
+        "command resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Input format; guessed from the file extension by default.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Password hashing processes, one per CPU by default.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Checkpoint file, <path>.checkpoint by default.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore an existing checkpoint and start from the first row.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"No such file: {path}")
+        checkpoint = options["checkpoint"] or f"{path}.checkpoint"
+        done = 0 if options["restart"] else self._read_checkpoint(checkpoint)
+        if done:
+            self.stdout.write(f"Resuming after row {done}.")
+
+        self.pool = get_process_pool("import_users", options["workers"])
+        self.created = self.skipped = self.rejected = 0
+        started = time.perf_counter()
+        with open(path, newline="", encoding="utf-8") as source:
+            rows = islice(
+                enumerate(self._read_rows(source, path, options["format"]), 1),
+                done,
+                None,
+            )
+            batches = iter(lambda: list(islice(rows, options["batch_size"])), [])
+            # Hash the next batch in the pool while the current one is written.
+            pending = self._hash_batch(next(batches, []))
+            while pending[0]:
+                batch, valid, hashed = pending
+                pending = self._hash_batch(next(batches, []))
+                self._write_batch(valid, [future.result() for future in hashed])
+                done += len(batch)
+                self._write_checkpoint(checkpoint, done)
+                self._report(done, started)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {self.created} users, skipped {self.skipped}, "
+                f"rejected {self.rejected} in {elapsed:.1f}s "
+                f"({self.created / max(elapsed, 1e-9):.0f} rows/sec)."
+            )
+        )
+
+    def _read_rows(self, source, path, file_format):
+        file_format = file_format or ("jsonl" if path.endswith(".jsonl") else "csv")
+        if file_format == "csv":
+            yield from csv.DictReader(source)
+        else:
+            for line in source:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as exc:
+                        # Still a row, so checkpoints keep counting lines.
+                        yield exc
+
+    def _clean(self, number, row):
+        """
+        Validate and coerce one input row against the model fields.
+
+        Returns:
+            dict: The field values, or None if the row was rejected.
+        """
+
+        if isinstance(row, ValueError):
+            return self._reject(number, {"row": [f"Invalid JSON: {row}"]})
+        if not isinstance(row, dict):
+            return self._reject(number, {"row": ["Expected a JSON object."]})
+        values, errors = {}, {}
+        fields = [("email", User._meta.get_field("email"))] + [
+            (name, Profile._meta.get_field(name))
+            for name in ("first_name", "last_name", "birthdate", "bio")
+        ]
+        for name, field in fields:
+            value = row.get(name)
+            value = "" if value is None else str(value).strip()
+            if name == "email":
+                value = User.objects.normalize_email(value)
+            try:
+                values[name] = field.clean(value, None)
+            except ValidationError as exc:
+                errors[name] = exc.messages
+        if errors:
+            return self._reject(number, errors)
+        sex = row.get("sex")
+        values["sex"] = sex if sex in Profile.Sex else Profile.Sex.MALE
+        password = row.get("password")
+        values["password"] = str(password) if password else None
+        return values
+
+    def _reject(self, number, errors):
+        self.rejected += 1
+        reasons = "; ".join(
+            f"{name}: {' '.join(messages)}" for name, messages in errors.items()
+        )
+        self.stderr.write(f"Rejected row {number}: {reasons}")
+        return None
+
+    def _hash_batch(self, batch):
+        rows = [self._clean(number, row) for number, row in batch]
+        rows = [row for row in rows if row is not None]
+        # make_password(None) only builds an unusable marker; keep it in-process.
+        hashed = [
+            (
+                self.pool.submit(make_password, row["password"])
+                if row["password"]
+                else _Done(make_password(None))
+            )
+            for row in rows
+        ]
+        return batch, rows, hashed
+
+    def _write_batch(self, batch, passwords):
+        users, profiles = [], []
+        seen = set(
+            User.objects.filter(email__in=[row["email"] for row in batch]).values_list(
+                "email", flat=True
+            )
+        )
+        for row, password in zip(batch, passwords):
+            email = row["email"]
+            if email in seen:
+                self.skipped += 1
+                continue
+            seen.add(email)
+            users.append(User(email=email, password=password))
+            profiles.append(
+                Profile(
+                    first_name=row["first_name"],
+                    last_name=row["last_name"],
+                    sex=row["sex"],
+                    birthdate=row["birthdate"],
+                    bio=row["bio"],
+                    # bulk_create skips Profile.save(), so fold the name here.
+                    search_name=normalize_name(
+                        f"{row['first_name']} {row['last_name']}"
+                    ),
+                )
+            )
+
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            for user, profile in zip(users, profiles):
+                profile.user = user
+            Profile.objects.bulk_create(profiles)
+        # bulk_create sends no post_save; let the email filters catch up.
+        bump_generation()
+        self.created += len(users)
+
+    def _report(self, done, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{done} rows processed, {self.created} created "
+            f"({self.created / max(elapsed, 1e-9):.0f} rows/sec)."
+        )
+
+    def _read_checkpoint(self, checkpoint):
+        try:
+            with open(checkpoint) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _write_checkpoint(self, checkpoint, done):
+        tmp = f"{checkpoint}.tmp"
+        with open(tmp, "w") as f:
+            f.write(str(done))
+        os.replace(tmp, checkpoint)
+
+
+class _Done:
+    """
+    Stand-in for an already resolved future.
+    """
+
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
@@ -0,0 +1,132 @@
+import smtplib
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail.backends.smtp import EmailBackend
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from users.models import OutboxEmail
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued emails from the outbox in batches over one SMTP "
+        "connection, retrying failures with exponential backoff. Workers may "
+        "overlap: each claims its batch before sending it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the outbox instead of exiting once it is drained.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep between polls when the outbox is empty.",
+        )
+
+    def handle(self, *args, **options):
+        self.backend = EmailBackend(fail_silently=False)
+        try:
+            while True:
+                sent = self.send_batch(options["batch_size"])
+                if sent:
+                    continue
+                if not options["loop"]:
+                    break
+                self.backend.close()
+                time.sleep(options["interval"])
+        finally:
+            self.backend.close()
+
+    def send_batch(self, batch_size):
+        batch = self._claim(batch_size)
+        if not batch:
+            return 0
+
+        sent = 0
+        for email in batch:
+            try:
+                self._deliver(email)
+            except (smtplib.SMTPException, OSError) as exc:
+                self._schedule_retry(email, exc)
+            else:
+                email.status = OutboxEmail.Status.SENT
+                email.sent_at = timezone.now()
+                sent += 1
+            email.attempts += 1
+
+            email.claim = None
+
+        OutboxEmail.objects.bulk_update(
+            batch,
+            ["status", "attempts", "next_attempt_at", "last_error", "sent_at", "claim"],
+        )
+        self.stdout.write(f"Sent {sent} of {len(batch)} emails.")
+        return len(batch)
+
+    def _claim(self, batch_size):
+        """
+        Mark up to ``batch_size`` due emails as being sent by this worker.
+
+        One UPDATE both picks and claims the rows, so overlapping workers never
+        get the same email. The claim lasts ``OUTBOX_CLAIM_TIMEOUT`` seconds;
+        after that, e.g. if this worker died, the emails are due again.
+
+        Returns:
+            list: The claimed ``OutboxEmail`` rows.
+        """
+
+        now = timezone.now()
+        due = OutboxEmail.objects.filter(
+            Q(status=OutboxEmail.Status.PENDING) | Q(status=OutboxEmail.Status.SENDING),
+            next_attempt_at__lte=now,
+        )
+        claim = uuid.uuid4()
+        claimed = due.filter(
+            pk__in=due.order_by("next_attempt_at").values("pk")[:batch_size]
+        ).update(
+            status=OutboxEmail.Status.SENDING,
+            next_attempt_at=now + timedelta(seconds=settings.OUTBOX_CLAIM_TIMEOUT),
+            claim=claim,
+        )
+        if not claimed:
+            return []
+        return list(OutboxEmail.objects.filter(claim=claim).order_by("pk"))
+
+    def _deliver(self, email):
+        if self.backend.connection is None:
+            self.backend.open()
+        try:
+            self.backend.connection.sendmail(
+                email.from_email, email.recipients, bytes(email.message)
+            )
+        except smtplib.SMTPServerDisconnected:
+            # The relay dropped our idle connection; reconnect once.
+            self.backend.close()
+            self.backend.open()
+            self.backend.connection.sendmail(
+                email.from_email, email.recipients, bytes(email.message)
+            )
+
+    def _schedule_retry(self, email, exc):
+        email.last_error = str(exc)
+        if email.attempts + 1 >= settings.OUTBOX_MAX_ATTEMPTS:
+            email.status = OutboxEmail.Status.FAILED
+            self.stderr.write(f"Giving up on email {email.pk}: {exc}")
+            return
+        email.status = OutboxEmail.Status.PENDING
+        delay = settings.OUTBOX_RETRY_BACKOFF * 2**email.attempts
+        email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        if isinstance(exc, (smtplib.SMTPServerDisconnected, OSError)):
+            self.backend.close()
@@ -11,6 +11,8 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     date_joined = models.DateTimeField(default=timezone.now)
+    # Written in batches by users.presence, so up to a minute or so behind.
+    last_seen = models.DateTimeField(blank=True, null=True, editable=False)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -18,4 +20,37 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     objects = CustomUserManager()
 
     def __str__(self):
-        return self.email
\ No newline at end of file
+        return self.email
+
+class OutboxEmail(models.Model):
+    """
+    A rendered email waiting to be delivered by the ``send_outbox`` command.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        SENDING = "sending"  # Claimed by a worker until next_attempt_at
+        SENT = "sent"
+        FAILED = "failed"
+
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField()
+    message = models.BinaryField()  # The full MIME message as sent over SMTP
+    status = models.CharField(max_length=7, choices=Status, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    # Set by the send_outbox worker that claimed the row, to find its batch.
+    claim = models.UUIDField(blank=True, null=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"], name="outbox_due_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{', '.join(self.recipients)} ({self.status})"
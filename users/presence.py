@@ -0,0 +1,213 @@
+"""
+Last-seen tracking without a write per request.
+
+``PresenceMiddleware`` calls ``record_activity`` for every authenticated
+request. Activity is buffered per process, one entry per user, and a user is
+only buffered again ``PRESENCE_RESOLUTION`` seconds after their last write.
+
+The first activity buffered after a flush starts a timer thread, which
+``PRESENCE_FLUSH_INTERVAL`` seconds later writes the buffer with one
+``UPDATE ... SET last_seen = CASE id WHEN ... END`` per ``PRESENCE_BATCH_SIZE``
+users, and stores the same timestamps in Django's cache. ``aget_presence``
+reads them from there: a user seen within ``PRESENCE_ONLINE_SECONDS`` is
+online.
+
+Other processes' writes only reach a shared cache. With a per-process one,
+entries expire after ``PRESENCE_RESOLUTION`` seconds so ``last_seen`` is read
+back from the database about as often as it is written.
+"""
+
+import atexit
+import datetime
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.db import close_old_connections
+from django.db.models import Case, DateTimeField, Value, When
+
+from users.common.common import is_process_local
+
+logger = logging.getLogger("users")
+
+
+def _key(user_id):
+    return f"presence:{user_id}"
+
+
+def _cache_timeout():
+    if is_process_local(caches[DEFAULT_CACHE_ALIAS]):
+        return settings.PRESENCE_RESOLUTION
+    return settings.PRESENCE_CACHE_TIMEOUT
+
+
+def _to_datetime(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+
+
+class PresenceTracker:
+    """
+    Per-process buffer of user activity.
+
+    Args:
+        resolution (float): Seconds after a user's last write before their
+            activity is buffered again.
+        flush_interval (float): Seconds between writes of the buffer.
+        batch_size (int): Users per ``UPDATE`` statement.
+    """
+
+    def __init__(self, resolution, flush_interval, batch_size):
+        self.resolution = resolution
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending = {}  # User id -> time last seen, not yet written
+        self._written = {}  # User id -> time last written, within resolution
+        self._flush_scheduled = False
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def record(self, user_id, now=None):
+        """
+        Buffer that the user was active at ``now`` (defaults to the current
+        time).
+
+        Returns:
+            bool: Whether the caller must schedule a ``flush`` in
+            ``flush_interval`` seconds; True for the first activity buffered
+            since the last flush.
+        """
+
+        now = time.time() if now is None else now
+        self.stats["requests"] += 1
+        with self._lock:
+            written = self._written.get(user_id)
+            if written is not None and now - written < self.resolution:
+                return False
+            self._pending[user_id] = now
+            if self._flush_scheduled:
+                return False
+            self._flush_scheduled = True
+            return True
+
+    def flush(self, now=None):
+        """
+        Write the buffered activity to the database and the cache.
+
+        Returns:
+            int: The number of users written.
+        """
+
+        now = time.time() if now is None else now
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flush_scheduled = False
+            self._written.update(pending)
+            self._written = {
+                user_id: written
+                for user_id, written in self._written.items()
+                if now - written < self.resolution
+            }
+        if not pending:
+            return 0
+
+        User = get_user_model()
+        seen = sorted(pending.items())
+        for start in range(0, len(seen), self.batch_size):
+            batch = seen[start : start + self.batch_size]
+            User._default_manager.filter(pk__in=[pk for pk, _ in batch]).update(
+                last_seen=Case(
+                    *(
+                        When(pk=pk, then=Value(_to_datetime(timestamp)))
+                        for pk, timestamp in batch
+                    ),
+                    output_field=DateTimeField(),
+                )
+            )
+            self.stats["statements"] += 1
+        cache.set_many(
+            {_key(pk): timestamp for pk, timestamp in seen}, _cache_timeout()
+        )
+        self.stats["flushes"] += 1
+        self.stats["rows"] += len(seen)
+        return len(seen)
+
+
+_tracker = PresenceTracker(
+    settings.PRESENCE_RESOLUTION,
+    settings.PRESENCE_FLUSH_INTERVAL,
+    settings.PRESENCE_BATCH_SIZE,
+)
+
+
+def record_activity(user_id):
+    if _tracker.record(user_id):
+        timer = threading.Timer(_tracker.flush_interval, _flush)
+        timer.daemon = True
+        timer.start()
+
+
+def flush():
+    """
+    Write this process' buffered activity now, e.g. before switching databases.
+
+    Returns:
+        int: The number of users written.
+    """
+
+    return _tracker.flush()
+
+
+def _flush():
+    try:
+        flush()
+    except Exception:
+        logger.exception("Failed to write user presence")
+    finally:
+        close_old_connections()
+
+
+# Write what is left when the process exits normally.
+atexit.register(_flush)
+
+
+def _presence(timestamp):
+    if not timestamp:
+        return None, False
+    return (
+        _to_datetime(timestamp),
+        time.time() - timestamp < settings.PRESENCE_ONLINE_SECONDS,
+    )
+
+
+async def aget_presence(user_id):
+    """
+    Return ``(last_seen, online)`` for a user; ``last_seen`` is None if they
+    were never seen.
+    """
+
+    timestamp = await cache.aget(_key(user_id))
+    if timestamp is None:
+        last_seen = (
+            await get_user_model()
+            ._default_manager.filter(pk=user_id)
+            .values_list("last_seen", flat=True)
+            .afirst()
+        )
+        timestamp = last_seen.timestamp() if last_seen else 0
+        # Briefly: the user may be active on another process, whose flush
+        # does not replace this entry if the cache is per process.
+        await cache.aadd(_key(user_id), timestamp, settings.PRESENCE_RESOLUTION)
+    return _presence(timestamp)
+
+
+def get_stats():
+    """
+    Return this process' counters: ``requests`` recorded, ``flushes``, UPDATE
+    ``statements`` and user ``rows`` written.
+    """
+
+    return dict(_tracker.stats)
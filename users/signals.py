@@ -0,0 +1,38 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .backends import forget_user
+from .email_filter import bump_generation, email_filter
+
+User = get_user_model()
+
+
+def _email_added(email, rebuild=False):
+    email_filter.add(email)
+    bump_generation(rebuild)
+
+
+@receiver(post_init, sender=User)
+def remember_email(sender, instance, **kwargs):
+    # __dict__ so a deferred email field is not fetched.
+    instance._saved_email = instance.__dict__.get("email")
+
+
+@receiver(post_save, sender=User)
+def add_email_to_filter(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(_email_added, instance.email))
+    elif instance.email != instance._saved_email:
+        # Existing rows are only re-read on a rebuild.
+        transaction.on_commit(partial(_email_added, instance.email, rebuild=True))
+    instance._saved_email = instance.email
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    transaction.on_commit(partial(forget_user, instance.pk))
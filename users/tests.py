@@ -1,3 +1,538 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import random
+import smtplib
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+from tempfile import TemporaryDirectory
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs
 
-# Create your tests here.
+import jwt
+import requests
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.core.exceptions import ValidationError
+from django.core.mail import EmailMessage
+from django.core.mail.backends.smtp import EmailBackend
+from django.core.management import call_command
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from users import breached_passwords
+from users.breached_passwords import BreachedPasswordValidator, password_key
+from users.email_filter import email_exists, email_filter
+from users.common import http, jwks
+from users.common.jwks import verify_google_id_token
+from users.common.ratelimit import get_backend
+from users.common.sortedindex import SortedIndex
+from users.common.testing import AppTestCase, clear_caches, create_profile
+from users.mail import OutboxEmailBackend
+from users.models import CustomUser, OutboxEmail
+from users.views import GoogleOAuth2CallbackView
+
+
+class StubGoogle:
+    """
+    Local stand-in for Google's OAuth token endpoint (``/token``) and signing
+    keys (``/certs``).
+
+    The token endpoint answers the code ``<name>`` with an ID token for
+    ``<name>@example.com`` after ``latency`` seconds, signed with a key
+    generated for the stub. ``requests`` counts the calls per path.
+    """
+
+    client_id = "stub-client-id"
+    issuer = "https://accounts.google.com"
+
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.requests = Counter()
+        self.rotate_key()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests[self.path] += 1
+                self._reply({"keys": [stub.jwk]}, {"Cache-Control": "max-age=3600"})
+
+            def do_POST(self):
+                stub.requests[self.path] += 1
+                length = int(self.headers["Content-Length"])
+                form = parse_qs(self.rfile.read(length).decode())
+                time.sleep(stub.latency)
+                code = form["code"][0]
+                self._reply({"id_token": stub.sign(email=f"{code}@example.com")})
+
+            def _reply(self, body, headers=()):
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in dict(headers).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def rotate_key(self):
+        self.key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.kid = f"stub-{time.time_ns()}"
+        self.jwk = {
+            **jwt.algorithms.RSAAlgorithm.to_jwk(self.key.public_key(), as_dict=True),
+            "kid": self.kid,
+            "alg": "RS256",
+            "use": "sig",
+        }
+
+    def sign(self, kid=None, **claims):
+        now = int(time.time())
+        claims = {
+            "iss": self.issuer,
+            "aud": self.client_id,
+            "iat": now,
+            "exp": now + 3600,
+            "email_verified": True,
+            **claims,
+        }
+        return jwt.encode(
+            claims, self.key, algorithm="RS256", headers={"kid": kid or self.kid}
+        )
+
+
+class FakeRelay:
+    """
+    Stand-in for the SMTP connection ``EmailBackend.open`` makes.
+
+    ``sendmail`` raises the exceptions queued in ``errors`` one call at a
+    time, then accepts; ``on_send`` runs once, before the first delivery.
+    """
+
+    def __init__(self):
+        self.errors = []
+        self.sent = []
+        self.opens = 0
+        self.on_send = None
+
+    def open(self, backend):
+        if backend.connection is not None:
+            return False
+        self.opens += 1
+        backend.connection = self
+        return True
+
+    def sendmail(self, from_email, recipients, message):
+        if self.on_send:
+            on_send, self.on_send = self.on_send, None
+            on_send()
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append(recipients)
+
+    def quit(self):
+        pass
+
+
+class StubGoogleTestCase(TestCase):
+    latency = 0
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.google = StubGoogle(cls.latency)
+        cls.addClassCleanup(cls.google.stop)
+        google_settings = override_settings(
+            GOOGLE_CLIENT_ID=StubGoogle.client_id,
+            GOOGLE_JWKS_URL=f"{cls.google.url}/certs",
+        )
+        google_settings.enable()
+        cls.addClassCleanup(google_settings.disable)
+        token_url = mock.patch.object(
+            GoogleOAuth2CallbackView, "token_url", f"{cls.google.url}/token"
+        )
+        token_url.start()
+        cls.addClassCleanup(token_url.stop)
+
+    def setUp(self):
+        super().setUp()
+        # The process-wide key cache, built from GOOGLE_JWKS_URL on first use.
+        jwks._google_jwks = None
+        self.google.requests.clear()
+
+
+CACHE_METHODS = ("add", "get", "incr", "set")
+
+
+@override_settings(RATELIMITS={"login": {"ip": (0, 60)}, "register": {"ip": (0, 60)}})
+class RateLimitAsyncTests(AppTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_profile("limited", password="correct horse battery").user
+
+    async def test_limited_post_with_session_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        for name in ("users:login", "users:register"):
+            with self.subTest(name=name):
+                # The session, user and profile must be loaded from the
+                # database, not from a cache warmed by the login.
+                clear_caches()
+                response = await self.async_client.post(
+                    reverse(name), {"email": self.user.email, "password": "wrong"}
+                )
+                self.assertEqual(response.status_code, 429)
+                self.assertIn("Retry-After", response.headers)
+                self.assertContains(response, "Too many attempts", status_code=429)
+
+    async def test_cache_is_not_called_on_the_event_loop(self):
+        cache = get_backend().cache
+
+        def off_loop(method):
+            def wrapper(*args, **kwargs):
+                with self.assertRaises(RuntimeError):
+                    asyncio.get_running_loop()
+                return method(*args, **kwargs)
+
+            return wrapper
+
+        with mock.patch.multiple(
+            cache, **{name: off_loop(getattr(cache, name)) for name in CACHE_METHODS}
+        ):
+            response = await self.async_client.post(
+                reverse("users:login"), {"email": self.user.email, "password": "x"}
+            )
+        self.assertEqual(response.status_code, 429)
+
+
+class EmailFilterTests(AppTestCase):
+    def test_process_local_cache_disables_filter(self):
+        # Warm this process' filter, then add a user the way another process
+        # would, without this process' signals or cache seeing it.
+        self.assertFalse(email_exists("nobody@example.com"))
+        CustomUser.objects.bulk_create([CustomUser(email="elsewhere@example.com")])
+        self.assertTrue(email_exists("elsewhere@example.com"))
+
+    @override_settings(EMAIL_FILTER_ENABLED=True)
+    def test_enabled_filter_answers_no(self):
+        CustomUser.objects.create_user(email="known@example.com", password="x")
+        self.assertTrue(email_filter.might_exist("known@example.com"))
+        self.assertFalse(email_filter.might_exist("unknown@example.com"))
+
+
+class GoogleIdTokenTests(StubGoogleTestCase):
+    def test_valid_token(self):
+        for _ in range(2):
+            claims = verify_google_id_token(self.google.sign(email="a@example.com"))
+            self.assertEqual(claims["email"], "a@example.com")
+        self.assertEqual(self.google.requests["/certs"], 1)
+
+    @mock.patch("users.common.jwks.time")
+    def test_unknown_kid_refreshes_at_most_once_per_interval(self, clock):
+        clock.monotonic.return_value = 1000
+        verify_google_id_token(self.google.sign())
+        self.google.rotate_key()
+        rotated = self.google.sign()
+
+        # Too soon after the last fetch: the new key is not looked up yet.
+        clock.monotonic.return_value = 1030
+        with self.assertRaises(jwt.PyJWKClientError):
+            verify_google_id_token(rotated)
+        self.assertEqual(self.google.requests["/certs"], 1)
+
+        clock.monotonic.return_value = 1061
+        verify_google_id_token(rotated)
+        self.assertEqual(self.google.requests["/certs"], 2)
+
+        # A forged key id right after costs no fetch.
+        clock.monotonic.return_value = 1062
+        with self.assertRaises(jwt.PyJWKClientError):
+            verify_google_id_token(self.google.sign(kid="forged"))
+        self.assertEqual(self.google.requests["/certs"], 2)
+
+    def test_expired_token(self):
+        now = int(time.time())
+        with self.assertRaises(jwt.ExpiredSignatureError):
+            verify_google_id_token(self.google.sign(iat=now - 7200, exp=now - 3600))
+
+    def test_wrong_audience(self):
+        with self.assertRaises(jwt.InvalidAudienceError):
+            verify_google_id_token(self.google.sign(aud="another-client-id"))
+
+
+class GoogleCallbackConcurrencyTests(StubGoogleTestCase, AppTestCase):
+    latency = 0.2
+    logins = 10
+
+    async def test_concurrent_logins_overlap(self):
+        async def login(i):
+            client = AsyncClient()
+            start = time.perf_counter()
+            response = await client.get(
+                reverse("users:oauth2callback"), {"code": f"google-{i}"}
+            )
+            return time.perf_counter() - start, response
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(login(i) for i in range(self.logins)))
+        wall = time.perf_counter() - start
+
+        for _, response in results:
+            self.assertRedirects(
+                response, reverse("index"), fetch_redirect_response=False
+            )
+            self.assertIn("sessionid", response.cookies)
+        self.assertEqual(
+            await CustomUser.objects.filter(email__startswith="google-").acount(),
+            self.logins,
+        )
+        self.assertEqual(self.google.requests["/token"], self.logins)
+        self.assertEqual(self.google.requests["/certs"], 1)
+        # The token calls wait on the stub side by side rather than in turn,
+        # which would take at least logins x latency.
+        latencies = sorted(elapsed for elapsed, _ in results)
+        self.assertLess(wall, self.logins * self.latency * 0.75, latencies)
+
+
+@override_settings(OUTBOX_RETRY_BACKOFF=60, OUTBOX_MAX_ATTEMPTS=3)
+class SendOutboxTests(TestCase):
+    def setUp(self):
+        self.relay = FakeRelay()
+        patcher = mock.patch.object(
+            EmailBackend, "open", lambda backend: self.relay.open(backend)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _queue(self, *recipients):
+        OutboxEmailBackend().send_messages(
+            [EmailMessage("Hi", "Body", "app@example.com", [to]) for to in recipients]
+        )
+
+    def _send(self):
+        stderr = StringIO()
+        call_command("send_outbox", stdout=StringIO(), stderr=stderr)
+        return stderr.getvalue()
+
+    def _make_due(self):
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+
+    def test_failures_back_off_exponentially_then_give_up(self):
+        self._queue("a@example.com")
+        self.relay.errors = [smtplib.SMTPDataError(451, "Try later")] * 3
+        for attempt, delay in ((1, 60), (2, 120)):
+            self._send()
+            email = OutboxEmail.objects.get()
+            self.assertEqual(email.status, OutboxEmail.Status.PENDING)
+            self.assertEqual(email.attempts, attempt)
+            self.assertIn("Try later", email.last_error)
+            self.assertAlmostEqual(
+                email.next_attempt_at,
+                timezone.now() + timedelta(seconds=delay),
+                delta=timedelta(seconds=5),
+            )
+            self._send()  # Not due yet
+            self.assertEqual(OutboxEmail.objects.get().attempts, attempt)
+            self._make_due()
+
+        self.assertIn("Giving up", self._send())
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.status, OutboxEmail.Status.FAILED)
+        self.assertEqual(email.attempts, 3)
+        self.assertEqual(self.relay.sent, [])
+
+    def test_reconnects_when_the_relay_drops_the_connection(self):
+        self._queue("a@example.com")
+        self.relay.errors = [smtplib.SMTPServerDisconnected("Idle")]
+        self._send()
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.status, OutboxEmail.Status.SENT)
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(self.relay.opens, 2)
+        self.assertEqual(self.relay.sent, [["a@example.com"]])
+
+    def test_overlapping_workers_send_each_email_once(self):
+        self._queue("a@example.com", "b@example.com")
+        # A second worker starts while the first is delivering its batch.
+        self.relay.on_send = self._send
+        self._send()
+        self._send()
+        self.assertEqual(
+            sorted(self.relay.sent), [["a@example.com"], ["b@example.com"]]
+        )
+        self.assertFalse(
+            OutboxEmail.objects.exclude(status=OutboxEmail.Status.SENT).exists()
+        )
+
+    def test_crashed_worker_claim_expires(self):
+        self._queue("a@example.com")
+        OutboxEmail.objects.update(
+            status=OutboxEmail.Status.SENDING,
+            next_attempt_at=timezone.now() + timedelta(seconds=60),
+        )
+        self._send()
+        self.assertEqual(self.relay.sent, [])
+        self._make_due()
+        self._send()
+        self.assertEqual(self.relay.sent, [["a@example.com"]])
+        self.assertEqual(OutboxEmail.objects.get().status, OutboxEmail.Status.SENT)
+
+
+@override_settings(HTTP_CLIENT_CONNECT_TIMEOUT=0.01)
+class HttpClientTests(SimpleTestCase):
+    def setUp(self):
+        self.session = mock.MagicMock()
+        for target, value in (
+            ("get_session", lambda: self.session),
+            ("_slots", threading.BoundedSemaphore(1)),
+        ):
+            patcher = mock.patch.object(http, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_stream_holds_the_slot_until_closed(self):
+        response = self.session.request.return_value
+        response.__enter__.return_value = response
+        with http.stream("GET", "https://example.com/a.png") as streamed:
+            self.assertIs(streamed, response)
+            with self.assertRaises(requests.ConnectionError):
+                http.get("https://example.com/b.png")
+            response.__exit__.assert_not_called()
+        response.__exit__.assert_called_once()
+        self.assertIs(http.get("https://example.com/b.png"), response)
+
+    def test_stream_releases_the_slot_on_error(self):
+        self.session.request.side_effect = requests.Timeout
+        with self.assertRaises(requests.Timeout):
+            with http.stream("GET", "https://example.com/a.png"):
+                pass
+        self.session.request.side_effect = None
+        http.get("https://example.com/b.png")
+
+    def test_request_refuses_to_stream(self):
+        with self.assertRaises(TypeError):
+            http.get("https://example.com/a.png", stream=True)
+
+
+class SortedIndexTests(SimpleTestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "keys.idx")
+
+    def _open(self):
+        index = SortedIndex(self.path)
+        self.addCleanup(index.close)
+        return index
+
+    def test_merges_runs_and_drops_duplicates(self):
+        rng = random.Random(0)
+        keys = [rng.randbytes(8) for _ in range(1000)]
+        # Runs of 64 keys; every key shows up again in a later run, and keys
+        # sharing their first 4 bytes count once.
+        count = SortedIndex.write(
+            self.path, keys + keys[::-1] + [keys[0][:4] + b"tail"], 4, run_size=64
+        )
+        prefixes = {key[:4] for key in keys}
+        self.assertEqual(count, len(prefixes))
+        index = self._open()
+        self.assertEqual(len(index), len(prefixes))
+        for key in keys:
+            self.assertIn(key, index)
+        for key in (rng.randbytes(8) for _ in range(1000)):
+            if key[:4] not in prefixes:
+                self.assertNotIn(key, index)
+
+    def test_empty(self):
+        self.assertEqual(SortedIndex.write(self.path, [], 4), 0)
+        self.assertNotIn(b"abcd", self._open())
+
+    def test_rejects_truncated_and_foreign_files(self):
+        SortedIndex.write(self.path, [b"aaaa", b"bbbb"], 4)
+        with open(self.path, "rb") as file:
+            data = file.read()
+        for name, content in (
+            ("truncated", data[:-1]),
+            ("bad magic", b"XXXX" + data[4:]),
+            ("too short", data[:3]),
+        ):
+            with self.subTest(name):
+                with open(self.path, "wb") as file:
+                    file.write(content)
+                with self.assertRaises(ValueError):
+                    SortedIndex(self.path)
+
+
+class BreachedPasswordValidatorTests(SimpleTestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "breached.idx")
+        path_setting = override_settings(BREACHED_PASSWORDS_PATH=self.path)
+        path_setting.enable()
+        self.addCleanup(path_setting.disable)
+        # The process-wide mapping, reopened when the file changes.
+        index = mock.patch.multiple(breached_passwords, _index=None, _index_key=None)
+        index.start()
+        self.addCleanup(index.stop)
+        self.validator = BreachedPasswordValidator()
+
+    def _build(self, *passwords):
+        source = f"{self.path}.txt"
+        with open(source, "w") as file:
+            file.write("".join(f"{password}\n" for password in passwords))
+        call_command(
+            "build_breached_passwords",
+            source,
+            "--no-common",
+            "--run-size=2",
+            f"--output={self.path}",
+            stdout=StringIO(),
+        )
+
+    def _rejects(self, password):
+        try:
+            self.validator.validate(password)
+        except ValidationError as exc:
+            return exc.error_list[0].code
+        return None
+
+    def test_falls_back_to_common_passwords_without_an_index(self):
+        self.assertIsNone(breached_passwords.get_index())
+        self.assertEqual(self._rejects("password"), "password_too_common")
+        self.assertIsNone(self._rejects("Unlisted-Passphrase-42"))
+
+    def test_rejects_indexed_passwords(self):
+        self._build("hunter2-leaked", "correct-horse-leaked", "hunter2-leaked")
+        self.assertEqual(self._rejects("hunter2-leaked"), "password_breached")
+        self.assertEqual(self._rejects("correct-horse-leaked"), "password_breached")
+        self.assertIsNone(self._rejects("Unlisted-Passphrase-42"))
+        # Built with --no-common, and the index replaces the fallback.
+        self.assertIsNone(self._rejects("password"))
+
+    def test_reopens_a_replaced_index(self):
+        self._build("first-leak")
+        self.assertIn(password_key("first-leak"), breached_passwords.get_index())
+        self._build("second-leak")
+        self.assertIsNone(self._rejects("first-leak"))
+        self.assertEqual(self._rejects("second-leak"), "password_breached")
+
+    def test_ignores_a_corrupt_index(self):
+        with open(self.path, "wb") as file:
+            file.write(b"not an index")
+        with self.assertLogs("users", "WARNING"):
+            self.assertIsNone(breached_passwords.get_index())
+        self.assertEqual(self._rejects("password"), "password_too_common")
@@ -1,10 +1,12 @@
 import logging
 from urllib.parse import urlencode
 
+import jwt
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.sites.shortcuts import get_current_site
-from django.contrib.auth import authenticate, login, logout, get_user_model
+from django.contrib.auth import alogin, logout, get_user_model
 from django.contrib.auth.views import PasswordResetView
 from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import render
@@ -12,10 +14,17 @@ from django.template.loader import render_to_string
 from django.urls import reverse_lazy
 from django.views import View
 
+from profiles.avatars import schedule_ingest
+from profiles.cache import aget_profile_for_user
 from profiles.models import Profile
 from profiles.forms import ProfileCreateForm
 from .forms import CustomUserCreationForm, LoginForm, CustomPasswordResetForm
+from .common import http
+from .common.jwks import verify_google_id_token
+from .backends import aauthenticate, amake_password
+from .common.asyncviews import AsyncViewMixin
 from .common.common import is_htmx
+from .common.ratelimit import RateLimitMixin
 
 logger = logging.getLogger("users")
 User = get_user_model()
@@ -25,7 +34,7 @@ class GoogleLoginView(View):
     google_auth_url = "https://accounts.google.com/o/oauth2/auth"
     google_scope = "openid profile email "
 
-    def get(self, request):
+    async def get(self, request):
         params = {
             "client_id": settings.GOOGLE_CLIENT_ID,
             "redirect_uri": settings.GOOGLE_REDIRECT_URI,
@@ -38,44 +47,53 @@ class GoogleLoginView(View):
 
 class GoogleOAuth2CallbackView(View):
     token_url = "https://oauth2.googleapis.com/token"
-    user_info_url = "https://www.googleapis.com/oauth2/v1/userinfo"
 
-    def get(self, request):
+    async def get(self, request):
         code = request.GET.get("code")
-        token_data = self._get_token_data(code)
-        token_response = requests.post(self.token_url, data=token_data)
-        token_json = token_response.json()
-        access_token = token_json.get("access_token")
-
-        user_info_response = requests.get(
-            self.user_info_url, params={"access_token": access_token}
-        )
-        user_info = user_info_response.json()
-
-
-        user, created = self._get_or_create_user(user_info.get("email"))
+        try:
+            token_response = await http.apost(
+                self.token_url, data=self._get_token_data(code)
+            )
+            token_json = token_response.json()
+            user_info = await sync_to_async(
+                verify_google_id_token, thread_sensitive=False
+            )(token_json.get("id_token", ""))
+        except (requests.RequestException, ValueError, jwt.PyJWTError) as exc:
+            logger.warning(f"Google sign-in failed: {exc}")
+            return HttpResponseRedirect(reverse_lazy("users:login"))
+        if not user_info.get("email_verified"):
+            logger.warning(f"Google account {user_info.get('email')} is not verified.")
+            return HttpResponseRedirect(reverse_lazy("users:login"))
+
+        user, created = await self._get_or_create_user(user_info.get("email"))
         if created:
-            self._create_profile(
+            profile = await self._create_profile(
                 user,
                 user_info.get("given_name"),
                 user_info.get("family_name"),
                 user_info.get("picture"),
             )
-        login(request, user)
+        else:
+            profile = await aget_profile_for_user(user.pk)
+        if profile is not None:
+            # Downloaded in the background; a no-op if the picture is unchanged.
+            schedule_ingest(profile, user_info.get("picture"))
+        await alogin(request, user)
         return HttpResponseRedirect(reverse_lazy("index"))
 
-    def _create_profile(
+    async def _create_profile(
         self,
         user,
         first_name,
         last_name,
-        avatar,
+        picture,
     ):
-        profile = Profile.objects.create(user=user)
-        profile.first_name = first_name
-        profile.last_name = last_name
-        profile.avatar = avatar
-        profile.save()
+        return await Profile.objects.acreate(
+            user=user,
+            first_name=first_name or "",
+            last_name=last_name or "",
+            avatar_source_url=picture or "",
+        )
 
     def _get_token_data(self, code):
         return {
@@ -86,38 +104,39 @@ class GoogleOAuth2CallbackView(View):
             "grant_type": "authorization_code",
         }
 
-    def _get_or_create_user(self, email):
-        user, created = User.objects.get_or_create(email=email)
+    async def _get_or_create_user(self, email):
+        user, created = await User.objects.aget_or_create(email=email)
         if created:
             user.set_unusable_password()
-            user.save()
+            await user.asave()
         return user, created
 
 
-class LoginView(View):
+class LoginView(RateLimitMixin, AsyncViewMixin, View):
+    ratelimit_scope = "login"
     template_name = "users/login/login.html"
     success_url = reverse_lazy("index")
 
-    def get(self, request):
+    async def get(self, request):
         form = LoginForm()
         return render(request, self.template_name, {"form": form})
 
-    def post(self, request):
+    async def post(self, request):
         form = LoginForm(request.POST)
         if form.is_valid():
-            user = self._authenticate_user(request, form)
+            user = await self._authenticate_user(request, form)
             if user:
-                login(request, user)
+                await alogin(request, user)
                 return self._handle_htmx_redirect()
             else:
                 return self._render_form_with_errors(form, "Wrong email or password")
         else:
             return self._render_form_with_errors(form, "Form is not valid")
 
-    def _authenticate_user(self, request, form):
+    async def _authenticate_user(self, request, form):
         email = form.cleaned_data.get("email")
         password = form.cleaned_data.get("password")
-        return authenticate(request, email=email, password=password)
+        return await aauthenticate(request, email=email, password=password)
 
     def _handle_htmx_redirect(self):
         if is_htmx(self.request):
@@ -134,18 +153,20 @@ class LoginView(View):
         return render(self.request, self.template_name, context)
 
 
-class RegisterView(View):
+class RegisterView(RateLimitMixin, AsyncViewMixin, View):
+    ratelimit_scope = "register"
+    ratelimit_email_field = "user_form-email"
     template_name = "users/registration/register.html"
 
-    def get(self, request):
+    async def get(self, request):
 
         context = self._get_forms_context()
         return render(request, self.template_name, context)
 
-    def post(self, request):
+    async def post(self, request):
         user_form, profile_form = self._get_forms_from_post(request)
-        if user_form.is_valid() and profile_form.is_valid():
-            self._save_user_and_profile(user_form, profile_form)
+        if await sync_to_async(self._forms_are_valid)(user_form, profile_form):
+            await self._save_user_and_profile(user_form, profile_form)
             return render(request, "users/registration/register_success.html")
         return self._handle_invalid_forms(user_form, profile_form)
 
@@ -159,11 +180,18 @@ class RegisterView(View):
         profile_form = ProfileCreateForm(request.POST, prefix="profile_form")
         return user_form, profile_form
 
-    def _save_user_and_profile(self, user_form, profile_form):
-        user = user_form.save()
+    def _forms_are_valid(self, user_form, profile_form):
+        # Sync: the unique email check and password validators have no async API.
+        return user_form.is_valid() and profile_form.is_valid()
+
+    async def _save_user_and_profile(self, user_form, profile_form):
+        # What UserCreationForm.save() does, with the hash off the event loop.
+        user = user_form.instance
+        user.password = await amake_password(user_form.cleaned_data["password1"])
+        await user.asave()
         profile = profile_form.save(commit=False)
         profile.user = user
-        profile.save()
+        await profile.asave()
 
     def _handle_invalid_forms(self, user_form, profile_form):
         context = {"user_form": user_form, "profile_form": profile_form}
@@ -179,7 +207,8 @@ class RegisterView(View):
         )
 
 
-class CustomPasswordResetView(PasswordResetView):
+class CustomPasswordResetView(RateLimitMixin, PasswordResetView):
+    ratelimit_scope = "password_reset"
     email_template_name = "users/reset_password/password_reset_email.html"
     subject_template_name = "users/reset_password/password_reset_subject.txt"
     template_name = "users/reset_password/password_reset.html"